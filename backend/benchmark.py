@@ -0,0 +1,568 @@
+"""End-to-end benchmarks for council runs and the prompt-optimizer endpoints.
+
+Every run starts the mock OpenRouter server (backend/mock_openrouter.py) in a
+subprocess and works in a throwaway directory, so no API key is needed and the
+user's sessions and settings are never touched:
+
+    python -m backend.benchmark --models 1,3 --response-tokens 100,400 --concurrency 1,8 --output bench.json
+    python -m backend.benchmark --compare before.json after.json
+
+Each case varies model count, response length, session size (iterations
+already stored in the session) and concurrent users, and reports latency
+percentiles, time to first SSE event, events/sec, CPU time and RSS as JSON.
+CPU and RSS cover this process: the backend (direct calls and the uvicorn
+server for the streaming endpoints) plus the load generator, but not the mock.
+
+Every request carries a unique tag in its input, so identical in-flight model
+calls are never coalesced and concurrent users each cost the upstream calls
+a real user would.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCENARIOS = ("council", "test_prompt", "suggest", "test_stream", "suggest_stream")
+
+# Bumped whenever the layout or the meaning of the result file changes
+# (2: inputs are unique per request, so concurrent users are no longer coalesced)
+RESULT_FORMAT_VERSION = 2
+
+BENCH_PROMPT = "You are a helpful assistant. Answer the user's question clearly and concisely."
+BENCH_INPUT = "Explain how connection pooling reduces request latency."
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _model_id(index: int, response_tokens: int) -> str:
+    """Mock model name; its profile in the mock server fixes the response length."""
+    return f"bench/model-{index}-{response_tokens}t"
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    """Nearest-rank p50/p95/p99 plus mean and max, in milliseconds (input in seconds)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size, where /proc is available."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def _cpu_seconds() -> float:
+    if resource is None:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class MockServer:
+    """The mock OpenRouter server running in a child process."""
+
+    def __init__(self, port: int, profiles_path: str, args: argparse.Namespace):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}/api/v1/chat/completions"
+        command = [
+            sys.executable, "-m", "backend.mock_openrouter",
+            "--port", str(port),
+            "--config", profiles_path,
+            "--latency", args.latency,
+            "--tokens-per-sec", str(args.tokens_per_sec),
+            "--failure-rate", str(args.failure_rate),
+            "--seed", str(args.seed),
+        ]
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.process = subprocess.Popen(command, cwd=project_root, stdout=subprocess.DEVNULL)
+
+    def wait_ready(self, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("Mock OpenRouter server exited during startup")
+            try:
+                httpx.get(f"http://127.0.0.1:{self.port}/mock/stats", timeout=1.0)
+                return
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        raise RuntimeError("Mock OpenRouter server did not start in time")
+
+    @property
+    def stats_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/mock/stats"
+
+    def stats(self) -> Dict[str, Any]:
+        return httpx.get(self.stats_url, timeout=5.0).json()
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class Benchmark:
+    """Runs the benchmark matrix inside one event loop."""
+
+    def __init__(self, args: argparse.Namespace, api_base: str, mock_stats_url: str):
+        self.args = args
+        self.api_base = api_base
+        self.mock_stats_url = mock_stats_url
+
+        # Imported here: the backend reads OPENROUTER_API_URL and the working directory at import time
+        from . import storage, optimizer, council, settings
+        self.storage = storage
+        self.optimizer = optimizer
+        self.council = council
+        self.settings = settings
+        self._requests_sent = 0
+
+    def _tagged(self, text: str) -> str:
+        """Return `text` made unique to one request, so it is never coalesced with another."""
+        self._requests_sent += 1
+        return f"{text} (benchmark request {self._requests_sent})"
+
+    # Fixtures
+
+    def _sample_results(self, models: List[str], response_tokens: int,
+                        feedback: str = "Good, but too long.") -> List[Dict[str, Any]]:
+        output = " ".join(["word"] * response_tokens)
+        return [
+            {"model": model, "output": output, "response_time": 0, "rating": 4, "feedback": feedback}
+            for model in models
+        ]
+
+    def _create_session(self, models: List[str], response_tokens: int, iterations: int) -> Dict[str, Any]:
+        """Create a session with `iterations` stored versions and one test sample (not timed)."""
+        import uuid
+
+        session_id = str(uuid.uuid4())
+        self.storage.create_session(session_id, title="Benchmark")
+        sample = self.storage.add_test_sample(session_id, "Benchmark sample", BENCH_INPUT)
+        for _ in range(max(iterations, 1)):
+            session = self.storage.add_iteration(
+                session_id, BENCH_PROMPT, "benchmark",
+                test_results=self._sample_results(models, response_tokens), stage="tested",
+            )
+        return {"session_id": session_id, "sample_id": sample["id"], "version": session["current_version"]}
+
+    # Single requests; each returns {"latency", "ttfe", "events", "error"}
+
+    async def _timed(self, call: Callable[[], Awaitable[Any]], is_error: Callable[[Any], bool]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = await call()
+            error = is_error(result)
+        except Exception as e:
+            print(f"Benchmark request failed: {e}")
+            error = True
+        return {"latency": time.perf_counter() - started, "ttfe": None, "events": 0, "error": error}
+
+    async def _sse(self, client: httpx.AsyncClient, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        ttfe = None
+        events = 0
+        error = False
+        try:
+            async with client.stream("POST", f"{self.api_base}{path}", json=body) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    error = True
+                else:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data: "):
+                            continue
+                        if ttfe is None:
+                            ttfe = time.perf_counter() - started
+                        events += 1
+                        event = json.loads(line[6:])
+                        if event.get("type") == "error" and "model" not in event:
+                            error = True
+        except httpx.HTTPError as e:
+            print(f"Benchmark stream failed: {e}")
+            error = True
+        return {"latency": time.perf_counter() - started, "ttfe": ttfe, "events": events, "error": error}
+
+    def _request_factory(self, scenario: str, models: List[str], response_tokens: int,
+                         fixture: Optional[Dict[str, Any]], client: httpx.AsyncClient):
+        # The input is tagged before the clock starts; the stream scenarios store it in the session first
+        if scenario == "council":
+            async def council():
+                user_input = self._tagged(BENCH_INPUT)
+                return await self._timed(
+                    lambda: self.council.run_full_council(user_input),
+                    lambda result: not result[0],
+                )
+            return council
+        if scenario == "test_prompt":
+            async def test_prompt():
+                user_input = self._tagged(BENCH_INPUT)
+                return await self._timed(
+                    lambda: self.optimizer.test_prompt_with_models(BENCH_PROMPT, models, user_input),
+                    lambda results: any(r.get("error") for r in results),
+                )
+            return test_prompt
+        if scenario == "suggest":
+            async def suggest():
+                results = self._sample_results(models, response_tokens, self._tagged("Good, but too long."))
+                return await self._timed(
+                    lambda: self.optimizer.collect_improvement_suggestions(BENCH_PROMPT, results, models),
+                    lambda suggestions: len(suggestions) < len(models),
+                )
+            return suggest
+        if scenario == "test_stream":
+            path = f"/api/sessions/{fixture['session_id']}/test/stream"
+
+            async def test_stream():
+                self.storage.update_test_sample(
+                    fixture["session_id"], fixture["sample_id"], test_input=self._tagged(BENCH_INPUT)
+                )
+                return await self._sse(client, path, {"models": models, "test_sample_id": fixture["sample_id"]})
+            return test_stream
+        if scenario == "suggest_stream":
+            path = f"/api/sessions/{fixture['session_id']}/suggest/stream"
+
+            async def suggest_stream():
+                self.storage.update_iteration_feedback(
+                    fixture["session_id"], fixture["version"], models[0],
+                    feedback=self._tagged("Good, but too long."),
+                )
+                return await self._sse(client, path, {"models": models})
+            return suggest_stream
+        raise ValueError(f"Unknown scenario '{scenario}'")
+
+    # Cases
+
+    async def run_case(self, scenario: str, model_count: int, response_tokens: int,
+                       session_iterations: int, concurrency: int) -> Dict[str, Any]:
+        models = [_model_id(i, response_tokens) for i in range(model_count)]
+        self.settings.save_settings({
+            "test_models": models,
+            "synthesizer_model": models[0],
+            "council_pipeline": {"enabled": self.args.council_pipeline},
+        })
+
+        # One session per simulated user, so users do not queue on each other's session lock
+        fixtures: List[Optional[Dict[str, Any]]] = [None] * concurrency
+        if scenario in ("test_stream", "suggest_stream"):
+            fixtures = [self._create_session(models, response_tokens, session_iterations) for _ in range(concurrency)]
+
+        samples: List[Dict[str, Any]] = []
+        timeout = httpx.Timeout(self.args.timeout, connect=10.0)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            async def user(fixture: Optional[Dict[str, Any]]):
+                request = self._request_factory(scenario, models, response_tokens, fixture, client)
+                for _ in range(self.args.requests):
+                    samples.append(await request())
+
+            if self.args.warmup:
+                await self._request_factory(scenario, models, response_tokens, fixtures[0], client)()
+
+            upstream_before = (await client.get(self.mock_stats_url)).json()["requests"]
+            cpu_before = _cpu_seconds()
+            started = time.perf_counter()
+            await asyncio.gather(*(user(fixture) for fixture in fixtures))
+            wall = time.perf_counter() - started
+            cpu = _cpu_seconds() - cpu_before
+            # Includes retries, so the cost of transient failures shows up here
+            upstream_requests = (await client.get(self.mock_stats_url)).json()["requests"] - upstream_before
+
+        events = sum(s["events"] for s in samples)
+        return {
+            "scenario": scenario,
+            "models": model_count,
+            "response_tokens": response_tokens,
+            "session_iterations": session_iterations if scenario in ("test_stream", "suggest_stream") else None,
+            "concurrency": concurrency,
+            "requests": len(samples),
+            "errors": sum(1 for s in samples if s["error"]),
+            "upstream_requests": upstream_requests,
+            "wall_s": round(wall, 3),
+            "throughput_rps": round(len(samples) / wall, 2) if wall else None,
+            "latency_ms": percentiles([s["latency"] for s in samples]),
+            "ttfe_ms": percentiles([s["ttfe"] for s in samples if s["ttfe"] is not None]),
+            "events": events,
+            "events_per_sec": round(events / wall, 1) if wall and events else None,
+            "cpu_s": round(cpu, 3),
+            "cpu_pct": round(cpu / wall * 100, 1) if wall else None,
+            "rss_mb": _rss_mb(),
+            "rss_peak_mb": _peak_rss_mb(),
+        }
+
+    async def run(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        import uvicorn
+        from .main import app
+
+        server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=int(self.api_base.rsplit(":", 1)[1]), log_level="warning"
+        ))
+        serve_task = asyncio.create_task(server.serve())
+        while not server.started:
+            if serve_task.done():
+                serve_task.result()
+                raise RuntimeError("Backend server stopped during startup")
+            await asyncio.sleep(0.05)
+
+        results = []
+        try:
+            for number, case in enumerate(cases, start=1):
+                label = ", ".join(f"{k}={v}" for k, v in case.items())
+                print(f"[{number}/{len(cases)}] {label}", file=sys.stderr)
+                results.append(await self.run_case(**case))
+        finally:
+            server.should_exit = True
+            await serve_task
+        return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def build_cases(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Expand the CLI dimensions into the case matrix (session size only varies for stream scenarios)."""
+    cases = []
+    for scenario in args.scenarios:
+        session_sizes = args.session_iterations if scenario in ("test_stream", "suggest_stream") else [0]
+        for model_count in args.models:
+            for response_tokens in args.response_tokens:
+                for session_iterations in session_sizes:
+                    for concurrency in args.concurrency:
+                        cases.append({
+                            "scenario": scenario,
+                            "model_count": model_count,
+                            "response_tokens": response_tokens,
+                            "session_iterations": session_iterations,
+                            "concurrency": concurrency,
+                        })
+    return cases
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the full matrix and return the JSON-serializable report."""
+    cases = build_cases(args)
+    workdir = tempfile.mkdtemp(prefix="llm-council-bench-")
+    profiles_path = os.path.join(workdir, "mock-profiles.json")
+    response_sizes = sorted(set(args.response_tokens))
+    with open(profiles_path, "w", encoding="utf-8") as f:
+        json.dump({"models": {
+            _model_id(i, tokens): {"response_tokens": tokens}
+            for tokens in response_sizes
+            for i in range(max(args.models))
+        }}, f)
+
+    mock = MockServer(_free_port(), profiles_path, args)
+    previous_cwd = os.getcwd()
+    try:
+        mock.wait_ready()
+
+        # Settings live in ./data in development mode; sessions go to the temporary directory as well
+        os.environ["OPENROUTER_API_URL"] = mock.url
+        os.environ["OPENROUTER_API_KEY"] = "benchmark"
+        os.environ.pop("LLM_COUNCIL_DESKTOP", None)
+        os.chdir(workdir)
+
+        from . import storage
+        if args.storage == "sqlite":
+            from .storage_sqlite import SqliteStorageBackend
+            storage.set_backend(SqliteStorageBackend(os.path.join(workdir, "sessions.db")))
+        else:
+            from .storage_json import JsonStorageBackend
+            storage.set_backend(JsonStorageBackend(os.path.join(workdir, "sessions"), cache_size=storage.SESSION_CACHE_SIZE))
+
+        # Job records go to the temporary directory too, or the app would recover them as interrupted jobs
+        from . import jobs
+        jobs.set_manager(jobs.JobManager(jobs_dir=os.path.join(workdir, "jobs")))
+
+        benchmark = Benchmark(args, api_base=f"http://127.0.0.1:{_free_port()}", mock_stats_url=mock.stats_url)
+        results = asyncio.run(benchmark.run(cases))
+        mock_stats = mock.stats()
+    finally:
+        os.chdir(previous_cwd)
+        mock.stop()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "format_version": RESULT_FORMAT_VERSION,
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": args.storage,
+            "council_pipeline": args.council_pipeline,
+            "mock": {
+                "latency": args.latency,
+                "tokens_per_sec": args.tokens_per_sec,
+                "failure_rate": args.failure_rate,
+                "seed": args.seed,
+                "requests_served": mock_stats.get("requests"),
+            },
+            "requests_per_user": args.requests,
+            "workdir": workdir if args.keep_workdir else None,
+        },
+        "results": results,
+    }
+
+
+def _case_key(result: Dict[str, Any]) -> tuple:
+    return (result["scenario"], result["models"], result["response_tokens"],
+            result["session_iterations"], result["concurrency"])
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Pair up matching cases of two reports and compute relative changes.
+
+    Returns:
+        One row per case present in both reports, with before/after values and
+        percent change for latency p50/p95/p99, TTFE p50, throughput and CPU time
+    """
+    if before.get("format_version") != after.get("format_version"):
+        print(
+            f"Warning: comparing report format {before.get('format_version')} with "
+            f"{after.get('format_version')}; the numbers are not comparable",
+            file=sys.stderr,
+        )
+    baseline = {_case_key(r): r for r in before.get("results", [])}
+    rows = []
+    for result in after.get("results", []):
+        old = baseline.get(_case_key(result))
+        if old is None:
+            continue
+        row = dict(zip(("scenario", "models", "response_tokens", "session_iterations", "concurrency"), _case_key(result)))
+        metrics = {
+            "latency_p50_ms": lambda r: (r.get("latency_ms") or {}).get("p50"),
+            "latency_p95_ms": lambda r: (r.get("latency_ms") or {}).get("p95"),
+            "latency_p99_ms": lambda r: (r.get("latency_ms") or {}).get("p99"),
+            "ttfe_p50_ms": lambda r: (r.get("ttfe_ms") or {}).get("p50"),
+            "throughput_rps": lambda r: r.get("throughput_rps"),
+            "cpu_s": lambda r: r.get("cpu_s"),
+        }
+        for name, get in metrics.items():
+            a, b = get(old), get(result)
+            row[name] = {
+                "before": a,
+                "after": b,
+                "change_pct": round((b - a) / a * 100, 1) if a and b is not None else None,
+            }
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the council pipeline and prompt-optimizer endpoints")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--models", type=_int_list, default=[3], help="Model counts, e.g. 1,3,5")
+    parser.add_argument("--response-tokens", type=_int_list, default=[200], help="Response lengths, e.g. 100,800")
+    parser.add_argument("--session-iterations", type=_int_list, default=[1],
+                        help="Stored iterations per session for the stream scenarios, e.g. 1,50")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="Concurrent users, e.g. 1,8,32")
+    parser.add_argument("--requests", type=int, default=5, help="Sequential requests per user")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="Skip the untimed warm-up request")
+    parser.add_argument("--latency", default="fixed:200", help="Mock time to first token (see backend.mock_openrouter)")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="Mock streaming speed")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Mock HTTP failure rate")
+    parser.add_argument("--seed", type=int, default=1, help="Mock random seed")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--council-pipeline", action="store_true",
+                        help="Run the council scenario in pipelined mode (stages start at a quorum)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout for endpoint scenarios")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the temporary sessions and settings")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Diff two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        print(json.dumps(compare_reports(*reports), indent=2))
+        return
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Backend log output goes to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Wrote {len(report['results'])} result(s) to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,8 +21,8 @@ SYNTHESIZER_MODEL = "x-ai/grok-4.1-fast:free"
 # Generator model - generates initial prompts from objectives
 GENERATOR_MODEL = "x-ai/grok-4.1-fast:free"
 
-# OpenRouter API endpoint
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+# OpenRouter API endpoint (override to use a proxy or the local mock server, see backend/mock_openrouter.py)
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 
 # Data directory for session storage
 DATA_DIR = "data/sessions"
@@ -32,6 +32,69 @@ DEFAULT_TIMEOUT = 300.0  # 5 minutes for general requests
 TITLE_GENERATION_TIMEOUT = 30.0  # 30 seconds for title generation
 QUICK_GENERATION_TIMEOUT = 120.0  # 2 minutes for quick generation tasks
 
+# Retries for transient upstream failures (429, 5xx, timeouts); see backend/retry.py for per-stage/per-model overrides
+RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_COUNCIL_RETRY_MAX_ATTEMPTS", "3"))  # including the first attempt
+RETRY_BASE_DELAY = float(os.getenv("LLM_COUNCIL_RETRY_BASE_DELAY", "1.0"))  # seconds
+RETRY_MAX_DELAY = float(os.getenv("LLM_COUNCIL_RETRY_MAX_DELAY", "20.0"))  # seconds
+RETRY_MAX_RETRY_AFTER = float(os.getenv("LLM_COUNCIL_RETRY_MAX_RETRY_AFTER", "60.0"))  # seconds
+
+# Per-model circuit breaker (see backend/health.py)
+CIRCUIT_WINDOW_SIZE = int(os.getenv("LLM_COUNCIL_CIRCUIT_WINDOW", "20"))  # recent calls considered
+CIRCUIT_MIN_REQUESTS = int(os.getenv("LLM_COUNCIL_CIRCUIT_MIN_REQUESTS", "4"))  # before the circuit may open
+CIRCUIT_ERROR_THRESHOLD = float(os.getenv("LLM_COUNCIL_CIRCUIT_ERROR_THRESHOLD", "0.5"))  # error rate that opens it
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("LLM_COUNCIL_CIRCUIT_SLOW_CALL", "120.0"))  # slower calls count as errors
+CIRCUIT_OPEN_SECONDS = float(os.getenv("LLM_COUNCIL_CIRCUIT_OPEN_SECONDS", "30.0"))  # first cool-down
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("LLM_COUNCIL_CIRCUIT_MAX_OPEN_SECONDS", "600.0"))
+
+# Hedged requests (opt-in via the "hedging" setting, see query_model_hedged)
+HEDGE_PERCENTILE = float(os.getenv("LLM_COUNCIL_HEDGE_PERCENTILE", "95"))  # of the model's recent latency
+HEDGE_MIN_DELAY = float(os.getenv("LLM_COUNCIL_HEDGE_MIN_DELAY", "2.0"))  # seconds; never hedge sooner
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_COUNCIL_HEDGE_DEFAULT_DELAY", "30.0"))  # seconds, until latency data exists
+HEDGE_BUDGET_RATIO = float(os.getenv("LLM_COUNCIL_HEDGE_BUDGET_RATIO", "0.1"))  # extra requests per hedgeable call
+
+# On-disk response cache (opt-in via the "response_cache" setting, see backend/response_cache.py)
+RESPONSE_CACHE_MAX_BYTES = int(float(os.getenv("LLM_COUNCIL_RESPONSE_CACHE_MAX_MB", "200")) * 1024 * 1024)
+RESPONSE_CACHE_TTL = float(os.getenv("LLM_COUNCIL_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+RESPONSE_CACHE_REPLAY_CHUNK = 64  # characters per delta when replaying a cached answer as a stream
+
+# Early completion of council stages 1 and 2
+COUNCIL_QUORUM = int(os.getenv("LLM_COUNCIL_QUORUM", "0"))  # successful answers to wait for; 0 waits for all
+COUNCIL_SOFT_DEADLINE = float(os.getenv("LLM_COUNCIL_SOFT_DEADLINE", "0"))  # seconds; then settle for what has arrived; 0 disables
+COUNCIL_CANCEL_STRAGGLERS = os.getenv("LLM_COUNCIL_CANCEL_STRAGGLERS", "").lower() in ("1", "true", "yes")  # else they finish in the background
+
+# Background jobs (see backend/jobs.py)
+JOB_WORKERS = int(os.getenv("LLM_COUNCIL_JOB_WORKERS", "4"))  # jobs running at once
+JOB_HISTORY_LIMIT = int(os.getenv("LLM_COUNCIL_JOB_HISTORY", "200"))  # finished jobs kept in memory and on disk
+JOB_EVENT_BUFFER = int(os.getenv("LLM_COUNCIL_JOB_EVENT_BUFFER", "2000"))  # events kept per job for SSE resume
+
+# Batch evaluation over a session's whole test set
+BATCH_CONCURRENCY = int(os.getenv("LLM_COUNCIL_BATCH_CONCURRENCY", "8"))  # model calls running at once per batch
+
+# Limits on outbound OpenRouter calls (see backend/ratelimit.py for per-provider/per-model overrides)
+RATE_LIMIT_CONCURRENCY = int(os.getenv("LLM_COUNCIL_MAX_CONCURRENCY", "32"))  # calls in flight at once; 0 = unlimited
+RATE_LIMIT_RPS = float(os.getenv("LLM_COUNCIL_RATE_LIMIT", "0"))  # requests per second; 0 = unlimited
+RATE_LIMIT_BURST = float(os.getenv("LLM_COUNCIL_RATE_BURST", "10"))  # requests allowed at once above the rate
+
+# Tracing of requests, jobs, council stages, model calls and storage operations (see backend/tracing.py)
+TRACING_ENABLED = os.getenv("LLM_COUNCIL_TRACING", "").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("LLM_COUNCIL_TRACE_FILE", os.path.join(os.path.expanduser("~"), ".llm-council", "traces.jsonl"))
+TRACE_MAX_BYTES = int(float(os.getenv("LLM_COUNCIL_TRACE_MAX_MB", "50")) * 1024 * 1024)  # then rotated to <file>.1
+TRACE_COLLECTOR_URL = os.getenv("LLM_COUNCIL_TRACE_COLLECTOR", "")  # optional; receives POSTs of {"spans": [...]}
+
+# Runtime profiling (see backend/profiler.py and the /api/admin/profiler endpoints)
+PROFILER_INTERVAL_MS = float(os.getenv("LLM_COUNCIL_PROFILER_INTERVAL_MS", "10"))  # between samples
+PROFILER_MAX_SECONDS = float(os.getenv("LLM_COUNCIL_PROFILER_MAX_SECONDS", "300"))  # longest run allowed
+SLOW_CALLBACK_MS = float(os.getenv("LLM_COUNCIL_SLOW_CALLBACK_MS", "100"))  # event loop blocked this long is reported
+LOOP_MONITOR_ENABLED = os.getenv("LLM_COUNCIL_LOOP_MONITOR", "").lower() in ("1", "true", "yes")  # else only while profiling
+SLOW_CALLBACK_HISTORY = int(os.getenv("LLM_COUNCIL_SLOW_CALLBACK_HISTORY", "100"))  # reports kept in memory
+
+# Shared HTTP client connection pool (one client per process, reused by all calls)
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_COUNCIL_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_COUNCIL_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_COUNCIL_HTTP_KEEPALIVE_EXPIRY", "60.0"))  # seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_COUNCIL_HTTP_CONNECT_TIMEOUT", "10.0"))  # seconds
+HTTP2_ENABLED = os.getenv("LLM_COUNCIL_HTTP2", "").lower() in ("1", "true", "yes")  # optional; needs `pip install h2`
+
 # Legacy: Keep old config names for backward compatibility (will be removed)
 COUNCIL_MODELS = TEST_MODELS  # Deprecated
 CHAIRMAN_MODEL = SYNTHESIZER_MODEL  # Deprecated
@@ -1,56 +1,217 @@
-"""3-stage LLM Council orchestration."""
-
-from typing import List, Dict, Any, Tuple
-from .openrouter import query_models_parallel, query_model
-from .config import TITLE_GENERATION_TIMEOUT
+"""3-stage LLM Council orchestration.
+
+By default each stage waits for every model (or for COUNCIL_QUORUM answers,
+see _collect_council_stage). With the "council_pipeline" setting enabled the
+stages overlap instead (see _CouncilPipeline): once a quorum of stage-1
+answers is in, each model starts ranking as soon as its own stage-1 call has
+finished, over every answer received by then, and the chairman starts as soon
+as a quorum of rankings is in. Answers that arrive after the chairman started
+are recorded in the run's metadata (and passed to on_late_result) but never
+waited for.
+"""
+
+import asyncio
+import time
+from typing import List, Dict, Any, Tuple, Optional, Callable, Awaitable
+from .openrouter import query_models_quorum, query_model, query_model_hedged
+from .config import (
+    TITLE_GENERATION_TIMEOUT,
+    COUNCIL_QUORUM,
+    COUNCIL_SOFT_DEADLINE,
+    COUNCIL_CANCEL_STRAGGLERS,
+)
 from .settings import get_settings
+from .health import filter_available
+from .tracing import traced
+
+# Called with (stage, result) for each answer that arrives after its stage has moved on
+LateResultCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# Stragglers still running in the background (referenced so they are not garbage collected)
+_background_tasks = set()
 
 
-async def stage1_collect_responses(user_query: str) -> List[Dict[str, Any]]:
+def _stage_quorum(stage: str, model_count: int) -> Tuple[int, float]:
     """
-    Stage 1: Collect individual responses from all council models.
+    Return the (quorum, soft deadline) a council stage waits for.
+
+    In pipelined mode each stage has its own quorum (0 means a majority of the
+    models); otherwise COUNCIL_QUORUM applies to both stages.
+    """
+    pipeline = get_settings().get("council_pipeline") or {}
+    if not pipeline.get("enabled"):
+        return COUNCIL_QUORUM, COUNCIL_SOFT_DEADLINE
+    quorum = int(pipeline.get(f"{stage}_quorum") or 0) or model_count // 2 + 1
+    soft_deadline = float(pipeline.get("soft_deadline") or COUNCIL_SOFT_DEADLINE)
+    return min(quorum, model_count), soft_deadline
+
+
+async def _collect_council_stage(
+    models: List[str],
+    messages: List[Dict[str, str]],
+    stage: str,
+    format_result: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+    on_late_result: Optional[LateResultCallback] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Fan a council stage out to the models, returning once the quorum or soft deadline is met.
+
+    Models that have not answered by then keep running in the background; each
+    successful late answer is formatted and passed to `on_late_result`. The
+    quorum comes from _stage_quorum.
+
+    Args:
+        models: Models to query
+        messages: Messages sent to every model
+        stage: Pipeline stage ("stage1" or "stage2")
+        format_result: Builds the stage result dict from (model, response)
+        on_late_result: Optional coroutine function receiving late results
+
+    Returns:
+        Tuple of (results of the models that answered in time, models still pending)
+    """
+    quorum, soft_deadline = _stage_quorum(stage, len(models))
+    responses, stragglers = await query_models_quorum(
+        models,
+        messages,
+        quorum=quorum,
+        soft_deadline=soft_deadline,
+        stage=stage,
+        cancel_stragglers=COUNCIL_CANCEL_STRAGGLERS
+    )
+
+    results = [
+        format_result(model, response)
+        for model, response in responses.items()
+        if response is not None and 'error' not in response  # Only include successful responses
+    ]
+
+    for model, task in stragglers.items():
+        background = asyncio.ensure_future(_attach_late_result(model, task, stage, format_result, on_late_result))
+        _background_tasks.add(background)
+        background.add_done_callback(_background_tasks.discard)
+
+    return results, list(stragglers)
+
+
+async def _attach_late_result(
+    model: str,
+    task: "asyncio.Task",
+    stage: str,
+    format_result: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+    on_late_result: Optional[LateResultCallback]
+):
+    """Wait for a straggler and hand its result to the callback."""
+    response = await task
+    if response is None or 'error' in response:
+        return
+    print(f"Late {stage} answer from model {model}")
+    if on_late_result is not None:
+        try:
+            await on_late_result(stage, format_result(model, response))
+        except Exception as e:
+            print(f"Error attaching late {stage} answer from model {model}: {e}")
+
+
+def _format_stage1_result(model: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "response": response.get('content', '')
+    }
+
+
+def _format_stage2_result(model: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    full_text = response.get('content', '')
+    return {
+        "model": model,
+        "ranking": full_text,
+        "parsed_ranking": parse_ranking_from_text(full_text)
+    }
+
+
+async def stage1_collect_responses(
+    user_query: str,
+    on_late_result: Optional[LateResultCallback] = None
+) -> List[Dict[str, Any]]:
+    """
+    Stage 1: Collect individual responses from the council models.
+
+    With a quorum or soft deadline configured, returns before the slowest
+    models have answered (see _collect_council_stage).
 
     Args:
         user_query: The user's question
+        on_late_result: Optional coroutine function receiving answers that arrive later
 
     Returns:
         List of dicts with 'model' and 'response' keys
     """
-    messages = [{"role": "user", "content": user_query}]
+    stage1_results, _ = await _stage1(user_query, on_late_result)
+    return stage1_results
 
-    # Get current test models from settings
-    settings = get_settings()
-    test_models = settings.get("test_models", [])
 
-    # Query all models in parallel
-    responses = await query_models_parallel(test_models, messages)
+@traced("council.stage1")
+async def _stage1(
+    user_query: str,
+    on_late_result: Optional[LateResultCallback] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    messages = [{"role": "user", "content": user_query}]
 
-    # Format results
-    stage1_results = []
-    for model, response in responses.items():
-        if response is not None:  # Only include successful responses
-            stage1_results.append({
-                "model": model,
-                "response": response.get('content', '')
-            })
+    # Get current test models from settings, leaving out models whose circuit is open
+    settings = get_settings()
+    test_models, _ = filter_available(settings.get("test_models", []))
 
-    return stage1_results
+    return await _collect_council_stage(test_models, messages, "stage1", _format_stage1_result, on_late_result)
 
 
 async def stage2_collect_rankings(
     user_query: str,
-    stage1_results: List[Dict[str, Any]]
+    stage1_results: List[Dict[str, Any]],
+    on_late_result: Optional[LateResultCallback] = None
 ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
     """
     Stage 2: Each model ranks the anonymized responses.
 
+    With a quorum or soft deadline configured, returns before the slowest
+    rankers have answered (see _collect_council_stage).
+
     Args:
         user_query: The original user query
         stage1_results: Results from Stage 1
+        on_late_result: Optional coroutine function receiving rankings that arrive later
 
     Returns:
         Tuple of (rankings list, label_to_model mapping)
     """
+    stage2_results, label_to_model, _ = await _stage2(user_query, stage1_results, on_late_result)
+    return stage2_results, label_to_model
+
+
+@traced("council.stage2")
+async def _stage2(
+    user_query: str,
+    stage1_results: List[Dict[str, Any]],
+    on_late_result: Optional[LateResultCallback] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, str], List[str]]:
+    messages, label_to_model = _ranking_messages(user_query, stage1_results)
+
+    # Get current test models from settings, leaving out models whose circuit is open
+    settings = get_settings()
+    test_models, _ = filter_available(settings.get("test_models", []))
+
+    # Get rankings from the council models in parallel
+    stage2_results, pending = await _collect_council_stage(
+        test_models, messages, "stage2", _format_stage2_result, on_late_result
+    )
+
+    return stage2_results, label_to_model, pending
+
+
+def _ranking_messages(
+    user_query: str,
+    stage1_results: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, str]], Dict[str, str]]:
+    """Build the stage-2 ranking request over the given answers, labelled in order."""
     # Create anonymized labels for responses (Response A, Response B, etc.)
     labels = [chr(65 + i) for i in range(len(stage1_results))]  # A, B, C, ...
 
@@ -97,30 +258,153 @@ FINAL RANKING:
 
 Now provide your evaluation and ranking:"""
 
-    messages = [{"role": "user", "content": ranking_prompt}]
-
-    # Get current test models from settings
-    settings = get_settings()
-    test_models = settings.get("test_models", [])
-
-    # Get rankings from all council models in parallel
-    responses = await query_models_parallel(test_models, messages)
-
-    # Format results
-    stage2_results = []
-    for model, response in responses.items():
-        if response is not None:
-            full_text = response.get('content', '')
-            parsed = parse_ranking_from_text(full_text)
-            stage2_results.append({
-                "model": model,
-                "ranking": full_text,
-                "parsed_ranking": parsed
-            })
+    return [{"role": "user", "content": ranking_prompt}], label_to_model
 
-    return stage2_results, label_to_model
 
+class _CouncilPipeline:
+    """
+    Stages 1 and 2 of a pipelined council run.
+
+    Stage 2 opens once stage1_quorum answers are in (or the soft deadline has
+    passed with at least one). From then on every model starts ranking as soon
+    as its own stage-1 call has finished, over all answers received so far.
+    Answers are labelled in arrival order, so a ranker that starts later sees
+    the same labels plus the newer answers, and one label_to_model mapping
+    covers every ranking. run() returns once stage2_quorum rankings are in;
+    calls still running then are stragglers whose results are late.
+    """
 
+    def __init__(self, user_query: str, on_late_result: LateResultCallback):
+        self.user_query = user_query
+        self.on_late_result = on_late_result
+        # Leave out models whose circuit is open
+        self.models, _ = filter_available(get_settings().get("test_models", []))
+        self.stage1_quorum, self.soft_deadline = _stage_quorum("stage1", len(self.models))
+        self.stage2_quorum, _ = _stage_quorum("stage2", len(self.models))
+        self.answers: List[Dict[str, Any]] = []
+        self.rankings: List[Dict[str, Any]] = []
+        self.label_to_model: Dict[str, str] = {}
+        self.stage2_opened_at: Optional[float] = None
+        self.moved_on = False
+        self._tasks: Dict["asyncio.Task", Tuple[str, str]] = {}
+        self._waiting_rankers: List[str] = []
+
+    def _start(self, stage: str, model: str, messages: List[Dict[str, str]]):
+        task = asyncio.ensure_future(query_model(model, messages, stage=stage))
+        self._tasks[task] = (stage, model)
+
+    def _start_ranker(self, model: str):
+        messages, _ = _ranking_messages(self.user_query, self.answers)
+        self._start("stage2", model, messages)
+
+    def _open_stage2(self):
+        self.stage2_opened_at = time.monotonic()
+        for model in self._waiting_rankers:
+            self._start_ranker(model)
+        self._waiting_rankers = []
+
+    def _handle(self, task: "asyncio.Task") -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Take in a finished call; returns (stage, model, result) if the result is late."""
+        stage, model = self._tasks.pop(task)
+        response = task.result()
+        ok = response is not None and 'error' not in response
+
+        if stage == "stage1":
+            result = None
+            if ok:
+                result = _format_stage1_result(model, response)
+                self.label_to_model[f"Response {chr(65 + len(self.answers))}"] = model
+                self.answers.append(result)
+            # Even a model without an answer of its own ranks the others
+            if self.stage2_opened_at is not None:
+                self._start_ranker(model)
+            else:
+                self._waiting_rankers.append(model)
+            return ("stage1", model, result) if result is not None and self.moved_on else None
+
+        if not ok:
+            return None
+        result = _format_stage2_result(model, response)
+        if self.moved_on:
+            return ("stage2", model, result)
+        self.rankings.append(result)
+        return None
+
+    @traced("council.pipeline")
+    async def run(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, str], Dict[str, List[str]]]:
+        """
+        Run stages 1 and 2 up to the point where the chairman can start.
+
+        Returns:
+            Tuple of (stage1_results, stage2_results, label_to_model, models still
+            running per stage). label_to_model keeps growing as late answers arrive.
+        """
+        started = time.monotonic()
+        stage1_messages = [{"role": "user", "content": self.user_query}]
+        for model in self.models:
+            self._start("stage1", model, stage1_messages)
+
+        try:
+            while True:
+                now = time.monotonic()
+                stage_started = started if self.stage2_opened_at is None else self.stage2_opened_at
+                soft_at = stage_started + self.soft_deadline if self.soft_deadline else None
+                soft_passed = soft_at is not None and now >= soft_at
+
+                if self.stage2_opened_at is None:
+                    stage1_running = any(stage == "stage1" for stage, _ in self._tasks.values())
+                    if not stage1_running or len(self.answers) >= self.stage1_quorum or (soft_passed and self.answers):
+                        if not self.answers:
+                            break
+                        self._open_stage2()
+                        continue
+                elif not self._tasks or len(self.rankings) >= self.stage2_quorum or (soft_passed and self.rankings):
+                    break
+
+                timeout = soft_at - now if soft_at is not None and not soft_passed else None
+                done, _ = await asyncio.wait(set(self._tasks), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    self._handle(task)
+        except asyncio.CancelledError:
+            for task in self._tasks:
+                task.cancel()
+            raise
+
+        self.moved_on = True
+        pending: Dict[str, List[str]] = {"stage1": [], "stage2": []}
+        for stage, model in self._tasks.values():
+            pending[stage].append(model)
+        if self._tasks:
+            action = "Cancelling" if COUNCIL_CANCEL_STRAGGLERS else "Not waiting for"
+            print(f"{action} {len(self._tasks)} slow council call(s): {', '.join(m for _, m in self._tasks.values())}")
+            if COUNCIL_CANCEL_STRAGGLERS:
+                for task in self._tasks:
+                    task.cancel()
+                self._tasks = {}
+            else:
+                background = asyncio.ensure_future(self._finish())
+                _background_tasks.add(background)
+                background.add_done_callback(_background_tasks.discard)
+
+        return list(self.answers), list(self.rankings), self.label_to_model, pending
+
+    async def _finish(self):
+        """Wait for the stragglers, ranking late answers too, and hand their results on."""
+        while self._tasks:
+            done, _ = await asyncio.wait(set(self._tasks), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                late = self._handle(task)
+                if late is None:
+                    continue
+                stage, model, result = late
+                print(f"Late {stage} answer from model {model}")
+                try:
+                    await self.on_late_result(stage, result)
+                except Exception as e:
+                    print(f"Error attaching late {stage} answer from model {model}: {e}")
+
+
+@traced("council.stage3")
 async def stage3_synthesize_final(
     user_query: str,
     stage1_results: List[Dict[str, Any]],
@@ -172,7 +456,7 @@ Provide a clear, well-reasoned final answer that represents the council's collec
     synthesizer_model = settings.get("synthesizer_model", "x-ai/grok-4.1-fast:free")
 
     # Query the chairman model
-    response = await query_model(synthesizer_model, messages)
+    response = await query_model_hedged(synthesizer_model, messages, stage="stage3")
 
     if response is None:
         # Fallback if chairman fails
@@ -182,7 +466,8 @@ Provide a clear, well-reasoned final answer that represents the council's collec
         }
 
     return {
-        "model": synthesizer_model,
+        # A hedged call may have been answered by the fallback model
+        "model": response.get('model', synthesizer_model),
         "response": response.get('content', '')
     }
 
@@ -288,7 +573,7 @@ Title:"""
     messages = [{"role": "user", "content": title_prompt}]
 
     # Use gemini-2.5-flash for title generation (fast and cheap)
-    response = await query_model("google/gemini-2.5-flash", messages, timeout=TITLE_GENERATION_TIMEOUT)
+    response = await query_model("google/gemini-2.5-flash", messages, timeout=TITLE_GENERATION_TIMEOUT, stage="title")
 
     if response is None:
         # Fallback to a generic title
@@ -306,18 +591,60 @@ Title:"""
     return title
 
 
-async def run_full_council(user_query: str) -> Tuple[List, List, Dict, Dict]:
+@traced("council")
+async def run_full_council(
+    user_query: str,
+    on_late_result: Optional[LateResultCallback] = None
+) -> Tuple[List, List, Dict, Dict]:
     """
     Run the complete 3-stage council process.
 
+    In pipelined mode (see _CouncilPipeline) rankers start as their inputs
+    arrive and the chairman as soon as a quorum of rankings is in.
+
     Args:
         user_query: The user's question
+        on_late_result: Optional coroutine function called with (stage, result) for
+            stage 1/2 answers that arrive after their stage completed, so they can
+            be attached to the stored results
 
     Returns:
-        Tuple of (stage1_results, stage2_results, stage3_result, metadata)
+        Tuple of (stage1_results, stage2_results, stage3_result, metadata). The
+        metadata's 'late_results' (and, for late rankings, 'aggregate_rankings')
+        keep being updated as late answers arrive; 'timings' has the seconds
+        spent in each stage.
     """
-    # Stage 1: Collect individual responses
-    stage1_results = await stage1_collect_responses(user_query)
+    started = time.monotonic()
+    late_results: Dict[str, List[Dict[str, Any]]] = {"stage1": [], "stage2": []}
+    metadata: Dict[str, Any] = {}
+    stage2_results: List[Dict[str, Any]] = []
+
+    async def record_late_result(stage: str, result: Dict[str, Any]):
+        late_results[stage].append(result)
+        if stage == "stage2" and "label_to_model" in metadata:
+            # Late rankings still count towards the aggregate
+            metadata["aggregate_rankings"] = calculate_aggregate_rankings(
+                stage2_results + late_results["stage2"], metadata["label_to_model"]
+            )
+        if on_late_result is not None:
+            await on_late_result(stage, result)
+
+    if (get_settings().get("council_pipeline") or {}).get("enabled"):
+        # Stages 1 and 2 overlap; stage 1 "ends" when the first rankers start
+        pipeline = _CouncilPipeline(user_query, record_late_result)
+        stage1_results, stage2_results, label_to_model, pending = await pipeline.run()
+        stage2_done = time.monotonic()
+        stage1_done = pipeline.stage2_opened_at or stage2_done
+        stage1_pending, stage2_pending = pending["stage1"], pending["stage2"]
+    else:
+        # Stage 1: Collect individual responses
+        stage1_results, stage1_pending = await _stage1(user_query, record_late_result)
+        stage1_done = time.monotonic()
+
+        if stage1_results:
+            # Stage 2: Collect rankings
+            stage2_results, label_to_model, stage2_pending = await _stage2(user_query, stage1_results, record_late_result)
+        stage2_done = time.monotonic()
 
     # If no models responded successfully, return error
     if not stage1_results:
@@ -326,11 +653,14 @@ async def run_full_council(user_query: str) -> Tuple[List, List, Dict, Dict]:
             "response": "All models failed to respond. Please try again."
         }, {}
 
-    # Stage 2: Collect rankings
-    stage2_results, label_to_model = await stage2_collect_rankings(user_query, stage1_results)
-
-    # Calculate aggregate rankings
-    aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
+    # Prepare metadata (before stage 3, so rankings arriving during it are counted)
+    metadata.update({
+        "label_to_model": label_to_model,
+        "aggregate_rankings": calculate_aggregate_rankings(stage2_results, label_to_model),
+        # Models that were still answering when their stage moved on
+        "pending_models": {"stage1": stage1_pending, "stage2": stage2_pending},
+        "late_results": late_results,
+    })
 
     # Stage 3: Synthesize final answer
     stage3_result = await stage3_synthesize_final(
@@ -339,10 +669,11 @@ async def run_full_council(user_query: str) -> Tuple[List, List, Dict, Dict]:
         stage2_results
     )
 
-    # Prepare metadata
-    metadata = {
-        "label_to_model": label_to_model,
-        "aggregate_rankings": aggregate_rankings
+    metadata["timings"] = {
+        "stage1": round(stage1_done - started, 3),
+        "stage2": round(stage2_done - stage1_done, 3),
+        "stage3": round(time.monotonic() - stage2_done, 3),
+        "total": round(time.monotonic() - started, 3),
     }
 
     return stage1_results, stage2_results, stage3_result, metadata
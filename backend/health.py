@@ -0,0 +1,277 @@
+"""Per-model health tracking and circuit breakers for OpenRouter calls.
+
+Every finished call is recorded against its model. When the recent error
+rate (calls slower than CIRCUIT_SLOW_CALL_SECONDS count as errors) crosses
+CIRCUIT_ERROR_THRESHOLD, the model's circuit opens and calls fail fast
+instead of waiting for a dead upstream. After a cool-down the circuit goes
+half-open and lets a single probe through: success closes it again, failure
+re-opens it for twice as long (up to CIRCUIT_MAX_OPEN_SECONDS).
+
+Successful calls also feed two latency windows per model: complete-call
+latency (non-streamed calls) and time to first token (streamed calls). The
+two are never mixed, so hedge delays derived from complete calls are not
+pulled down by recent streaming.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .config import (
+    CIRCUIT_WINDOW_SIZE,
+    CIRCUIT_MIN_REQUESTS,
+    CIRCUIT_ERROR_THRESHOLD,
+    CIRCUIT_SLOW_CALL_SECONDS,
+    CIRCUIT_OPEN_SECONDS,
+    CIRCUIT_MAX_OPEN_SECONDS,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Latency kinds recorded for successful calls
+COMPLETE = "complete"
+TTFT = "ttft"
+
+
+class ModelHealth:
+    """Sliding window of recent outcomes and circuit state for one model."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = CLOSED
+        # (finished_at, ok, latency_seconds)
+        self.window: Deque[Tuple[float, bool, float]] = deque(maxlen=CIRCUIT_WINDOW_SIZE)
+        # Latencies (seconds) of recent successful calls, by kind
+        self.latencies: Dict[str, Deque[float]] = {
+            COMPLETE: deque(maxlen=CIRCUIT_WINDOW_SIZE),
+            TTFT: deque(maxlen=CIRCUIT_WINDOW_SIZE),
+        }
+        self.open_until = 0.0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.probe_in_flight = False
+        self.consecutive_failures = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.last_failure_at: Optional[str] = None
+
+    def error_rate(self) -> Optional[float]:
+        if not self.window:
+            return None
+        return sum(1 for _, ok, _ in self.window if not ok) / len(self.window)
+
+    def latency_percentile(self, percentile: float, kind: str = COMPLETE) -> Optional[float]:
+        """Latency (seconds) of recent successful calls of one kind at the given percentile."""
+        latencies = sorted(self.latencies[kind])
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, max(0, math.ceil(percentile / 100 * len(latencies)) - 1))
+        return latencies[index]
+
+    def refresh(self, now: float):
+        """Move an open circuit to half-open once its cool-down has passed."""
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+
+    def trip(self, now: float, reopen: bool):
+        if reopen:
+            self.open_seconds = min(self.open_seconds * 2, CIRCUIT_MAX_OPEN_SECONDS)
+        else:
+            self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.state = OPEN
+        self.open_until = now + self.open_seconds
+        self.probe_in_flight = False
+        print(f"Circuit opened for model {self.model} for {self.open_seconds:.0f}s (last error: {self.last_error})")
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        self.refresh(now)
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        ttft_p50 = self.latency_percentile(50, TTFT)
+        ttft_p95 = self.latency_percentile(95, TTFT)
+        error_rate = self.error_rate()
+        return {
+            "model": self.model,
+            "state": self.state,
+            "window_requests": len(self.window),
+            "error_rate": round(error_rate, 3) if error_rate is not None else None,
+            "latency_p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "ttft_p50_ms": round(ttft_p50 * 1000) if ttft_p50 is not None else None,
+            "ttft_p95_ms": round(ttft_p95 * 1000) if ttft_p95 is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "total_successes": self.total_successes,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(self.open_until - now, 1) if self.state == OPEN else None,
+            "last_error": self.last_error,
+            "last_failure_at": self.last_failure_at,
+        }
+
+
+_models: Dict[str, ModelHealth] = {}
+_lock = threading.Lock()
+
+
+def _get(model: str) -> ModelHealth:
+    health = _models.get(model)
+    if health is None:
+        health = _models[model] = ModelHealth(model)
+    return health
+
+
+def is_available(model: str) -> bool:
+    """Whether a call to the model would currently be let through (does not reserve a probe)."""
+    with _lock:
+        health = _models.get(model)
+        if health is None:
+            return True
+        health.refresh(time.monotonic())
+        return health.state == CLOSED or (health.state == HALF_OPEN and not health.probe_in_flight)
+
+
+def allow_request(model: str) -> bool:
+    """
+    Admit a call to the model, or reject it because its circuit is open.
+
+    In the half-open state only one probe call is admitted at a time.
+    """
+    with _lock:
+        health = _get(model)
+        health.refresh(time.monotonic())
+        if health.state == CLOSED:
+            return True
+        if health.state == HALF_OPEN and not health.probe_in_flight:
+            health.probe_in_flight = True
+            return True
+        health.rejected += 1
+        return False
+
+
+def record_success(model: str, latency: float, kind: str = COMPLETE):
+    """
+    Record a finished call; calls slower than CIRCUIT_SLOW_CALL_SECONDS count as failures.
+
+    Args:
+        model: OpenRouter model identifier
+        latency: Seconds the call took (COMPLETE) or until its first token (TTFT)
+        kind: Which latency window the measurement belongs to
+    """
+    if latency > CIRCUIT_SLOW_CALL_SECONDS:
+        record_failure(model, latency, f"Slow response ({latency:.0f}s)")
+        return
+
+    with _lock:
+        health = _get(model)
+        health.window.append((time.monotonic(), True, latency))
+        health.latencies[kind].append(latency)
+        health.total_successes += 1
+        health.consecutive_failures = 0
+        if health.state != CLOSED:
+            print(f"Circuit closed for model {model}")
+            health.state = CLOSED
+            health.open_seconds = CIRCUIT_OPEN_SECONDS
+            health.probe_in_flight = False
+
+
+def record_failure(model: str, latency: float, error: str):
+    """Record a failed call (server error, rate limit, timeout) and trip the circuit if needed."""
+    now = time.monotonic()
+    with _lock:
+        health = _get(model)
+        health.window.append((now, False, latency))
+        health.total_failures += 1
+        health.consecutive_failures += 1
+        health.last_error = error
+        health.last_failure_at = datetime.now().isoformat()
+
+        health.refresh(now)
+        if health.state == HALF_OPEN:
+            # The probe failed
+            health.trip(now, reopen=True)
+        elif health.state == CLOSED and len(health.window) >= CIRCUIT_MIN_REQUESTS:
+            if health.error_rate() >= CIRCUIT_ERROR_THRESHOLD:
+                health.trip(now, reopen=False)
+
+
+def unavailable_message(model: str) -> str:
+    """Error text reported for calls rejected by an open circuit."""
+    return f"Model {model} is temporarily unavailable (circuit open after repeated failures)"
+
+
+def release_probe(model: str):
+    """Give back a half-open probe slot for a call that ended without a verdict (e.g. cancelled)."""
+    with _lock:
+        health = _models.get(model)
+        if health is not None and health.state == HALF_OPEN:
+            health.probe_in_flight = False
+
+
+def filter_available(models: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split models into those to query and those skipped because their circuit is open.
+
+    If every model is unavailable, all of them are returned for querying, so a
+    stage never ends up with nobody to ask (the calls then fail fast or probe).
+
+    Returns:
+        Tuple of (models to query, skipped models)
+    """
+    models = list(models)
+    available = [m for m in models if is_available(m)]
+    if not available:
+        return models, []
+    skipped = [m for m in models if m not in available]
+    if skipped:
+        print(f"Skipping models with open circuits: {', '.join(skipped)}")
+    return available, skipped
+
+
+def latency_percentile(model: str, percentile: float, kind: str = COMPLETE) -> Optional[float]:
+    """Recent successful-call latency of a model in seconds, or None without data."""
+    with _lock:
+        health = _models.get(model)
+        return health.latency_percentile(percentile, kind) if health else None
+
+
+def mean_latency_above(model: str, threshold: float, kind: str = COMPLETE) -> Optional[float]:
+    """Mean latency (seconds) of the model's recent successful calls slower than `threshold`."""
+    with _lock:
+        health = _models.get(model)
+        if health is None:
+            return None
+        slow = [latency for latency in health.latencies[kind] if latency > threshold]
+        return sum(slow) / len(slow) if slow else None
+
+
+def get_health(models: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Return health snapshots for the given models (plus every model seen so far).
+
+    Args:
+        models: Models to always include, even without recorded calls
+
+    Returns:
+        List of per-model health dicts sorted by model id
+    """
+    now = time.monotonic()
+    with _lock:
+        for model in models or []:
+            _get(model)
+        return [_models[model].snapshot(now) for model in sorted(_models)]
+
+
+def reset(model: Optional[str] = None):
+    """Forget the history of one model (or of every model), closing its circuit."""
+    with _lock:
+        if model is None:
+            _models.clear()
+        else:
+            _models.pop(model, None)
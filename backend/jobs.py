@@ -0,0 +1,464 @@
+"""Background jobs for long-running test, suggestion and merge runs.
+
+Endpoints submit a job and return its id right away; a bounded pool of worker
+tasks runs the jobs. A job keeps its status, progress, partial model output
+and a log of its events, so clients can follow it over SSE, disconnect and
+re-subscribe without cancelling the work.
+
+Every event gets an id that increases by one within its job. The last
+JOB_EVENT_BUFFER events are kept, so a client that reconnects with the id of
+the last event it saw receives only what it missed. If the missed events are
+no longer buffered, it first receives a 'resync' snapshot of the partial
+output instead.
+
+Job records are written to JOBS_DIR whenever their status changes. Jobs that
+were still queued or running when the process stopped are reported as
+"interrupted" after a restart.
+"""
+
+import asyncio
+import json
+import os
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from . import storage_async
+from . import tracing
+from .config import JOB_WORKERS, JOB_HISTORY_LIMIT, JOB_EVENT_BUFFER
+from .storage_json import atomic_write_json
+
+# Directory holding persisted job records (in user's home directory)
+JOBS_DIR = os.path.join(os.path.expanduser("~"), ".llm-council", "jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Sentinel queued for subscribers once the job has finished
+_JOB_END = object()
+
+
+class Job:
+    """One unit of background work and everything clients may want to know about it."""
+
+    def __init__(
+        self,
+        kind: str,
+        session_id: Optional[str],
+        runner: Callable[["Job"], Awaitable[Any]],
+        key: Optional[Hashable] = None,
+        params: Optional[Dict[str, Any]] = None
+    ):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.session_id = session_id
+        self.params = params or {}
+        self.key = key
+        self.runner = runner
+        self.status = QUEUED
+        self.progress = {"completed": 0, "total": 0}
+        # model (or "<sample id>:<model>" for batch runs) -> output streamed so far
+        self.partial: Dict[str, str] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        # (event id, event) pairs, oldest first
+        self.events: "deque[Tuple[int, Dict[str, Any]]]" = deque(maxlen=JOB_EVENT_BUFFER)
+        self.last_event_id = 0
+        self.task: Optional[asyncio.Task] = None
+        # Span of the request that submitted the job; the job's own span hangs off it
+        self.trace_parent = tracing.current_span()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+    def set_total(self, total: int):
+        """Set the number of steps (usually models) the job will complete."""
+        self.progress["total"] = total
+
+    def emit(self, event: Dict[str, Any]):
+        """
+        Number an event, record it and deliver it to every subscriber.
+
+        Model 'delta' events extend the partial output, and 'model_done' /
+        'error' events advance the progress.
+        """
+        model = event.get("model")
+        if model is not None:
+            if event.get("sample_id") is not None:
+                model = f"{event['sample_id']}:{model}"
+            if event.get("type") == "delta":
+                self.partial[model] = self.partial.get(model, "") + event.get("content", "")
+            elif event.get("type") in ("model_done", "error"):
+                self.progress["completed"] += 1
+
+        self.last_event_id += 1
+        item = (self.last_event_id, event)
+        self.events.append(item)
+        for queue in self._subscribers:
+            queue.put_nowait(item)
+
+    async def wait(self):
+        """Wait until the job has finished (in any terminal status)."""
+        await self._done.wait()
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "session_id": self.session_id,
+            "params": self.params,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_event_id": self.last_event_id,
+        }
+        if include_result:
+            data["partial"] = dict(self.partial)
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Queue of jobs executed by a fixed number of worker tasks."""
+
+    def __init__(self, workers: int = JOB_WORKERS, jobs_dir: str = JOBS_DIR, history_limit: int = JOB_HISTORY_LIMIT):
+        self.worker_count = workers
+        self.jobs_dir = jobs_dir
+        self.history_limit = history_limit
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_keys: Dict[Hashable, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._recovered = False
+
+    # Lifecycle
+
+    def _ensure_workers(self):
+        """Start the worker pool on the running event loop (again, if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        self._loop = loop
+        # Jobs still waiting in the old queue move over, or they would stay queued forever
+        pending = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._queue = asyncio.Queue()
+        for job in pending:
+            if not job.finished:
+                self._queue.put_nowait(job)
+        self._workers = [loop.create_task(self._work()) for _ in range(self.worker_count)]
+
+    async def start(self):
+        """Start the workers and mark jobs left over from a previous run as interrupted."""
+        self._ensure_workers()
+        if not self._recovered:
+            self._recovered = True
+            await storage_async.run(self._recover)
+
+    async def shutdown(self):
+        """Cancel running jobs and stop the workers."""
+        for job in list(self._jobs.values()):
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # Submitting and running
+
+    async def submit(
+        self,
+        kind: str,
+        session_id: Optional[str],
+        runner: Callable[[Job], Awaitable[Any]],
+        key: Optional[Hashable] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Job, bool]:
+        """
+        Queue a job, or return the active job already submitted with the same key.
+
+        Args:
+            kind: Job type (e.g. "test", "suggest", "merge")
+            session_id: Session the job belongs to
+            runner: Coroutine function doing the work; receives the Job and returns its result
+            key: Identity of the work; an identical active job is reused instead
+            params: Request parameters to record with the job
+
+        Returns:
+            Tuple of (job, created) where created is False if an existing job was returned
+        """
+        self._ensure_workers()
+        if key is not None:
+            existing = self._active_keys.get(key)
+            if existing is not None and not existing.finished:
+                return existing, False
+
+        job = Job(kind, session_id, runner, key=key, params=params)
+        self._jobs[job.id] = job
+        if key is not None:
+            self._active_keys[key] = job
+        await self._persist(job)
+        self._queue.put_nowait(job)
+        return job, True
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            if job.finished:
+                # Cancelled while still queued
+                continue
+            job.task = asyncio.ensure_future(self._run(job))
+            try:
+                await asyncio.wait({job.task})
+            except asyncio.CancelledError:
+                job.task.cancel()
+                raise
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = datetime.now().isoformat()
+        job.emit({"type": "job_status", "job_id": job.id, "status": RUNNING})
+
+        with tracing.span(f"job.{job.kind}", parent=job.trace_parent, job_id=job.id, session_id=job.session_id) as job_span:
+            try:
+                await self._persist(job)
+                job.result = await job.runner(job)
+                job.status = SUCCEEDED
+            except asyncio.CancelledError:
+                job.status = CANCELLED
+                job_span.set_status(tracing.CANCELLED)
+            except Exception as e:
+                print(f"Job {job.id} ({job.kind}) failed: {e}")
+                traceback.print_exc()
+                job.status = FAILED
+                job.error = str(e) or type(e).__name__
+                job_span.set_status(tracing.ERROR, job.error)
+            await self._finish(job)
+
+    async def _finish(self, job: Job):
+        job.finished_at = datetime.now().isoformat()
+        if job.key is not None and self._active_keys.get(job.key) is job:
+            del self._active_keys[job.key]
+
+        event = {"type": "job_status", "job_id": job.id, "status": job.status}
+        if job.error:
+            event["error"] = job.error
+        job.emit(event)
+        for queue in job._subscribers:
+            queue.put_nowait(_JOB_END)
+        job._done.set()
+
+        await self._persist(job)
+        self._prune()
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            True if the job was active and is being cancelled
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            job.status = CANCELLED
+            asyncio.ensure_future(self._finish(job))
+        return True
+
+    # Queries
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def get_record(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job as a dict, from memory or (for older jobs) from disk."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return await storage_async.run(self._load, job_id)
+
+    def list_jobs(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the jobs kept in memory (newest first), optionally for one session."""
+        return [
+            job.to_dict(include_result=False)
+            for job in reversed(self._jobs.values())
+            if session_id is None or job.session_id == session_id
+        ]
+
+    async def subscribe(self, job: Job, after: int = 0) -> AsyncGenerator[Tuple[int, Dict[str, Any]], None]:
+        """
+        Yield the events of a job with their ids: first those already emitted, then live ones until it finishes.
+
+        Closing the generator only unsubscribes; the job keeps running.
+
+        Args:
+            job: Job to follow
+            after: Id of the last event the client already has (0 for all of them)
+
+        Yields:
+            Tuples of (event id, event)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        oldest = job.events[0][0] if job.events else job.last_event_id + 1
+        if after < oldest - 1:
+            # The events the client missed fell out of the buffer: send the state they add up to
+            queue.put_nowait((job.last_event_id, self._resync_event(job)))
+        else:
+            for item in job.events:
+                if item[0] > after:
+                    queue.put_nowait(item)
+        if job.finished:
+            queue.put_nowait(_JOB_END)
+        else:
+            job._subscribers.add(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _JOB_END:
+                    return
+                yield item
+        finally:
+            job._subscribers.discard(queue)
+
+    @staticmethod
+    def _resync_event(job: Job) -> Dict[str, Any]:
+        event = {
+            "type": "resync",
+            "job_id": job.id,
+            "status": job.status,
+            "progress": dict(job.progress),
+            "partial": dict(job.partial),
+        }
+        if job.finished:
+            event["result"] = job.result
+            event["error"] = job.error
+        return event
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.worker_count,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "by_status": counts,
+        }
+
+    # Persistence
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    async def _persist(self, job: Job):
+        try:
+            await storage_async.run(self._write, job.id, job.to_dict())
+        except OSError as e:
+            print(f"Could not persist job {job.id}: {e}")
+
+    def _write(self, job_id: str, data: Dict[str, Any]):
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        atomic_write_json(self._path(job_id), data)
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _recover(self):
+        """Mark persisted jobs that never finished as interrupted and drop the oldest records."""
+        if not os.path.isdir(self.jobs_dir):
+            return
+        paths = [os.path.join(self.jobs_dir, name) for name in os.listdir(self.jobs_dir) if name.endswith(".json")]
+        paths.sort(key=lambda path: os.path.getmtime(path), reverse=True)
+
+        for path in paths[self.history_limit:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        for path in paths[:self.history_limit]:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get("status") in ACTIVE_STATUSES:
+                data["status"] = INTERRUPTED
+                data["error"] = "The application stopped before the job finished"
+                atomic_write_json(path, data)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit (their records stay on disk)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.history_limit, 0)]:
+            del self._jobs[job_id]
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    Split an SSE event id of the form "<job id>:<event number>".
+
+    Returns:
+        Tuple of (job id, event number), or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+    job_id, _, number = value.strip().rpartition(":")
+    if not job_id or not number.isdigit():
+        return None
+    return job_id, int(number)
+
+
+def format_event_id(job: Job, event_id: int) -> str:
+    """Build the SSE event id sent for one event of a job."""
+    return f"{job.id}:{event_id}"
+
+
+_manager: Optional[JobManager] = None
+
+
+def get_manager() -> JobManager:
+    """Return the process-wide job manager, creating it on first use."""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
+
+
+def set_manager(manager: JobManager) -> Optional[JobManager]:
+    """
+    Replace the process-wide job manager (e.g. for benchmarks); call before it is started.
+
+    Returns:
+        The previous job manager, if any
+    """
+    global _manager
+    previous, _manager = _manager, manager
+    return previous
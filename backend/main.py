@@ -1,10 +1,13 @@
 """FastAPI backend for Prompt Optimizer."""
 
+import json
 import os
 import sys
 import traceback
+from contextlib import asynccontextmanager
+from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
@@ -12,19 +15,64 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import uuid
 
-from . import storage
+from . import storage_async
+from . import telemetry
+from . import tracing
+from . import profiler
+from .storage import SessionConflictError
 from .optimizer import (
     generate_initial_prompt,
     generate_prompt_title,
-    test_prompt_with_models,
-    collect_improvement_suggestions,
+    build_suggestion_messages,
     merge_suggestions,
     calculate_iteration_metrics,
+    calculate_batch_metrics,
+    calculate_performance_metrics,
+    iteration_call_records,
     create_version_diff
 )
-from .settings import get_settings, save_settings
+from .settings import get_settings, save_settings, reset_settings, to_dict as settings_to_dict
+from . import health
+from . import response_cache
+from . import jobs
+from . import ratelimit
+from .streaming import stream_models, stream_matrix
+from .config import (
+    BATCH_CONCURRENCY,
+    PROFILER_INTERVAL_MS,
+    PROFILER_MAX_SECONDS,
+    SLOW_CALLBACK_MS,
+    LOOP_MONITOR_ENABLED,
+)
+from .openrouter import init_http_client, close_http_client, get_hedge_stats, get_coalescing_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create process-wide resources on startup and release them on shutdown."""
+    await init_http_client()
+    await jobs.get_manager().start()
+    if LOOP_MONITOR_ENABLED:
+        profiler.get_loop_monitor().start(SLOW_CALLBACK_MS / 1000)
+    try:
+        yield
+    finally:
+        profiler.get_profiler().stop()
+        profiler.get_loop_monitor().stop()
+        await jobs.get_manager().shutdown()
+        await close_http_client()
+        # Let queued session writes finish before the process exits
+        storage_async.shutdown(wait=True)
+        tracing.shutdown()
+
 
-app = FastAPI(title="Prompt Optimizer API")
+app = FastAPI(title="Prompt Optimizer API", lifespan=lifespan)
+
+
+@app.exception_handler(SessionConflictError)
+async def session_conflict_handler(request: Request, exc: SessionConflictError):
+    """Report a write that kept losing to concurrent writers as 409 so the client can reload."""
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
 
 
 @app.exception_handler(Exception)
@@ -58,8 +106,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count"],
 )
 
+# Outermost, so /metrics sees every request (including CORS preflights)
+app.add_middleware(tracing.TracingMiddleware)
+app.add_middleware(telemetry.MetricsMiddleware)
+
+telemetry.JOBS.set_function(lambda: {
+    (status,): count for status, count in jobs.get_manager().get_stats()["by_status"].items()
+})
+telemetry.JOBS_QUEUED.set_function(lambda: jobs.get_manager().get_stats()["queued"])
+telemetry.RATE_LIMIT_IN_FLIGHT.set_function(lambda: {
+    (limit["name"],): limit["in_flight"] for limit in ratelimit.get_limiter().get_stats()["limits"]
+})
+telemetry.RATE_LIMIT_QUEUED.set_function(lambda: {
+    (name,): stats["queued"] for name, stats in ratelimit.get_limiter().get_stats()["priorities"].items()
+})
+
 
 # Request/Response Models
 class CreateSessionRequest(BaseModel):
@@ -79,6 +143,15 @@ class TestPromptRequest(BaseModel):
     """Request to test a prompt with models."""
     models: Optional[List[str]] = None
     test_sample_id: str
+    bypass_cache: bool = False
+
+
+class BatchTestRequest(BaseModel):
+    """Request to test a prompt on several test samples with several models."""
+    models: Optional[List[str]] = None
+    test_sample_ids: Optional[List[str]] = None
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    bypass_cache: bool = False
 
 
 class TestSampleCreateRequest(BaseModel):
@@ -134,6 +207,11 @@ class SettingsResponse(BaseModel):
     test_models: List[str] = Field(default_factory=list)
     synthesizer_model: str
     generator_model: str
+    retry_policy: Dict[str, Any] = Field(default_factory=dict)
+    hedging: Dict[str, Any] = Field(default_factory=dict)
+    response_cache: Dict[str, Any] = Field(default_factory=dict)
+    rate_limits: Dict[str, Any] = Field(default_factory=dict)
+    council_pipeline: Dict[str, Any] = Field(default_factory=dict)
 
 
 class SettingsUpdateRequest(BaseModel):
@@ -143,6 +221,19 @@ class SettingsUpdateRequest(BaseModel):
     test_models: Optional[List[str]] = None
     synthesizer_model: Optional[str] = None
     generator_model: Optional[str] = None
+    retry_policy: Optional[Dict[str, Any]] = None
+    hedging: Optional[Dict[str, Any]] = None
+    response_cache: Optional[Dict[str, Any]] = None
+    rate_limits: Optional[Dict[str, Any]] = None
+    council_pipeline: Optional[Dict[str, Any]] = None
+
+
+class ProfilerStartRequest(BaseModel):
+    """Request to start the sampling profiler."""
+    seconds: float = Field(default=10.0, gt=0, le=PROFILER_MAX_SECONDS)
+    interval_ms: float = Field(default=PROFILER_INTERVAL_MS, ge=1)
+    include_tasks: bool = True
+    slow_callback_ms: Optional[float] = Field(default=SLOW_CALLBACK_MS, gt=0)
 
 
 class RestoreVersionRequest(BaseModel):
@@ -172,6 +263,7 @@ class Session(BaseModel):
     prompt_title: Optional[str] = None
     current_version: int = 0
     stage: str = "init"
+    revision: int = 0
     test_set: List[Dict[str, Any]] = Field(default_factory=list)
     iterations: List[Dict[str, Any]]
 
@@ -207,6 +299,73 @@ async def root():
     return {"status": "ok", "service": "Prompt Optimizer API"}
 
 
+@app.get("/metrics")
+async def get_prometheus_metrics():
+    """Expose request, model call, storage and job metrics in the Prometheus text format."""
+    return Response(content=telemetry.render(), media_type=telemetry.CONTENT_TYPE)
+
+
+def _profile_response() -> Response:
+    """Return the last profile as a collapsed-stack file (for flamegraph.pl or speedscope)."""
+    started = (profiler.get_profiler().started_at or "").replace(":", "").split(".")[0]
+    return Response(
+        content=profiler.get_profiler().folded(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="profile-{started}.folded"'},
+    )
+
+
+@app.post("/api/admin/profiler/start")
+async def start_profiler(request: ProfilerStartRequest, wait: bool = Query(False)):
+    """
+    Start the sampling profiler for a number of seconds.
+
+    Returns its status right away; pass wait=true to wait for the run to end
+    and receive the collapsed-stack profile instead. Unless the event loop is
+    already being watched, slow callbacks are reported while it runs.
+    """
+    sampler = profiler.get_profiler()
+    try:
+        sampler.start(
+            request.seconds,
+            request.interval_ms / 1000,
+            include_tasks=request.include_tasks,
+            slow_callback_threshold=request.slow_callback_ms / 1000 if request.slow_callback_ms else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not wait:
+        return sampler.get_status()
+    await sampler.wait()
+    return _profile_response()
+
+
+@app.post("/api/admin/profiler/stop")
+async def stop_profiler():
+    """Stop the sampling profiler before its time is up."""
+    sampler = profiler.get_profiler()
+    sampler.stop()
+    return sampler.get_status()
+
+
+@app.get("/api/admin/profiler")
+async def get_profiler_status():
+    """Return the state of the sampling profiler and the slow callbacks reported so far."""
+    return {
+        "profiler": profiler.get_profiler().get_status(),
+        "loop_monitor": profiler.get_loop_monitor().get_status(),
+    }
+
+
+@app.get("/api/admin/profiler/profile")
+async def get_profile():
+    """Download the samples of the current or last run as a collapsed-stack file."""
+    if profiler.get_profiler().started_at is None:
+        raise HTTPException(status_code=404, detail="The profiler has not been run yet")
+    return _profile_response()
+
+
 @app.get("/api/settings/status")
 async def get_settings_status():
     """Check if OpenRouter API key is configured."""
@@ -220,7 +379,7 @@ async def get_settings_status():
 @app.get("/api/settings", response_model=SettingsResponse)
 async def get_app_settings():
     """Return current application settings."""
-    return get_settings()
+    return settings_to_dict(get_settings())
 
 
 @app.post("/api/settings", response_model=SettingsResponse)
@@ -228,35 +387,90 @@ async def update_app_settings(request: SettingsUpdateRequest):
     """Update application settings."""
     updates = {k: v for k, v in request.dict().items() if v is not None}
     if not updates:
-        return get_settings()
+        return settings_to_dict(get_settings())
 
-    return save_settings(updates)
+    return settings_to_dict(save_settings(updates))
 
 
 @app.post("/api/settings/reset", response_model=SettingsResponse)
 async def reset_app_settings():
     """Reset application settings to defaults."""
-    from .settings import DEFAULT_SETTINGS, _write_settings
-    from copy import deepcopy
+    return settings_to_dict(reset_settings())
+
+
+@app.get("/api/models/health")
+async def get_models_health():
+    """Return recent error rate, latency and circuit breaker state for each model."""
+    settings = get_settings()
+    configured = list(settings.get("test_models", [])) + [
+        settings.get("synthesizer_model"),
+        settings.get("generator_model"),
+    ]
+    return {
+        "models": health.get_health(m for m in configured if m),
+        "hedging": get_hedge_stats(),
+        "coalescing": get_coalescing_stats(),
+        "jobs": jobs.get_manager().get_stats(),
+        "rate_limits": ratelimit.get_limiter().get_stats(),
+    }
+
+
+@app.post("/api/models/health/reset")
+async def reset_models_health(model: Optional[str] = None):
+    """Close the circuit and forget the history of one model (or all models)."""
+    health.reset(model)
+    return {"status": "reset", "model": model}
 
-    default = deepcopy(DEFAULT_SETTINGS)
-    default["openrouter_api_key"] = None
 
-    _write_settings(default)
-    return default
+@app.get("/api/cache/responses")
+async def get_response_cache_stats():
+    """Return hit rate and size of the on-disk response cache."""
+    return await storage_async.run(response_cache.get_cache().get_stats)
+
+
+@app.delete("/api/cache/responses")
+async def clear_response_cache():
+    """Delete every cached model response."""
+    removed = await storage_async.run(response_cache.get_cache().clear)
+    return {"status": "cleared", "removed": removed}
 
 
 @app.get("/api/sessions", response_model=List[SessionMetadata])
-async def list_sessions():
-    """List all optimization sessions (metadata only)."""
-    return storage.list_sessions()
+async def list_sessions(
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    sort: str = "last_modified",
+    order: str = "desc"
+):
+    """
+    List optimization sessions (metadata only).
+
+    Supports pagination via offset/limit and sorting via sort/order.
+    The total number of sessions is returned in the X-Total-Count header.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Order must be 'asc' or 'desc'")
+
+    try:
+        sessions, total = await storage_async.list_sessions(
+            offset=offset,
+            limit=limit,
+            sort_by=sort,
+            descending=order == "desc"
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    response.headers["X-Total-Count"] = str(total)
+    return sessions
 
 
 @app.post("/api/sessions", response_model=Session)
 async def create_session(request: CreateSessionRequest):
     """Create a new optimization session."""
     session_id = str(uuid.uuid4())
-    session = storage.create_session(
+    session = await storage_async.create_session(
         session_id,
         title=request.title or "New Optimization Session",
         objective=request.objective
@@ -268,7 +482,7 @@ async def create_session(request: CreateSessionRequest):
 async def list_test_samples(session_id: str):
     """List test samples for a session."""
     try:
-        samples = storage.list_test_samples(session_id)
+        samples = await storage_async.list_test_samples(session_id)
     except ValueError:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"samples": samples}
@@ -278,7 +492,7 @@ async def list_test_samples(session_id: str):
 async def create_test_sample(session_id: str, request: TestSampleCreateRequest):
     """Create a test sample for a session."""
     try:
-        sample = storage.add_test_sample(
+        sample = await storage_async.add_test_sample(
             session_id,
             title=request.title,
             test_input=request.test_input,
@@ -294,7 +508,7 @@ async def create_test_sample(session_id: str, request: TestSampleCreateRequest):
 async def update_test_sample(session_id: str, sample_id: str, request: TestSampleUpdateRequest):
     """Update a test sample."""
     try:
-        sample = storage.update_test_sample(
+        sample = await storage_async.update_test_sample(
             session_id,
             sample_id,
             title=request.title,
@@ -311,7 +525,7 @@ async def update_test_sample(session_id: str, sample_id: str, request: TestSampl
 async def delete_test_sample(session_id: str, sample_id: str):
     """Delete a test sample."""
     try:
-        storage.delete_test_sample(session_id, sample_id)
+        await storage_async.delete_test_sample(session_id, sample_id)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
 
@@ -321,7 +535,7 @@ async def delete_test_sample(session_id: str, sample_id: str):
 @app.get("/api/sessions/{session_id}", response_model=Session)
 async def get_session(session_id: str):
     """Get a specific session with all its iterations."""
-    session = storage.get_session(session_id)
+    session = await storage_async.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
@@ -331,7 +545,7 @@ async def get_session(session_id: str):
 async def delete_session(session_id: str):
     """Delete a session."""
     try:
-        storage.delete_session(session_id)
+        await storage_async.delete_session(session_id)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
 
@@ -341,7 +555,7 @@ async def delete_session(session_id: str):
 @app.delete("/api/sessions")
 async def delete_all_sessions():
     """Delete all sessions."""
-    count = storage.delete_all_sessions()
+    count = await storage_async.delete_all_sessions()
     return {"status": "deleted", "count": count}
 
 
@@ -352,7 +566,7 @@ async def initialize_prompt(session_id: str, request: InitializePromptRequest):
     Either generate from objective or use provided prompt.
     """
     # Check if session exists
-    session = storage.get_session(session_id)
+    session = await storage_async.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -385,7 +599,7 @@ async def initialize_prompt(session_id: str, request: InitializePromptRequest):
     except Exception:
         prompt_title = (prompt or "Prompt")[:20] or "Prompt"
 
-    session = storage.add_iteration(
+    session = await storage_async.add_iteration(
         session_id,
         prompt=prompt,
         change_rationale=change_rationale,
@@ -402,194 +616,349 @@ async def initialize_prompt(session_id: str, request: InitializePromptRequest):
     }
 
 
-@app.post("/api/sessions/{session_id}/test")
-async def test_prompt(session_id: str, request: TestPromptRequest):
-    """
-    Test the current prompt with selected models.
-    """
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _test_messages(prompt: str, test_input: Optional[str]) -> List[Dict[str, str]]:
+    """Build the messages sending a prompt (and optional test input) to a model."""
+    if test_input:
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": test_input}
+        ]
+    return [{"role": "user", "content": prompt}]
+
+
+def _track_test_event(results: Dict[str, Dict[str, Any]], event: Dict[str, Any]):
+    """Record a model's 'model_done' or 'error' stream event in the per-model results."""
+    result = results[event["model"]]
+    if event.get("metrics"):
+        result["metrics"] = event["metrics"]
+    if event["type"] == "model_done":
+        result["output"] = event["output"]
+        result["retries"] = event.get("retries", 0)
+        result["cached"] = event.get("cached", False)
+    elif event["type"] == "error":
+        result["error"] = event["error"]
+        result["output"] = f"[Error: {event['error']}]"
+        result["retries"] = event.get("retries", 0)
+
+
+def _build_test_results(models: List[str], results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn the per-model results tracked while streaming into stored test results."""
+    test_results = []
+    for model in models:
+        result = results[model]
+        metrics = result.get("metrics")
+        test_result = {
+            "model": model,
+            "output": result["output"],
+            "response_time": metrics["duration"] if metrics else 0,
+            "retries": result["retries"],
+            "rating": None,
+            "feedback": None,
+            "error": result["error"] is not None,
+            "error_detail": result["error"]
+        }
+        if result["cached"]:
+            test_result["cached"] = True
+        if metrics:
+            test_result["metrics"] = metrics
+        test_results.append(test_result)
+    return test_results
+
+
+def _new_test_results(models: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Create the per-model results filled in by _track_test_event."""
+    return {model: {"model": model, "output": "", "error": None, "retries": 0, "cached": False} for model in models}
+
+
+def _test_job_runner(session_id: str, iteration: Dict[str, Any], sample: Dict[str, Any], models: List[str], use_cache: bool):
+    """Create the job runner that tests a prompt version on a test sample and stores the results."""
+    messages = _test_messages(iteration["prompt"], sample.get("input"))
+
+    async def run(job: jobs.Job) -> Dict[str, Any]:
+        job.set_total(len(models))
+        job.emit({"type": "start", "models": models, "job_id": job.id})
+
+        # Track results for each model
+        results = _new_test_results(models)
+
+        # Run all model streams concurrently; events arrive as soon as any model produces them
+        async for event in stream_models(models, messages, result_key="output", stage="test", use_cache=use_cache):
+            job.emit(event)
+            _track_test_event(results, event)
+
+        test_results = _build_test_results(models, results)
+
+        # Update the iteration with test results
+        await storage_async.update_iteration_test_results(
+            session_id,
+            iteration["version"],
+            test_results,
+            test_sample_id=sample["id"],
+            test_sample_title=sample.get("title"),
+            test_sample_input=sample.get("input"),
+            stage="tested",
+            clear_feedback=True,
+            clear_suggestions=True
+        )
+
+        # Advance stage after successful testing
+        session = await storage_async.update_session_meta(session_id, stage="tested", current_version=iteration["version"])
+
+        job.emit({"type": "complete", "test_results": test_results, "version": iteration["version"], "stage": session.get("stage")})
+        return {
+            "version": iteration["version"],
+            "test_results": test_results,
+            "stage": session.get("stage"),
+            "test_sample": sample,
+        }
+
+    return run
+
+
+async def _submit_test_job(session_id: str, request: TestPromptRequest) -> jobs.Job:
+    """Validate a test request and submit its job (or attach to an identical running one)."""
     # Get the latest iteration
-    iteration = storage.get_active_iteration(session_id)
+    iteration = await storage_async.get_active_iteration(session_id)
     if iteration is None:
         raise HTTPException(status_code=404, detail="No iterations found. Initialize prompt first.")
 
     if not request.test_sample_id or not request.test_sample_id.strip():
         raise HTTPException(status_code=400, detail="A test sample must be selected.")
 
-    sample = storage.get_test_sample(session_id, request.test_sample_id)
+    sample = await storage_async.get_test_sample(session_id, request.test_sample_id)
     if not sample:
         raise HTTPException(status_code=404, detail="Test sample not found")
 
-    # Use provided models or default to settings
-    if request.models:
-        models = request.models
-    else:
-        settings = get_settings()
-        models = settings.get("test_models", [])
-
-    # Test the prompt
-    test_results = await test_prompt_with_models(
-        iteration["prompt"],
-        models=models,
-        test_input=sample.get("input")
-    )
+    # Use provided models or default to settings; streams run each model once
+    models = list(dict.fromkeys(request.models or get_settings().get("test_models", [])))
 
-    # Update the iteration with test results
-    storage.update_iteration_test_results(
+    job, _ = await jobs.get_manager().submit(
+        "test",
         session_id,
-        iteration["version"],
-        test_results,
-        test_sample_id=sample["id"],
-        test_sample_title=sample.get("title"),
-        test_sample_input=sample.get("input"),
-        stage="tested",
-        clear_feedback=True,
-        clear_suggestions=True
+        _test_job_runner(session_id, iteration, sample, models, use_cache=not request.bypass_cache),
+        # /test and /test/stream share the key, so a second identical request attaches to the running job
+        key=("test", session_id, iteration["version"], sample["id"], tuple(models), request.bypass_cache),
+        params={"version": iteration["version"], "test_sample_id": sample["id"], "models": models},
     )
+    return job
 
-    # Advance stage after successful testing
-    session = storage.update_session_meta(session_id, stage="tested", current_version=iteration["version"])
 
-    return {
-        "version": iteration["version"],
-        "test_results": test_results,
-        "stage": session.get("stage"),
-        "test_sample": sample,
-    }
+async def _job_response(job: jobs.Job, wait: bool):
+    """
+    Answer a job submission.
+
+    Returns the job record with HTTP 202, or, when `wait` is set, waits for the
+    job and returns its result like the endpoint did before jobs existed.
+    """
+    if not wait:
+        return JSONResponse(status_code=202, content=job.to_dict(include_result=False))
+
+    await job.wait()
+    if job.status != jobs.SUCCEEDED:
+        raise HTTPException(status_code=500, detail=job.error or f"Job {job.status}")
+    return job.result
+
+
+async def _job_event_stream(job: jobs.Job, after: int = 0):
+    """
+    Serialize the events of a job as SSE, each with an id usable as Last-Event-ID.
+
+    Disconnecting does not cancel the job.
+    """
+    telemetry.SSE_STREAMS.inc()
+    try:
+        async for event_id, event in jobs.get_manager().subscribe(job, after):
+            message = f"id: {jobs.format_event_id(job, event_id)}\ndata: {json.dumps(event)}\n\n"
+            telemetry.SSE_EVENTS.labels(event.get("type", "")).inc()
+            telemetry.SSE_BYTES.inc(len(message))
+            yield message
+    finally:
+        telemetry.SSE_STREAMS.dec()
+
+
+def _resumed_job_stream(session_id: str, kind: str, last_event_id: Optional[str]) -> Optional[StreamingResponse]:
+    """
+    Continue the stream of an earlier job when a client reconnects with Last-Event-ID.
+
+    Returns:
+        The SSE response with only the events after that id, or None if the
+        job is unknown (the request then starts or attaches to a job as usual)
+    """
+    parsed = jobs.parse_event_id(last_event_id)
+    if parsed is None:
+        return None
+    job = jobs.get_manager().get(parsed[0])
+    if job is None or job.kind != kind or job.session_id != session_id:
+        return None
+    return StreamingResponse(_job_event_stream(job, parsed[1]), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@app.post("/api/sessions/{session_id}/test")
+async def test_prompt(session_id: str, request: TestPromptRequest, wait: bool = Query(False)):
+    """
+    Test the current prompt with selected models.
+
+    Runs as a background job and returns its id right away (HTTP 202); pass
+    wait=true to wait for the test results instead.
+    """
+    job = await _submit_test_job(session_id, request)
+    return await _job_response(job, wait)
 
 
 @app.post("/api/sessions/{session_id}/test/stream")
-async def test_prompt_stream(session_id: str, request: TestPromptRequest):
+async def test_prompt_stream(
+    session_id: str,
+    request: TestPromptRequest,
+    last_event_id: Optional[str] = Header(None)
+):
     """
     Test the current prompt with selected models using streaming.
     Returns Server-Sent Events (SSE) with real-time model outputs.
+
+    A client reconnecting with Last-Event-ID resumes the same run after that event.
     """
-    import json
-    import asyncio
-    from .openrouter import query_model_stream
-    from .settings import get_settings
+    resumed = _resumed_job_stream(session_id, "test", last_event_id)
+    if resumed is not None:
+        return resumed
+
+    job = await _submit_test_job(session_id, request)
+    return StreamingResponse(_job_event_stream(job), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+def _batch_job_runner(
+    session_id: str,
+    iteration: Dict[str, Any],
+    samples: List[Dict[str, Any]],
+    models: List[str],
+    concurrency: int,
+    use_cache: bool
+):
+    """Create the job runner that tests a prompt version on every given sample and stores the matrix."""
+    rows = {sample["id"]: _test_messages(iteration["prompt"], sample.get("input")) for sample in samples}
+
+    async def run(job: jobs.Job) -> Dict[str, Any]:
+        job.set_total(len(samples) * len(models))
+        job.emit({
+            "type": "start",
+            "job_id": job.id,
+            "models": models,
+            "samples": [{"id": sample["id"], "title": sample.get("title")} for sample in samples],
+        })
 
-    # Get the latest iteration
-    iteration = storage.get_active_iteration(session_id)
-    if iteration is None:
-        raise HTTPException(status_code=404, detail="No iterations found. Initialize prompt first.")
+        results = {sample["id"]: _new_test_results(models) for sample in samples}
+        remaining = {sample["id"]: len(models) for sample in samples}
+        sample_results: Dict[str, Dict[str, Any]] = {}
+
+        # Batch calls yield to interactive ones when upstream slots are scarce
+        with ratelimit.priority(ratelimit.BACKGROUND):
+            async for sample_id, event in stream_matrix(
+                rows, models, result_key="output", stage="test", use_cache=use_cache, concurrency=concurrency
+            ):
+                job.emit({**event, "sample_id": sample_id})
+                _track_test_event(results[sample_id], event)
+
+                if event["type"] in ("model_done", "error"):
+                    remaining[sample_id] -= 1
+                    if remaining[sample_id] == 0:
+                        # Every model answered this sample: its row of the matrix is final
+                        test_results = _build_test_results(models, results[sample_id])
+                        sample_results[sample_id] = {"test_results": test_results}
+                        job.emit({
+                            "type": "sample_done",
+                            "sample_id": sample_id,
+                            "test_results": test_results,
+                            "metrics": calculate_iteration_metrics({"test_results": test_results}),
+                        })
+
+        samples_by_id = {sample["id"]: sample for sample in samples}
+        for sample_id, entry in sample_results.items():
+            entry["test_sample_title"] = samples_by_id[sample_id].get("title")
+            entry["test_sample_input"] = samples_by_id[sample_id].get("input")
+
+        batch_results = {
+            "models": models,
+            "completed_at": datetime.now().isoformat(),
+            "samples": {sample["id"]: sample_results[sample["id"]] for sample in samples},
+        }
+        batch_results["metrics"] = calculate_batch_metrics(batch_results["samples"])
 
-    if not request.test_sample_id or not request.test_sample_id.strip():
-        raise HTTPException(status_code=400, detail="A test sample must be selected.")
+        await storage_async.update_iteration_batch_results(session_id, iteration["version"], batch_results)
 
-    sample = storage.get_test_sample(session_id, request.test_sample_id)
-    if not sample:
-        raise HTTPException(status_code=404, detail="Test sample not found")
+        job.emit({"type": "complete", "version": iteration["version"], **batch_results})
+        return {"version": iteration["version"], **batch_results}
 
-    # Use provided models or default to settings
-    settings = get_settings()
-    models = request.models if request.models else settings.get("test_models", [])
+    return run
 
-    # Prepare messages
-    test_input = sample.get("input")
-    if test_input:
-        messages = [
-            {"role": "system", "content": iteration["prompt"]},
-            {"role": "user", "content": test_input}
-        ]
+
+async def _submit_batch_job(session_id: str, request: BatchTestRequest) -> jobs.Job:
+    """Validate a batch test request and submit its job (or attach to an identical running one)."""
+    iteration = await storage_async.get_active_iteration(session_id)
+    if iteration is None:
+        raise HTTPException(status_code=404, detail="No iterations found. Initialize prompt first.")
+
+    test_set = await storage_async.list_test_samples(session_id)
+    if request.test_sample_ids:
+        by_id = {sample["id"]: sample for sample in test_set}
+        missing = [sample_id for sample_id in request.test_sample_ids if sample_id not in by_id]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Test sample not found: {', '.join(missing)}")
+        samples = [by_id[sample_id] for sample_id in dict.fromkeys(request.test_sample_ids)]
     else:
-        messages = [{"role": "user", "content": iteration["prompt"]}]
+        samples = test_set
+    if not samples:
+        raise HTTPException(status_code=400, detail="The session has no test samples.")
+
+    models = list(dict.fromkeys(request.models or get_settings().get("test_models", [])))
+    if not models:
+        raise HTTPException(status_code=400, detail="No models selected.")
+    concurrency = request.concurrency or BATCH_CONCURRENCY
+    sample_ids = [sample["id"] for sample in samples]
+
+    job, _ = await jobs.get_manager().submit(
+        "batch",
+        session_id,
+        _batch_job_runner(session_id, iteration, samples, models, concurrency, use_cache=not request.bypass_cache),
+        key=("batch", session_id, iteration["version"], tuple(sample_ids), tuple(models), request.bypass_cache),
+        params={"version": iteration["version"], "test_sample_ids": sample_ids, "models": models, "concurrency": concurrency},
+    )
+    return job
 
-    async def generate_stream():
-        # Send initial event with models list
-        yield f"data: {json.dumps({'type': 'start', 'models': models})}\n\n"
 
-        # Track results for each model
-        results = {model: {"model": model, "output": "", "error": None} for model in models}
-
-        # Create tasks for all models
-        async def stream_model(model: str):
-            content_buffer = ""
-            try:
-                async for chunk in query_model_stream(model, messages):
-                    if chunk["type"] == "delta":
-                        content_buffer += chunk["content"]
-                        yield model, {"type": "delta", "model": model, "content": chunk["content"]}
-                    elif chunk["type"] == "error":
-                        yield model, {"type": "error", "model": model, "error": chunk["error"]}
-                        return
-                    elif chunk["type"] == "done":
-                        yield model, {"type": "model_done", "model": model, "output": content_buffer}
-                        return
-                # If we exit without done, still mark as complete
-                yield model, {"type": "model_done", "model": model, "output": content_buffer}
-            except Exception as e:
-                yield model, {"type": "error", "model": model, "error": str(e)}
-
-        # Run all model streams concurrently
-        async def run_all_streams():
-            model_generators = {model: stream_model(model) for model in models}
-            active_generators = set(models)
-
-            while active_generators:
-                for model in list(active_generators):
-                    gen = model_generators[model]
-                    try:
-                        _, event = await gen.__anext__()
-                        yield f"data: {json.dumps(event)}\n\n"
-
-                        if event["type"] == "model_done":
-                            results[model]["output"] = event["output"]
-                            active_generators.discard(model)
-                        elif event["type"] == "error":
-                            results[model]["error"] = event["error"]
-                            results[model]["output"] = f"[Error: {event['error']}]"
-                            active_generators.discard(model)
-                    except StopAsyncIteration:
-                        active_generators.discard(model)
-
-                if active_generators:
-                    await asyncio.sleep(0.01)
-
-        async for event_data in run_all_streams():
-            yield event_data
-
-        # Build final test results
-        test_results = []
-        for model in models:
-            result = results[model]
-            test_results.append({
-                "model": model,
-                "output": result["output"],
-                "response_time": 0,
-                "rating": None,
-                "feedback": None,
-                "error": result["error"] is not None,
-                "error_detail": result["error"]
-            })
+@app.post("/api/sessions/{session_id}/test/batch")
+async def test_prompt_batch(session_id: str, request: BatchTestRequest, wait: bool = Query(False)):
+    """
+    Test the current prompt on every test sample (or the given ones) with the selected models.
 
-        # Update the iteration with test results
-        storage.update_iteration_test_results(
-            session_id,
-            iteration["version"],
-            test_results,
-            test_sample_id=sample["id"],
-            test_sample_title=sample.get("title"),
-            test_sample_input=sample.get("input"),
-            stage="tested",
-            clear_feedback=True,
-            clear_suggestions=True
-        )
+    Runs as a background job and returns its id right away (HTTP 202); pass
+    wait=true to wait for the result matrix instead.
+    """
+    job = await _submit_batch_job(session_id, request)
+    return await _job_response(job, wait)
 
-        # Advance stage after successful testing
-        session = storage.update_session_meta(session_id, stage="tested", current_version=iteration["version"])
-
-        # Send final complete event
-        yield f"data: {json.dumps({'type': 'complete', 'test_results': test_results, 'version': iteration['version'], 'stage': session.get('stage')})}\n\n"
-
-    return StreamingResponse(
-        generate_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
+
+@app.post("/api/sessions/{session_id}/test/batch/stream")
+async def test_prompt_batch_stream(
+    session_id: str,
+    request: BatchTestRequest,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Test the current prompt on the test set using streaming.
+    Returns Server-Sent Events (SSE); model events carry the sample_id of their cell.
+    """
+    resumed = _resumed_job_stream(session_id, "batch", last_event_id)
+    if resumed is not None:
+        return resumed
+
+    job = await _submit_batch_job(session_id, request)
+    return StreamingResponse(_job_event_stream(job), media_type="text/event-stream", headers=_SSE_HEADERS)
 
 
 @app.post("/api/sessions/{session_id}/feedback")
@@ -598,12 +967,12 @@ async def submit_feedback(session_id: str, request: SubmitFeedbackRequest):
     Submit rating and/or feedback for a specific test result.
     """
     # Get the latest iteration
-    iteration = storage.get_active_iteration(session_id)
+    iteration = await storage_async.get_active_iteration(session_id)
     if iteration is None:
         raise HTTPException(status_code=404, detail="No iterations found")
 
     # Update the feedback
-    storage.update_iteration_feedback(
+    await storage_async.update_iteration_feedback(
         session_id,
         iteration["version"],
         request.model,
@@ -612,7 +981,7 @@ async def submit_feedback(session_id: str, request: SubmitFeedbackRequest):
     )
 
     # Get updated iteration to return current state
-    updated_iteration = storage.get_active_iteration(session_id)
+    updated_iteration = await storage_async.get_active_iteration(session_id)
 
     return {
         "version": updated_iteration["version"],
@@ -620,53 +989,61 @@ async def submit_feedback(session_id: str, request: SubmitFeedbackRequest):
     }
 
 
-@app.post("/api/sessions/{session_id}/suggest")
-async def generate_suggestions(session_id: str, request: GenerateSuggestionsRequest):
-    """
-    Generate improvement suggestions based on test results and feedback.
-    """
-    # Get the latest iteration
-    iteration = storage.get_active_iteration(session_id)
-    if iteration is None:
-        raise HTTPException(status_code=404, detail="No iterations found")
+def _suggest_job_runner(session_id: str, iteration: Dict[str, Any], models: List[str]):
+    """Create the job runner that collects improvement suggestions and stores them."""
+    messages = build_suggestion_messages(iteration["prompt"], iteration["test_results"])
 
-    # Check if there are test results
-    if not iteration.get("test_results"):
-        raise HTTPException(status_code=400, detail="No test results available. Run tests first.")
+    async def run(job: jobs.Job) -> Dict[str, Any]:
+        job.set_total(len(models))
+        job.emit({"type": "start", "models": models, "job_id": job.id})
 
-    # Collect suggestions
-    suggestions = await collect_improvement_suggestions(
-        iteration["prompt"],
-        iteration["test_results"],
-        models=request.models
-    )
+        # Track results for each model
+        results = {model: {"model": model, "suggestion": "", "error": None} for model in models}
 
-    # Update the iteration with suggestions
-    storage.update_iteration_suggestions(
-        session_id,
-        iteration["version"],
-        suggestions
-    )
+        # Run all model streams concurrently; events arrive as soon as any model produces them
+        async for event in stream_models(models, messages, result_key="suggestion", stage="suggest"):
+            job.emit(event)
 
-    return {
-        "version": iteration["version"],
-        "suggestions": suggestions
-    }
+            model = event["model"]
+            if event["type"] == "model_done":
+                results[model]["suggestion"] = event["suggestion"]
+                results[model]["metrics"] = event.get("metrics")
+            elif event["type"] == "error":
+                results[model]["error"] = event["error"]
 
+        # Build final suggestions
+        suggestions = []
+        for model in models:
+            result = results[model]
+            if result["error"] is None and result["suggestion"]:
+                suggestion = {
+                    "model": model,
+                    "suggestion": result["suggestion"]
+                }
+                if result.get("metrics"):
+                    suggestion["metrics"] = result["metrics"]
+                suggestions.append(suggestion)
 
-@app.post("/api/sessions/{session_id}/suggest/stream")
-async def generate_suggestions_stream(session_id: str, request: GenerateSuggestionsRequest):
-    """
-    Generate improvement suggestions based on test results and feedback using streaming.
-    Returns Server-Sent Events (SSE) with real-time suggestion outputs.
-    """
-    import json
-    import asyncio
-    from .openrouter import query_model_stream
-    from .settings import get_settings, get_builtin_prompt
+        # Update the iteration with suggestions
+        await storage_async.update_iteration_suggestions(
+            session_id,
+            iteration["version"],
+            suggestions
+        )
 
+        job.emit({"type": "complete", "suggestions": suggestions, "version": iteration["version"]})
+        return {
+            "version": iteration["version"],
+            "suggestions": suggestions
+        }
+
+    return run
+
+
+async def _submit_suggest_job(session_id: str, request: GenerateSuggestionsRequest) -> jobs.Job:
+    """Validate a suggestion request and submit its job (or attach to an identical running one)."""
     # Get the latest iteration
-    iteration = storage.get_active_iteration(session_id)
+    iteration = await storage_async.get_active_iteration(session_id)
     if iteration is None:
         raise HTTPException(status_code=404, detail="No iterations found")
 
@@ -675,140 +1052,64 @@ async def generate_suggestions_stream(session_id: str, request: GenerateSuggesti
     if not test_results:
         raise HTTPException(status_code=400, detail="No test results available. Run tests first.")
 
-    # Determine models to use
     if request.models:
-        models = request.models
+        models = list(dict.fromkeys(request.models))
     else:
         # Use the models that were successfully tested
-        models = [r["model"] for r in test_results if not r.get("error")]
-
-    # Build context about test results and feedback
-    results_summary = []
-    for result in test_results:
-        if result.get("error"):
-            continue
-
-        model = result["model"]
-        rating = result.get("rating")
-        feedback = result.get("feedback")
-
-        summary = f"Model: {model}"
-        if rating is not None:
-            summary += f"\nRating: {rating}/5 stars"
-        if feedback:
-            summary += f"\nFeedback: {feedback}"
-        summary += f"\nOutput preview: {result['output'][:200]}..."
-
-        results_summary.append(summary)
-
-    results_text = "\n\n".join(results_summary)
-
-    template = get_builtin_prompt("improvement-suggestion") or """You are a prompt engineering expert. You are helping optimize a prompt based on test results and feedback. Return ONLY the improved prompt text wrapped in <prompt>...</prompt> XML tags with no explanation outside the tag. Add a blank line after opening tags and before closing tags for better readability."""
-
-    suggestion_prompt = f"""{template}
-
-CURRENT PROMPT:
-{iteration["prompt"]}
-
-This prompt was tested with multiple LLMs. Here are the results and user feedback:
-
-{results_text}
-
-Based on the test results and user feedback, suggest specific improvements to the prompt."""
+        models = list(dict.fromkeys(r["model"] for r in test_results if not r.get("error")))
 
-    messages = [{"role": "user", "content": suggestion_prompt}]
+    job, _ = await jobs.get_manager().submit(
+        "suggest",
+        session_id,
+        _suggest_job_runner(session_id, iteration, models),
+        key=("suggest", session_id, iteration["version"], tuple(models)),
+        params={"version": iteration["version"], "models": models},
+    )
+    return job
 
-    async def generate_stream():
-        # Send initial event with models list
-        yield f"data: {json.dumps({'type': 'start', 'models': models})}\n\n"
 
-        # Track results for each model
-        results = {model: {"model": model, "suggestion": "", "error": None} for model in models}
+@app.post("/api/sessions/{session_id}/suggest")
+async def generate_suggestions(session_id: str, request: GenerateSuggestionsRequest, wait: bool = Query(False)):
+    """
+    Generate improvement suggestions based on test results and feedback.
 
-        # Create tasks for all models
-        async def stream_model(model: str):
-            content_buffer = ""
-            try:
-                async for chunk in query_model_stream(model, messages):
-                    if chunk["type"] == "delta":
-                        content_buffer += chunk["content"]
-                        yield model, {"type": "delta", "model": model, "content": chunk["content"]}
-                    elif chunk["type"] == "error":
-                        yield model, {"type": "error", "model": model, "error": chunk["error"]}
-                        return
-                    elif chunk["type"] == "done":
-                        yield model, {"type": "model_done", "model": model, "suggestion": content_buffer}
-                        return
-                # If we exit without done, still mark as complete
-                yield model, {"type": "model_done", "model": model, "suggestion": content_buffer}
-            except Exception as e:
-                yield model, {"type": "error", "model": model, "error": str(e)}
-
-        # Run all model streams concurrently
-        async def run_all_streams():
-            model_generators = {model: stream_model(model) for model in models}
-            active_generators = set(models)
-
-            while active_generators:
-                for model in list(active_generators):
-                    gen = model_generators[model]
-                    try:
-                        _, event = await gen.__anext__()
-                        yield f"data: {json.dumps(event)}\n\n"
-
-                        if event["type"] == "model_done":
-                            results[model]["suggestion"] = event["suggestion"]
-                            active_generators.discard(model)
-                        elif event["type"] == "error":
-                            results[model]["error"] = event["error"]
-                            active_generators.discard(model)
-                    except StopAsyncIteration:
-                        active_generators.discard(model)
-
-                if active_generators:
-                    await asyncio.sleep(0.01)
-
-        async for event_data in run_all_streams():
-            yield event_data
+    Runs as a background job and returns its id right away (HTTP 202); pass
+    wait=true to wait for the suggestions instead.
+    """
+    job = await _submit_suggest_job(session_id, request)
+    return await _job_response(job, wait)
 
-        # Build final suggestions
-        suggestions = []
-        for model in models:
-            result = results[model]
-            if result["error"] is None and result["suggestion"]:
-                suggestions.append({
-                    "model": model,
-                    "suggestion": result["suggestion"]
-                })
 
-        # Update the iteration with suggestions
-        storage.update_iteration_suggestions(
-            session_id,
-            iteration["version"],
-            suggestions
-        )
+@app.post("/api/sessions/{session_id}/suggest/stream")
+async def generate_suggestions_stream(
+    session_id: str,
+    request: GenerateSuggestionsRequest,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Generate improvement suggestions based on test results and feedback using streaming.
+    Returns Server-Sent Events (SSE) with real-time suggestion outputs.
 
-        # Send final complete event
-        yield f"data: {json.dumps({'type': 'complete', 'suggestions': suggestions, 'version': iteration['version']})}\n\n"
+    A client reconnecting with Last-Event-ID resumes the same run after that event.
+    """
+    resumed = _resumed_job_stream(session_id, "suggest", last_event_id)
+    if resumed is not None:
+        return resumed
 
-    return StreamingResponse(
-        generate_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
+    job = await _submit_suggest_job(session_id, request)
+    return StreamingResponse(_job_event_stream(job), media_type="text/event-stream", headers=_SSE_HEADERS)
 
 
 @app.post("/api/sessions/{session_id}/merge")
-async def merge_improvement_suggestions(session_id: str, request: MergeSuggestionsRequest):
+async def merge_improvement_suggestions(session_id: str, request: MergeSuggestionsRequest, wait: bool = Query(False)):
     """
     Merge improvement suggestions into a single improved prompt.
+
+    Runs as a background job and returns its id right away (HTTP 202); pass
+    wait=true to wait for the merged prompt instead.
     """
     # Get the latest iteration
-    iteration = storage.get_active_iteration(session_id)
+    iteration = await storage_async.get_active_iteration(session_id)
     if iteration is None:
         raise HTTPException(status_code=404, detail="No iterations found")
 
@@ -817,17 +1118,74 @@ async def merge_improvement_suggestions(session_id: str, request: MergeSuggestio
     if not suggestions:
         raise HTTPException(status_code=400, detail="No suggestions available. Generate suggestions first.")
 
-    # Merge suggestions
-    improved_prompt = await merge_suggestions(
-        iteration["prompt"],
-        suggestions,
-        user_preference=request.user_preference
+    async def run(job: jobs.Job) -> Dict[str, Any]:
+        job.set_total(1)
+        improved_prompt = await merge_suggestions(
+            iteration["prompt"],
+            suggestions,
+            user_preference=request.user_preference
+        )
+        return {
+            "improved_prompt": improved_prompt,
+            "original_prompt": iteration["prompt"]
+        }
+
+    job, _ = await jobs.get_manager().submit(
+        "merge",
+        session_id,
+        run,
+        key=("merge", session_id, iteration["version"], request.user_preference),
+        params={"version": iteration["version"], "user_preference": request.user_preference},
     )
+    return await _job_response(job, wait)
 
-    return {
-        "improved_prompt": improved_prompt,
-        "original_prompt": iteration["prompt"]
-    }
+
+@app.get("/api/jobs")
+async def list_jobs(session_id: Optional[str] = None):
+    """List recent background jobs, newest first, optionally for one session."""
+    return {"jobs": jobs.get_manager().list_jobs(session_id), "stats": jobs.get_manager().get_stats()}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status, progress, partial output and result of a job."""
+    record = await jobs.get_manager().get_record(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return record
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def get_job_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Follow a job over Server-Sent Events.
+
+    Replays the events emitted so far (or only those after Last-Event-ID), then
+    streams new ones until the job finishes.
+    """
+    job = jobs.get_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or no longer in memory")
+    parsed = jobs.parse_event_id(last_event_id)
+    after = parsed[1] if parsed is not None and parsed[0] == job_id else 0
+    return StreamingResponse(_job_event_stream(job, after), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    manager = jobs.get_manager()
+    if manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    return {"status": "cancelling"}
+
+
+@app.get("/api/sessions/{session_id}/jobs")
+async def list_session_jobs(session_id: str):
+    """List the recent background jobs of a session, newest first."""
+    return {"jobs": jobs.get_manager().list_jobs(session_id)}
 
 
 @app.post("/api/sessions/{session_id}/iterate")
@@ -836,12 +1194,12 @@ async def create_new_iteration(session_id: str, request: CreateIterationRequest)
     Create a new iteration with an improved prompt.
     """
     # Get current session
-    session = storage.get_session(session_id)
+    session = await storage_async.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Create new iteration
-    session = storage.add_iteration(
+    session = await storage_async.add_iteration(
         session_id,
         prompt=request.prompt,
         change_rationale=request.change_rationale,
@@ -869,23 +1227,32 @@ async def get_session_metrics(session_id: str):
     """
     Get metrics for all iterations in a session.
     """
-    session = storage.get_session(session_id)
+    session = await storage_async.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Calculate metrics for each iteration
     metrics = []
+    all_calls = []
     for iteration in session.get("iterations", []):
         iteration_metrics = calculate_iteration_metrics(iteration)
-        metrics.append({
+        calls = iteration_call_records(iteration)
+        all_calls.extend(calls)
+        entry = {
             "version": iteration["version"],
-            "metrics": iteration_metrics
-        })
+            "metrics": iteration_metrics,
+            "performance": calculate_performance_metrics(calls)
+        }
+        batch_results = iteration.get("batch_results")
+        if batch_results:
+            entry["batch_metrics"] = calculate_batch_metrics(batch_results.get("samples", {}))
+        metrics.append(entry)
 
     return {
         "session_id": session_id,
         "total_iterations": len(session.get("iterations", [])),
-        "iteration_metrics": metrics
+        "iteration_metrics": metrics,
+        "model_performance": calculate_performance_metrics(all_calls)
     }
 
 
@@ -894,7 +1261,7 @@ async def get_version_history(session_id: str):
     """
     Get version history with diffs between consecutive versions.
     """
-    session = storage.get_session(session_id)
+    session = await storage_async.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -930,7 +1297,7 @@ async def export_session(session_id: str, format: str = "json"):
     """
     Export the session in various formats.
     """
-    session = storage.get_session(session_id)
+    session = await storage_async.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -979,16 +1346,16 @@ async def restore_version(session_id: str, request: RestoreVersionRequest):
     """
     Restore a specific version as the current active version (overwrite).
     """
-    session = storage.get_session(session_id)
+    session = await storage_async.get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
     try:
-        session = storage.restore_iteration(session_id, request.version)
+        session = await storage_async.restore_iteration(session_id, request.version)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
 
-    active_iteration = storage.get_active_iteration(session_id)
+    active_iteration = await storage_async.get_active_iteration(session_id)
 
     return {
         "session": session,
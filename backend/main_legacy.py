@@ -8,11 +8,26 @@ from typing import List, Dict, Any
 import uuid
 import json
 import asyncio
+from contextlib import asynccontextmanager
 
 from . import storage
-from .council import run_full_council, generate_conversation_title, stage1_collect_responses, stage2_collect_rankings, stage3_synthesize_final, calculate_aggregate_rankings
+from .council import run_full_council, generate_conversation_title, stage2_collect_rankings, stage3_synthesize_final, calculate_aggregate_rankings
+from .openrouter import init_http_client, close_http_client
+from .settings import get_settings
+from .streaming import stream_models
 
-app = FastAPI(title="LLM Council API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared OpenRouter HTTP client for the lifetime of the app."""
+    await init_http_client()
+    try:
+        yield
+    finally:
+        await close_http_client()
+
+
+app = FastAPI(title="LLM Council API", lifespan=lifespan)
 
 # Enable CORS for local development
 app.add_middleware(
@@ -147,9 +162,20 @@ async def send_message_stream(conversation_id: str, request: SendMessageRequest)
             if is_first_message:
                 title_task = asyncio.create_task(generate_conversation_title(request.content))
 
-            # Stage 1: Collect responses
+            # Stage 1: Stream responses from all council models as they arrive
             yield f"data: {json.dumps({'type': 'stage1_start'})}\n\n"
-            stage1_results = await stage1_collect_responses(request.content)
+            test_models = get_settings().get("test_models", [])
+            stage1_messages = [{"role": "user", "content": request.content}]
+            stage1_results = []
+            async for event in stream_models(test_models, stage1_messages, result_key="response", stage="stage1"):
+                if event["type"] == "delta":
+                    yield f"data: {json.dumps({'type': 'stage1_delta', 'model': event['model'], 'content': event['content']})}\n\n"
+                elif event["type"] == "model_done":
+                    result = {"model": event["model"], "response": event["response"]}
+                    stage1_results.append(result)
+                    yield f"data: {json.dumps({'type': 'stage1_model_complete', 'data': result})}\n\n"
+                elif event["type"] == "error":
+                    yield f"data: {json.dumps({'type': 'stage1_model_error', 'model': event['model'], 'error': event['error']})}\n\n"
             yield f"data: {json.dumps({'type': 'stage1_complete', 'data': stage1_results})}\n\n"
 
             # Stage 2: Collect rankings
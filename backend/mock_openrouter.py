@@ -0,0 +1,539 @@
+"""OpenRouter-compatible stand-in server for offline development and benchmarking.
+
+Start the server and point the backend at it:
+
+    python -m backend.mock_openrouter --port 8100 --latency lognormal:800:0.5 --tokens-per-sec 60
+    OPENROUTER_API_URL=http://127.0.0.1:8100/api/v1/chat/completions OPENROUTER_API_KEY=mock python -m backend.main
+
+Responses are synthesized deterministically from the request, so repeated runs
+see the same text, while latency and failures are drawn from configurable
+distributions (seeded for reproducibility). In ``record`` mode requests are
+forwarded to the real OpenRouter API and stored in a cassette file, which
+``replay`` mode serves back with the recorded timing.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .storage_json import atomic_write_json
+
+DEFAULT_UPSTREAM_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Bumped whenever the layout of cassette files changes
+CASSETTE_FORMAT_VERSION = 1
+
+MODES = ("synthetic", "record", "replay")
+
+# Vocabulary for synthetic responses
+_WORDS = (
+    "the prompt model answer should clearly explain each step with concise examples and "
+    "consistent formatting while keeping the tone friendly precise and helpful for readers "
+    "who need practical guidance context constraints output structure quality detail"
+).split()
+
+
+class LatencyDistribution:
+    """
+    A parsed latency spec, sampled in seconds.
+
+    Specs are ``kind:params`` with values in milliseconds:
+    ``none``, ``fixed:MS``, ``uniform:LO:HI``, ``normal:MEAN:STDDEV`` and
+    ``lognormal:MEDIAN:SIGMA`` (SIGMA is the shape parameter, unitless).
+    """
+
+    def __init__(self, spec: str = "none"):
+        self.spec = spec
+        parts = spec.split(":")
+        self.kind = parts[0]
+        try:
+            self.params = [float(p) for p in parts[1:]]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "none":
+            ms = 0.0
+        elif self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = rng.lognormvariate(math.log(median) if median > 0 else 0.0, sigma)
+        return max(ms, 0.0) / 1000.0
+
+    def __repr__(self) -> str:
+        return f"LatencyDistribution({self.spec!r})"
+
+
+@dataclass
+class ModelProfile:
+    """How a simulated model behaves."""
+
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)  # time to first token
+    tokens_per_sec: float = 0.0  # 0 streams without pacing
+    response_tokens: Tuple[int, int] = (200, 200)  # inclusive range
+    failure_rate: float = 0.0  # fraction of requests answered with an HTTP error
+    failure_statuses: Tuple[int, ...] = (429, 500, 502, 503)
+    stream_failure_rate: float = 0.0  # fraction of streams that break off with an error chunk
+    retry_after: Optional[float] = 1.0  # seconds, sent with 429 responses
+
+
+def parse_token_range(value: Any) -> Tuple[int, int]:
+    """Parse ``N`` or ``LO:HI`` (or a two-item list) into an inclusive token range."""
+    if isinstance(value, (list, tuple)):
+        low, high = int(value[0]), int(value[1])
+    elif isinstance(value, str) and ":" in value:
+        low, high = (int(v) for v in value.split(":", 1))
+    else:
+        low = high = int(value)
+    if low < 1 or high < low:
+        raise ValueError(f"Invalid token range '{value}'")
+    return low, high
+
+
+def _profile_overrides(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a JSON profile dict into ModelProfile keyword arguments."""
+    known = {f.name for f in fields(ModelProfile)}
+    unknown = set(data) - known
+    if unknown:
+        raise ValueError(f"Unknown model profile fields: {', '.join(sorted(unknown))}")
+
+    overrides = dict(data)
+    if "latency" in overrides:
+        overrides["latency"] = LatencyDistribution(overrides["latency"])
+    if "response_tokens" in overrides:
+        overrides["response_tokens"] = parse_token_range(overrides["response_tokens"])
+    if "failure_statuses" in overrides:
+        overrides["failure_statuses"] = tuple(int(s) for s in overrides["failure_statuses"])
+    return overrides
+
+
+@dataclass
+class MockConfig:
+    """Server-wide settings plus per-model profile overrides."""
+
+    default: ModelProfile = field(default_factory=ModelProfile)
+    models: Dict[str, ModelProfile] = field(default_factory=dict)
+    seed: Optional[int] = None
+    mode: str = "synthetic"
+    cassette_path: Optional[str] = None
+    upstream_url: str = DEFAULT_UPSTREAM_URL
+    replay_miss: str = "synthetic"  # or "error"
+    replay_speed: float = 1.0  # 0 replays without delays
+
+    def profile_for(self, model: str) -> ModelProfile:
+        return self.models.get(model, self.default)
+
+    def load_profiles(self, path: str):
+        """
+        Load profiles from a JSON file shaped like
+        ``{"default": {...}, "models": {"vendor/model": {...}}}``.
+
+        Model entries override the default profile field by field.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.default = replace(self.default, **_profile_overrides(data.get("default", {})))
+        self.models = {
+            model: replace(self.default, **_profile_overrides(overrides))
+            for model, overrides in data.get("models", {}).items()
+        }
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Stable cassette key for a chat completion request."""
+    canonical = json.dumps(
+        {"model": payload.get("model"), "messages": payload.get("messages"), "stream": bool(payload.get("stream"))},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded upstream interactions keyed by request_key, persisted as one JSON file."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.interactions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("format_version") != CASSETTE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported cassette format in {path}")
+            self.interactions = data.get("interactions", {})
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.interactions.get(key)
+
+    def put(self, key: str, interaction: Dict[str, Any]):
+        with self._lock:
+            self.interactions[key] = interaction
+            if self.path:
+                atomic_write_json(
+                    self.path,
+                    {"format_version": CASSETTE_FORMAT_VERSION, "interactions": self.interactions},
+                    indent=2,
+                )
+
+
+def synthesize_text(payload: Dict[str, Any], token_count: int) -> List[str]:
+    """
+    Build a deterministic response for a request, split into tokens.
+
+    The text follows the output format the app's prompts ask for, so council
+    rankings and prompt suggestions parse the same way real responses do.
+    """
+    messages = payload.get("messages") or []
+    prompt = "\n".join(str(m.get("content", "")) for m in messages if isinstance(m, dict))
+    rng = random.Random(request_key(payload))
+
+    body = [rng.choice(_WORDS) for _ in range(token_count)]
+    tokens = [("" if i == 0 else " ") + word for i, word in enumerate(body)]
+
+    if "FINAL RANKING:" in prompt:
+        labels = re.findall(r"^Response ([A-Z]):$", prompt, flags=re.MULTILINE) or ["A"]
+        rng.shuffle(labels)
+        tokens.append("\n\nFINAL RANKING:")
+        tokens.extend(f"\n{i}. Response {label}" for i, label in enumerate(labels, start=1))
+    elif "<analysis>" in prompt:
+        tokens = ["<analysis>\n\n"] + tokens[:len(tokens) // 4] + ["\n\n</analysis>\n\n<prompt>\n\n"] \
+            + tokens[len(tokens) // 4:] + ["\n\n</prompt>"]
+    elif "<prompt>" in prompt:
+        tokens = ["<prompt>\n\n"] + tokens + ["\n\n</prompt>"]
+
+    return tokens
+
+
+def _error_body(status: int, message: str) -> Dict[str, Any]:
+    return {"error": {"code": status, "message": message}}
+
+
+def _completion_body(model: str, content: str, prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {
+        "id": f"gen-mock-{uuid.uuid4().hex[:16]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk_line(completion_id: str, model: str, content: Optional[str], finish_reason: Optional[str] = None,
+                usage: Optional[Dict[str, int]] = None) -> str:
+    chunk: Dict[str, Any] = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "delta": {"content": content} if content is not None else {},
+            "finish_reason": finish_reason,
+        }],
+    }
+    if usage:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+
+def _prompt_tokens(payload: Dict[str, Any]) -> int:
+    """Rough prompt size: whitespace-separated words across all messages."""
+    return sum(len(str(m.get("content", "")).split()) for m in payload.get("messages") or [] if isinstance(m, dict))
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """
+    Build the mock server application.
+
+    Args:
+        config: Server settings; defaults to instant, always-successful responses
+
+    Returns:
+        FastAPI app serving ``POST /api/v1/chat/completions`` and ``GET /mock/stats``
+    """
+    config = config or MockConfig()
+    if config.mode not in MODES:
+        raise ValueError(f"Unknown mode '{config.mode}'")
+    if config.mode != "synthetic" and not config.cassette_path:
+        raise ValueError(f"Mode '{config.mode}' needs a cassette path")
+
+    rng = random.Random(config.seed)
+    cassette = Cassette(config.cassette_path)
+    stats = {
+        "requests": 0,
+        "streams": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "injected_failures": 0,
+        "stream_failures": 0,
+        "replay_hits": 0,
+        "replay_misses": 0,
+        "recorded": 0,
+    }
+    upstream: Dict[str, httpx.AsyncClient] = {}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        try:
+            yield
+        finally:
+            client = upstream.pop("client", None)
+            if client is not None:
+                await client.aclose()
+
+    app = FastAPI(title="Mock OpenRouter", lifespan=lifespan)
+
+    def upstream_client() -> httpx.AsyncClient:
+        if "client" not in upstream:
+            upstream["client"] = httpx.AsyncClient(timeout=httpx.Timeout(300.0, connect=10.0))
+        return upstream["client"]
+
+    def injected_failure(profile: ModelProfile) -> Optional[JSONResponse]:
+        if profile.failure_rate <= 0 or rng.random() >= profile.failure_rate:
+            return None
+        stats["injected_failures"] += 1
+        status = rng.choice(profile.failure_statuses)
+        headers = {}
+        if status == 429 and profile.retry_after is not None:
+            headers["Retry-After"] = f"{profile.retry_after:g}"
+        return JSONResponse(
+            status_code=status,
+            content=_error_body(status, f"Mock upstream error (HTTP {status})"),
+            headers=headers,
+        )
+
+    async def synthetic_stream(payload: Dict[str, Any], profile: ModelProfile,
+                               tokens: List[str]) -> AsyncGenerator[str, None]:
+        model = payload.get("model", "")
+        completion_id = f"gen-mock-{uuid.uuid4().hex[:16]}"
+        delay = 1.0 / profile.tokens_per_sec if profile.tokens_per_sec > 0 else 0.0
+        fail_at = None
+        if profile.stream_failure_rate > 0 and rng.random() < profile.stream_failure_rate:
+            fail_at = rng.randrange(len(tokens))
+
+        yield ": OPENROUTER PROCESSING\n\n"
+        await asyncio.sleep(profile.latency.sample(rng))
+        for i, token in enumerate(tokens):
+            if i == fail_at:
+                stats["stream_failures"] += 1
+                yield f"data: {json.dumps(_error_body(502, 'Mock upstream stream interrupted'))}\n\n"
+                return
+            if i and delay:
+                await asyncio.sleep(delay)
+            yield _chunk_line(completion_id, model, token)
+
+        prompt_tokens = _prompt_tokens(payload)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        yield _chunk_line(completion_id, model, None, finish_reason="stop", usage=usage)
+        yield "data: [DONE]\n\n"
+
+    async def synthetic_response(payload: Dict[str, Any]):
+        model = payload.get("model", "")
+        profile = config.profile_for(model)
+
+        failure = injected_failure(profile)
+        if failure is not None:
+            await asyncio.sleep(profile.latency.sample(rng))
+            return failure
+
+        tokens = synthesize_text(payload, rng.randint(*profile.response_tokens))
+        if payload.get("stream"):
+            stats["streams"] += 1
+            return StreamingResponse(synthetic_stream(payload, profile, tokens), media_type="text/event-stream")
+
+        duration = profile.latency.sample(rng)
+        if profile.tokens_per_sec > 0:
+            duration += len(tokens) / profile.tokens_per_sec
+        await asyncio.sleep(duration)
+        return JSONResponse(_completion_body(model, "".join(tokens), _prompt_tokens(payload), len(tokens)))
+
+    async def replay_stream(lines: List[Tuple[float, str]]) -> AsyncGenerator[str, None]:
+        started = time.monotonic()
+        for offset, line in lines:
+            if config.replay_speed > 0:
+                wait = offset / config.replay_speed - (time.monotonic() - started)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            yield line + "\n"
+
+    async def replay_response(interaction: Dict[str, Any]):
+        if interaction.get("stream") and interaction["status"] == 200:
+            return StreamingResponse(replay_stream(interaction["lines"]), media_type="text/event-stream")
+        if config.replay_speed > 0:
+            await asyncio.sleep(interaction.get("elapsed", 0.0) / config.replay_speed)
+        return JSONResponse(status_code=interaction["status"], content=interaction["body"])
+
+    async def record_response(payload: Dict[str, Any], key: str, authorization: Optional[str]):
+        headers = {"Content-Type": "application/json"}
+        if authorization:
+            headers["Authorization"] = authorization
+        client = upstream_client()
+        started = time.monotonic()
+
+        if not payload.get("stream"):
+            response = await client.post(config.upstream_url, headers=headers, json=payload)
+            try:
+                body = response.json()
+            except ValueError:
+                body = _error_body(response.status_code, response.text)
+            cassette.put(key, {
+                "stream": False,
+                "status": response.status_code,
+                "elapsed": time.monotonic() - started,
+                "body": body,
+            })
+            stats["recorded"] += 1
+            return JSONResponse(status_code=response.status_code, content=body)
+
+        request = client.build_request("POST", config.upstream_url, headers=headers, json=payload)
+        response = await client.send(request, stream=True)
+        if response.status_code != 200:
+            text = (await response.aread()).decode("utf-8", errors="replace")
+            await response.aclose()
+            try:
+                body = json.loads(text)
+            except ValueError:
+                body = _error_body(response.status_code, text)
+            cassette.put(key, {"stream": True, "status": response.status_code, "elapsed": 0.0, "body": body})
+            stats["recorded"] += 1
+            return JSONResponse(status_code=response.status_code, content=body)
+
+        async def relay() -> AsyncGenerator[str, None]:
+            lines: List[Tuple[float, str]] = []
+            completed = False
+            try:
+                async for line in response.aiter_lines():
+                    lines.append((round(time.monotonic() - started, 4), line))
+                    yield line + "\n"
+                completed = True
+            finally:
+                await response.aclose()
+                # Partial streams (client went away) are not worth replaying
+                if completed:
+                    cassette.put(key, {"stream": True, "status": 200, "lines": lines})
+                    stats["recorded"] += 1
+
+        return StreamingResponse(relay(), media_type="text/event-stream")
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            payload = await request.json()
+        except ValueError:
+            return JSONResponse(status_code=400, content=_error_body(400, "Request body is not valid JSON"))
+        if not isinstance(payload, dict) or not payload.get("model") or not isinstance(payload.get("messages"), list):
+            return JSONResponse(status_code=400, content=_error_body(400, "'model' and 'messages' are required"))
+
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            key = request_key(payload)
+            if config.mode == "record":
+                return await record_response(payload, key, request.headers.get("authorization"))
+
+            if config.mode == "replay":
+                interaction = cassette.get(key)
+                if interaction is not None:
+                    stats["replay_hits"] += 1
+                    return await replay_response(interaction)
+                stats["replay_misses"] += 1
+                if config.replay_miss == "error":
+                    return JSONResponse(status_code=404, content=_error_body(404, "No recorded response for this request"))
+
+            return await synthetic_response(payload)
+        finally:
+            # Streaming bodies are still being sent; this counts request handling only
+            stats["in_flight"] -= 1
+
+    @app.get("/mock/stats")
+    async def get_stats():
+        return {**stats, "mode": config.mode, "cassette_size": len(cassette.interactions)}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenRouter-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--config", help="JSON file with 'default' and per-model 'models' profiles")
+    parser.add_argument("--latency", default="none", help="Time to first token, e.g. fixed:200 or lognormal:800:0.5 (ms)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Streaming speed; 0 disables pacing")
+    parser.add_argument("--response-tokens", default="200", help="Response length in tokens, N or LO:HI")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests that fail with an HTTP error")
+    parser.add_argument("--stream-failure-rate", type=float, default=0.0, help="Fraction of streams cut off mid-way")
+    parser.add_argument("--seed", type=int, help="Seed for latency and failure sampling")
+    parser.add_argument("--mode", choices=MODES, default="synthetic")
+    parser.add_argument("--cassette", help="Cassette file for record/replay modes")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM_URL, help="Real API to record from")
+    parser.add_argument("--replay-miss", choices=("synthetic", "error"), default="synthetic",
+                        help="What to do with requests that are not in the cassette")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="Replay speed factor; 0 disables delays")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        default=ModelProfile(
+            latency=LatencyDistribution(args.latency),
+            tokens_per_sec=args.tokens_per_sec,
+            response_tokens=parse_token_range(args.response_tokens),
+            failure_rate=args.failure_rate,
+            stream_failure_rate=args.stream_failure_rate,
+        ),
+        seed=args.seed,
+        mode=args.mode,
+        cassette_path=args.cassette,
+        upstream_url=args.upstream,
+        replay_miss=args.replay_miss,
+        replay_speed=args.replay_speed,
+    )
+    if args.config:
+        config.load_profiles(args.config)
+
+    import uvicorn
+
+    print(f"Mock OpenRouter ({config.mode}) at http://{args.host}:{args.port}/api/v1/chat/completions")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,319 @@
 """OpenRouter API client for making LLM requests."""
 
+import asyncio
 import httpx
 import json
-from typing import List, Dict, Any, Optional, AsyncGenerator
-from .config import OPENROUTER_API_URL, DEFAULT_TIMEOUT
+import time
+from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple
+from .config import (
+    OPENROUTER_API_URL,
+    DEFAULT_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP2_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_DELAY,
+    HEDGE_DEFAULT_DELAY,
+    HEDGE_BUDGET_RATIO,
+)
 from .settings import get_settings
+from .retry import get_retry_policy, next_retry_delay, parse_retry_after
+from . import health
+from . import response_cache
+from . import ratelimit
+from . import telemetry
+from . import tracing
+from .singleflight import SingleFlight, StreamMulticast
+
+# Process-wide pooled client, created by the FastAPI lifespan hook (or lazily on first use)
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Identical concurrent calls share one upstream request (see query_model / query_model_stream)
+_inflight_calls = SingleFlight()
+_inflight_streams = StreamMulticast()
+
+# Counters for hedged requests, reported by get_hedge_stats()
+_hedge_stats = {
+    "calls": 0,  # calls eligible for hedging
+    "hedged": 0,  # calls where a duplicate request was sent
+    "hedge_wins": 0,  # ... and the duplicate answered first
+    "budget_skipped": 0,  # calls that would have hedged but the budget was used up
+    "latency_total": 0.0,
+    "estimated_savings": 0.0,
+}
+
+
+def _http2_available() -> bool:
+    """Check whether the optional 'h2' package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _request_timeout(timeout: float) -> httpx.Timeout:
+    """Build a per-request timeout; connecting gets its own, shorter budget."""
+    return httpx.Timeout(timeout, connect=min(timeout, HTTP_CONNECT_TIMEOUT))
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """
+    Create the shared HTTP client used for all OpenRouter calls.
+
+    Connections are pooled and kept alive between requests, so repeated
+    fan-outs to the same host reuse warm TCP/TLS connections.
+
+    Returns:
+        The shared httpx.AsyncClient
+    """
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        return _http_client
+
+    http2 = HTTP2_ENABLED and _http2_available()
+    if HTTP2_ENABLED and not http2:
+        print("HTTP/2 requested but the 'h2' package is not installed; falling back to HTTP/1.1.")
+
+    _http_client = httpx.AsyncClient(
+        timeout=_request_timeout(DEFAULT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=http2,
+    )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client and release its pooled connections."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it if the lifespan hook has not run."""
+    if _http_client is None or _http_client.is_closed:
+        return await init_http_client()
+    return _http_client
+
+
+def _error_detail(status_code: int, body: str) -> str:
+    """Extract the error message from an OpenRouter error body."""
+    try:
+        error_data = json.loads(body)
+        if 'error' in error_data:
+            err = error_data['error']
+            return err.get('message', str(err)) if isinstance(err, dict) else str(err)
+    except Exception:
+        pass
+    return body or f"HTTP {status_code}"
+
+
+class CallMetrics:
+    """
+    Timings and token counts of one model call (all of its attempts).
+
+    Times are in seconds. Connect time covers only new connections (TCP and
+    TLS setup), so it is 0 when a pooled connection was reused. Time to first
+    token is measured to the first streamed token, or to the response headers
+    for calls that are not streamed; both it and the duration are counted from
+    the start of the call, including 'queue_wait'. Token counts come from the API's 'usage'
+    field; without it, streamed chunks are counted instead ('tokens_estimated').
+    """
+
+    def __init__(self, streaming: bool = False):
+        self.streaming = streaming
+        self.started = time.monotonic()
+        self.attempt_started = self.started
+        self.queue_wait = 0.0
+        self.connect_time = 0.0
+        self.first_token: Optional[float] = None
+        self.tokens_in: Optional[int] = None
+        self.tokens_out: Optional[int] = None
+        self.chunks = 0
+        self._connect_mark: Optional[float] = None
+
+    def start_attempt(self, waited: float):
+        """Note the start of an attempt that waited `waited` seconds for a rate limiter slot."""
+        self.queue_wait += waited
+        self.attempt_started = time.monotonic()
+        self.first_token = None
+        self.chunks = 0
+
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        """Hook for httpx's 'trace' request extension."""
+        now = time.monotonic()
+        if event_name == "connection.connect_tcp.started":
+            self._connect_mark = now
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self._connect_mark is not None:
+                self.connect_time += now - self._connect_mark
+                self._connect_mark = now
+        elif event_name.endswith("receive_response_headers.complete") and not self.streaming:
+            self.first_token = now
+
+    def token(self):
+        """Record one streamed content chunk."""
+        if self.first_token is None:
+            self.first_token = time.monotonic()
+        self.chunks += 1
+
+    def set_usage(self, usage: Any):
+        """Take token counts from an OpenRouter 'usage' object."""
+        if isinstance(usage, dict):
+            self.tokens_in = usage.get("prompt_tokens", self.tokens_in)
+            self.tokens_out = usage.get("completion_tokens", self.tokens_out)
+
+    def latency(self) -> float:
+        """Seconds since the call started, minus time spent waiting for rate limiter slots."""
+        return time.monotonic() - self.started - self.queue_wait
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        tokens_out = self.tokens_out
+        if tokens_out is None and self.chunks:
+            tokens_out = self.chunks
+
+        # Generation speed: from the first token for streams, over the whole attempt otherwise
+        generation_started = self.first_token if self.streaming and self.first_token is not None else self.attempt_started
+        generation_time = now - generation_started
+        metrics = {
+            "queue_wait": round(self.queue_wait, 4),
+            "connect_time": round(self.connect_time, 4),
+            "ttft": round(self.first_token - self.started, 4) if self.first_token is not None else None,
+            "duration": round(now - self.started, 4),
+            "tokens_in": self.tokens_in,
+            "tokens_out": tokens_out,
+            "tokens_per_sec": round(tokens_out / generation_time, 2) if tokens_out and generation_time > 0 else None,
+        }
+        if tokens_out is not None and self.tokens_out is None:
+            metrics["tokens_estimated"] = True
+        return metrics
+
+
+def _record_call(
+    model: str,
+    stage: Optional[str],
+    outcome: str,
+    retries: int,
+    call_metrics: Optional[Dict[str, Any]],
+    mode: str,
+    error: Optional[str] = None
+):
+    """Add one finished model call to the /metrics counters and histograms and to the current trace."""
+    telemetry.UPSTREAM_CALLS.labels(model, outcome).inc()
+    if retries:
+        telemetry.UPSTREAM_RETRIES.labels(model).inc(retries)
+    if tracing.is_enabled():
+        tracing.record(
+            "model.call",
+            call_metrics["duration"] if call_metrics else 0.0,
+            error,
+            model=model, stage=stage, mode=mode, outcome=outcome, retries=retries, metrics=call_metrics
+        )
+    if call_metrics is None or outcome == "cached":
+        return
+    telemetry.UPSTREAM_DURATION.labels(model, mode).observe(call_metrics["duration"])
+    telemetry.UPSTREAM_QUEUE_WAIT.labels(model).observe(call_metrics["queue_wait"])
+    if call_metrics["ttft"] is not None:
+        telemetry.UPSTREAM_TTFT.labels(model, mode).observe(call_metrics["ttft"])
+    if call_metrics["tokens_in"]:
+        telemetry.UPSTREAM_TOKENS.labels(model, "in").inc(call_metrics["tokens_in"])
+    if call_metrics["tokens_out"]:
+        telemetry.UPSTREAM_TOKENS.labels(model, "out").inc(call_metrics["tokens_out"])
 
 
 async def query_model(
     model: str,
     messages: List[Dict[str, str]],
-    timeout: float = DEFAULT_TIMEOUT
+    timeout: float = DEFAULT_TIMEOUT,
+    stage: Optional[str] = None,
+    deadline: Optional[float] = None,
+    use_cache: bool = True,
+    coalesce: bool = True
 ) -> Optional[Dict[str, Any]]:
     """
     Query a single model via OpenRouter API.
 
+    Transient failures (429, 5xx, timeouts, connection errors) are retried with
+    exponential backoff and jitter according to the model's retry policy, never
+    past the deadline. Models whose circuit breaker is open fail immediately.
+    When the response cache is enabled for `stage`, a cached answer is returned
+    without calling the API. Concurrent identical calls (same model, messages,
+    stage and time budget) share a single upstream request.
+
     Args:
         model: OpenRouter model identifier (e.g., "openai/gpt-4o")
         messages: List of message dicts with 'role' and 'content'
-        timeout: Request timeout in seconds
+        timeout: Request timeout in seconds (per attempt)
+        stage: Pipeline stage making the call, used to pick the retry policy
+        deadline: time.monotonic() value by which all attempts must finish
+            (defaults to the policy budget, or timeout, from now)
+        use_cache: Set to False to bypass the response cache for this call
+        coalesce: Set to False to always send a request of its own
 
     Returns:
-        Response dict with 'content' and optional 'reasoning_details', or None if failed
+        Response dict with 'content', optional 'reasoning_details', 'retries',
+        'metrics' (see CallMetrics) and 'response_time' (and 'cached' for cache
+        hits), an error dict with 'error', 'model', 'retries' and 'metrics' (or
+        'circuit_open' when rejected by the breaker), or None if no API key is set
+    """
+    if not coalesce:
+        return await _query_model(model, messages, timeout, stage, deadline, use_cache)
+
+    key = _coalescing_key(model, messages, timeout, stage, deadline, use_cache)
+    response = await _inflight_calls.do(
+        key, lambda: _query_model(model, messages, timeout, stage, deadline, use_cache)
+    )
+    # Every caller gets its own copy, since some annotate the response
+    return dict(response) if response is not None else None
+
+
+def _coalescing_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float,
+    stage: Optional[str],
+    deadline: Optional[float],
+    use_cache: bool
+) -> Tuple[Any, ...]:
     """
+    Identity under which concurrent calls share one upstream request.
+
+    The timeout and deadline decide how many retries run and when the call
+    gives up, so only callers with the same budget share a flight; a caller
+    with a short budget never waits on a long one, nor a long one on a call
+    that gives up early.
+    """
+    return (response_cache.cache_key(model, messages), stage, use_cache, timeout, deadline)
+
+
+async def _query_model(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float,
+    stage: Optional[str],
+    deadline: Optional[float],
+    use_cache: bool
+) -> Optional[Dict[str, Any]]:
+    """Send one model call (with retries); see query_model."""
+    metrics = CallMetrics()
+    key = response_cache.cache_key(model, messages) if use_cache and response_cache.is_enabled(stage) else None
+    if key is not None:
+        cached = await asyncio.to_thread(response_cache.get_cache().get, key)
+        if cached is not None:
+            metrics.set_usage(cached.get('usage'))
+            call_metrics = metrics.to_dict()
+            _record_call(model, stage, "cached", 0, call_metrics, "complete")
+            return {**cached, 'retries': 0, 'cached': True, 'metrics': call_metrics, 'response_time': call_metrics['duration']}
+
     settings = get_settings()
     api_key = settings.get("openrouter_api_key")
     if not api_key:
@@ -39,51 +330,214 @@ async def query_model(
         "messages": messages,
     }
 
+    if not health.allow_request(model):
+        _record_call(model, stage, "rejected", 0, None, "complete", health.unavailable_message(model))
+        return {'error': health.unavailable_message(model), 'model': model, 'retries': 0, 'circuit_open': True}
+
+    policy = get_retry_policy(model, stage)
+    if deadline is None:
+        deadline = metrics.started + (policy.budget or timeout)
+    limiter = ratelimit.get_limiter()
+    level = ratelimit.current_priority(ratelimit.NORMAL)
+
+    attempt = 0
+    recorded = False
+    try:
+        while True:
+            attempt += 1
+            attempt_timeout = min(timeout, max(deadline - time.monotonic(), 0.001))
+            retry_after = None
+            retryable = False
+
+            try:
+                client = await get_http_client()
+                async with limiter.slot(model, level, timeout=attempt_timeout) as waited:
+                    metrics.start_attempt(waited)
+                    attempt_timeout = min(timeout, max(deadline - time.monotonic(), 0.001))
+                    response = await client.post(
+                        OPENROUTER_API_URL,
+                        headers=headers,
+                        json=payload,
+                        timeout=_request_timeout(attempt_timeout),
+                        extensions={"trace": metrics.trace}
+                    )
+                response.raise_for_status()
+
+                data = response.json()
+                message = data['choices'][0]['message']
+
+                health.record_success(model, metrics.latency(), health.COMPLETE)
+                recorded = True
+                metrics.set_usage(data.get('usage'))
+                result = {
+                    'content': message.get('content'),
+                    'reasoning_details': message.get('reasoning_details'),
+                    'usage': data.get('usage'),
+                }
+                if key is not None:
+                    await asyncio.to_thread(response_cache.get_cache().put, key, result)
+                call_metrics = metrics.to_dict()
+                _record_call(model, stage, "success", attempt - 1, call_metrics, "complete")
+                return {**result, 'retries': attempt - 1, 'metrics': call_metrics, 'response_time': call_metrics['duration']}
+
+            except httpx.HTTPStatusError as e:
+                # Extract detailed error from API response
+                error_detail = _error_detail(e.response.status_code, e.response.text) or str(e)
+                retryable = e.response.status_code in policy.retry_statuses
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                if e.response.status_code == 429:
+                    limiter.pause(model, retry_after or policy.base_delay)
+            except asyncio.TimeoutError:
+                # The limiter had no free slot before the deadline; nothing was sent
+                error_detail = "Timed out waiting for a free request slot (rate limit)"
+            except httpx.TimeoutException:
+                error_detail = f"Request timed out after {attempt_timeout:.0f}s"
+                retryable = policy.retry_timeouts
+            except httpx.TransportError as e:
+                error_detail = str(e) or type(e).__name__
+                retryable = True
+            except Exception as e:
+                error_detail = str(e)
+
+            delay = next_retry_delay(policy, attempt, deadline, retry_after) if retryable else None
+            if delay is None:
+                print(f"Error querying model {model}: {error_detail}")
+                # Only transient failures count against the model's health, not bad requests
+                if retryable:
+                    health.record_failure(model, metrics.latency(), error_detail)
+                    recorded = True
+                call_metrics = metrics.to_dict()
+                _record_call(model, stage, "error", attempt - 1, call_metrics, "complete", error_detail)
+                return {'error': error_detail, 'model': model, 'retries': attempt - 1, 'metrics': call_metrics}
+
+            print(f"Retrying model {model} in {delay:.1f}s (attempt {attempt + 1}/{policy.max_attempts}): {error_detail}")
+            await asyncio.sleep(delay)
+    finally:
+        if not recorded:
+            health.release_probe(model)
+
+
+def _hedging_target(model: str, stage: Optional[str]) -> Optional[str]:
+    """Return the model to send a hedge request to, or None if hedging is off for this call."""
+    config = get_settings().get("hedging") or {}
+    if not config.get("enabled") or stage not in (config.get("stages") or []):
+        return None
+    return (config.get("fallback_models") or {}).get(model, model)
+
+
+def _hedge_delay(model: str) -> float:
+    """Seconds to wait for the primary before hedging, from the model's recent latency."""
+    latency = health.latency_percentile(model, HEDGE_PERCENTILE, health.COMPLETE)
+    if latency is None:
+        return HEDGE_DEFAULT_DELAY
+    return max(latency, HEDGE_MIN_DELAY)
+
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    """Return how many model calls and streams were shared with an identical in-flight one."""
+    return {"calls": _inflight_calls.get_stats(), "streams": _inflight_streams.get_stats()}
+
+
+def get_hedge_stats() -> Dict[str, Any]:
+    """Return hedge rate, hedge win rate and estimated latency savings."""
+    stats = dict(_hedge_stats)
+    calls = stats["calls"]
+    return {
+        "calls": calls,
+        "hedged": stats["hedged"],
+        "hedge_wins": stats["hedge_wins"],
+        "budget_skipped": stats["budget_skipped"],
+        "hedge_rate": round(stats["hedged"] / calls, 3) if calls else None,
+        "hedge_win_rate": round(stats["hedge_wins"] / stats["hedged"], 3) if stats["hedged"] else None,
+        "avg_latency_ms": round(stats["latency_total"] / calls * 1000) if calls else None,
+        "estimated_savings_ms": round(stats["estimated_savings"] * 1000),
+    }
+
+
+async def query_model_hedged(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float = DEFAULT_TIMEOUT,
+    stage: Optional[str] = None,
+    deadline: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Query a model, sending a duplicate request if the first one is unusually slow.
+
+    When the "hedging" setting enables it for `stage`, a second request (to the
+    same model, or its configured fallback) is fired once the primary has run
+    longer than the model's recent p95 latency. The first successful answer
+    wins and the other request is cancelled. Extra requests are capped at
+    HEDGE_BUDGET_RATIO of the hedgeable calls.
+
+    Args:
+        model: OpenRouter model identifier
+        messages: List of message dicts with 'role' and 'content'
+        timeout: Request timeout in seconds (per attempt)
+        stage: Pipeline stage making the call
+        deadline: time.monotonic() value by which all attempts must finish
+
+    Returns:
+        Same as query_model; a hedged answer also carries 'hedged' and the
+        'model' that produced it
+    """
+    hedge_model = _hedging_target(model, stage)
+    if hedge_model is None:
+        return await query_model(model, messages, timeout=timeout, stage=stage, deadline=deadline)
+
+    _hedge_stats["calls"] += 1
+    started = time.monotonic()
+    delay = _hedge_delay(model)
+    primary = asyncio.ensure_future(query_model(model, messages, timeout=timeout, stage=stage, deadline=deadline))
+    tasks = {primary: model}
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            message = data['choices'][0]['message']
-
-            return {
-                'content': message.get('content'),
-                'reasoning_details': message.get('reasoning_details')
-            }
-
-    except httpx.HTTPStatusError as e:
-        # Extract detailed error from API response
-        error_detail = str(e)
-        try:
-            error_data = e.response.json()
-            if 'error' in error_data:
-                err = error_data['error']
-                if isinstance(err, dict):
-                    error_detail = err.get('message', str(err))
-                else:
-                    error_detail = str(err)
-        except Exception:
-            pass
-        print(f"Error querying model {model}: {error_detail}")
-        return {'error': error_detail, 'model': model}
-    except httpx.TimeoutException:
-        error_detail = f"Request timed out after {timeout}s"
-        print(f"Error querying model {model}: {error_detail}")
-        return {'error': error_detail, 'model': model}
-    except Exception as e:
-        error_detail = str(e)
-        print(f"Error querying model {model}: {error_detail}")
-        return {'error': error_detail, 'model': model}
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if not done:
+            if _hedge_stats["hedged"] < HEDGE_BUDGET_RATIO * _hedge_stats["calls"] + 1:
+                _hedge_stats["hedged"] += 1
+                print(f"Hedging {stage} call to {model} with {hedge_model} after {delay:.1f}s")
+                hedge = asyncio.ensure_future(
+                    query_model(hedge_model, messages, timeout=timeout, stage=stage, deadline=deadline, coalesce=False)
+                )
+                tasks[hedge] = hedge_model
+            else:
+                _hedge_stats["budget_skipped"] += 1
+
+        # Take the first successful answer; if one request fails, keep waiting for the other
+        pending = set(tasks)
+        response = None
+        finished = primary
+        while pending and (response is None or 'error' in response):
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                finished, response = task, task.result()
+                if response is not None and 'error' not in response:
+                    break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    latency = time.monotonic() - started
+    _hedge_stats["latency_total"] += latency
+    if len(tasks) > 1 and response is not None and 'error' not in response:
+        response['hedged'] = True
+        response['model'] = tasks[finished]
+        if finished is not primary:
+            _hedge_stats["hedge_wins"] += 1
+            # Compare with how long the primary's slow calls usually take
+            expected = health.mean_latency_above(model, delay, health.COMPLETE)
+            if expected is not None:
+                _hedge_stats["estimated_savings"] += max(expected - latency, 0.0)
+    return response
 
 
 async def query_models_parallel(
     models: List[str],
-    messages: List[Dict[str, str]]
+    messages: List[Dict[str, str]],
+    stage: Optional[str] = None,
+    deadline: Optional[float] = None,
+    use_cache: bool = True
 ) -> Dict[str, Optional[Dict[str, Any]]]:
     """
     Query multiple models in parallel.
@@ -91,14 +545,15 @@ async def query_models_parallel(
     Args:
         models: List of OpenRouter model identifiers
         messages: List of message dicts to send to each model
+        stage: Pipeline stage making the call, used to pick retry policies
+        deadline: time.monotonic() value by which every call must finish
+        use_cache: Set to False to bypass the response cache
 
     Returns:
         Dict mapping model identifier to response dict (or None if failed)
     """
-    import asyncio
-
     # Create tasks for all models
-    tasks = [query_model(model, messages) for model in models]
+    tasks = [query_model(model, messages, stage=stage, deadline=deadline, use_cache=use_cache) for model in models]
 
     # Wait for all to complete
     responses = await asyncio.gather(*tasks)
@@ -107,22 +562,151 @@ async def query_models_parallel(
     return {model: response for model, response in zip(models, responses)}
 
 
+async def query_models_quorum(
+    models: List[str],
+    messages: List[Dict[str, str]],
+    quorum: Optional[int] = None,
+    soft_deadline: Optional[float] = None,
+    stage: Optional[str] = None,
+    deadline: Optional[float] = None,
+    cancel_stragglers: bool = False
+) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Dict[str, "asyncio.Task"]]:
+    """
+    Query multiple models in parallel, returning before the slowest ones have answered.
+
+    The call returns as soon as `quorum` models have answered successfully, or
+    once `soft_deadline` seconds have passed and at least one model has
+    answered successfully. If neither happens it waits for every model, like
+    query_models_parallel.
+
+    Args:
+        models: List of OpenRouter model identifiers
+        messages: List of message dicts to send to each model
+        quorum: Number of successful answers to wait for (None or 0 waits for all)
+        soft_deadline: Seconds after which any successful answers are good enough
+        stage: Pipeline stage making the call, used to pick retry policies
+        deadline: time.monotonic() value by which every call must finish
+        cancel_stragglers: Cancel the models still running instead of leaving them
+            to finish in the background
+
+    Returns:
+        Tuple of (dict mapping each finished model to its response dict or None,
+        dict mapping each model still running to its task). The second dict is
+        empty when stragglers were cancelled.
+    """
+    tasks = {
+        asyncio.ensure_future(query_model(model, messages, stage=stage, deadline=deadline)): model
+        for model in models
+    }
+    soft_at = time.monotonic() + soft_deadline if soft_deadline else None
+
+    responses = {}
+    successes = 0
+    pending = set(tasks)
+    try:
+        while pending:
+            if quorum and successes >= quorum:
+                break
+            now = time.monotonic()
+            if soft_at is not None and now >= soft_at and successes:
+                break
+
+            timeout = soft_at - now if soft_at is not None and now < soft_at else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                response = task.result()
+                responses[tasks[task]] = response
+                if response is not None and 'error' not in response:
+                    successes += 1
+    except asyncio.CancelledError:
+        for task in pending:
+            task.cancel()
+        raise
+
+    stragglers = {tasks[task]: task for task in pending}
+    if stragglers:
+        action = "Cancelling" if cancel_stragglers else "Not waiting for"
+        print(f"{action} {len(stragglers)} slow model(s) after {successes} answers: {', '.join(stragglers)}")
+        if cancel_stragglers:
+            for task in pending:
+                task.cancel()
+            stragglers = {}
+
+    # Keep the order of `models` for callers that rely on it
+    ordered = {model: responses[model] for model in models if model in responses}
+    return ordered, stragglers
+
+
 async def query_model_stream(
     model: str,
     messages: List[Dict[str, str]],
-    timeout: float = DEFAULT_TIMEOUT
+    timeout: float = DEFAULT_TIMEOUT,
+    stage: Optional[str] = None,
+    deadline: Optional[float] = None,
+    use_cache: bool = True,
+    coalesce: bool = True
 ) -> AsyncGenerator[Dict[str, Any], None]:
     """
     Query a single model via OpenRouter API with streaming.
 
+    Failures before the first token arrives are retried like in query_model;
+    once output has been streamed, errors are reported as-is. Answers found in
+    the response cache are replayed as a synthetic stream. Concurrent identical
+    streams (same model, messages, stage and time budget) share one upstream
+    request whose chunks are multicast to each caller; a caller joining late
+    first receives the chunks it missed.
+
     Args:
         model: OpenRouter model identifier (e.g., "openai/gpt-4o")
         messages: List of message dicts with 'role' and 'content'
-        timeout: Request timeout in seconds
+        timeout: Request timeout in seconds (per attempt)
+        stage: Pipeline stage making the call, used to pick the retry policy
+        deadline: time.monotonic() value by which all attempts must finish
+        use_cache: Set to False to bypass the response cache for this call
+        coalesce: Set to False to always open a stream of its own
 
     Yields:
-        Dict with 'type' ('delta', 'done', 'error') and 'content' or 'error'
+        Dict with 'type' ('delta', 'done', 'error') and 'content' or 'error';
+        'done' and 'error' also carry 'retries' and 'metrics' (see CallMetrics),
+        and 'done' also 'cached' on cache hits
     """
+    if not coalesce:
+        source = _query_model_stream(model, messages, timeout, stage, deadline, use_cache)
+    else:
+        key = _coalescing_key(model, messages, timeout, stage, deadline, use_cache)
+        source = _inflight_streams.subscribe(
+            key, lambda: _query_model_stream(model, messages, timeout, stage, deadline, use_cache)
+        )
+    try:
+        async for chunk in source:
+            yield dict(chunk)
+    finally:
+        await source.aclose()
+
+
+async def _query_model_stream(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float,
+    stage: Optional[str],
+    deadline: Optional[float],
+    use_cache: bool
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Stream one model call (with retries before the first token); see query_model_stream."""
+    metrics = CallMetrics(streaming=True)
+    key = response_cache.cache_key(model, messages) if use_cache and response_cache.is_enabled(stage) else None
+    if key is not None:
+        cached = await asyncio.to_thread(response_cache.get_cache().get, key)
+        if cached is not None:
+            metrics.set_usage(cached.get('usage'))
+            for piece in response_cache.replay_chunks(cached.get('content') or ""):
+                metrics.token()
+                yield {"type": "delta", "content": piece}
+            call_metrics = metrics.to_dict()
+            _record_call(model, stage, "cached", 0, call_metrics, "stream")
+            yield {"type": "done", "retries": 0, "cached": True, "metrics": call_metrics}
+            return
+
     settings = get_settings()
     api_key = settings.get("openrouter_api_key")
     if not api_key:
@@ -138,52 +722,120 @@ async def query_model_stream(
         "model": model,
         "messages": messages,
         "stream": True,
+        # Ask OpenRouter to report token usage in the final chunk
+        "usage": {"include": True},
     }
 
+    if not health.allow_request(model):
+        _record_call(model, stage, "rejected", 0, None, "stream", health.unavailable_message(model))
+        yield {"type": "error", "error": health.unavailable_message(model), "retries": 0, "circuit_open": True}
+        return
+
+    policy = get_retry_policy(model, stage)
+    if deadline is None:
+        deadline = metrics.started + (policy.budget or timeout)
+    limiter = ratelimit.get_limiter()
+    # Someone is usually watching a stream, so it goes ahead of queued background work
+    level = ratelimit.current_priority(ratelimit.INTERACTIVE)
+
+    attempt = 0
+    first_token_latency = None
+    streamed = []
+    usage = None
+    recorded = False
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            async with client.stream(
-                "POST",
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status_code != 200:
-                    error_text = ""
-                    async for chunk in response.aiter_text():
-                        error_text += chunk
-                    try:
-                        error_data = json.loads(error_text)
-                        if 'error' in error_data:
-                            err = error_data['error']
-                            error_detail = err.get('message', str(err)) if isinstance(err, dict) else str(err)
-                        else:
-                            error_detail = error_text
-                    except Exception:
-                        error_detail = error_text or f"HTTP {response.status_code}"
-                    yield {"type": "error", "error": error_detail}
-                    return
-
-                async for line in response.aiter_lines():
-                    if not line:
-                        continue
-                    if line.startswith("data: "):
-                        data_str = line[6:]
-                        if data_str.strip() == "[DONE]":
-                            yield {"type": "done"}
-                            return
-                        try:
-                            data = json.loads(data_str)
-                            choices = data.get("choices", [])
-                            if choices:
-                                delta = choices[0].get("delta", {})
-                                content = delta.get("content", "")
-                                if content:
-                                    yield {"type": "delta", "content": content}
-                        except json.JSONDecodeError:
-                            continue
-
-    except httpx.TimeoutException:
-        yield {"type": "error", "error": f"Request timed out after {timeout}s"}
-    except Exception as e:
-        yield {"type": "error", "error": str(e)}
+        while True:
+            attempt += 1
+            attempt_timeout = min(timeout, max(deadline - time.monotonic(), 0.001))
+            retry_after = None
+            transient = False
+
+            try:
+                client = await get_http_client()
+                async with limiter.slot(model, level, timeout=attempt_timeout) as waited, client.stream(
+                    "POST",
+                    OPENROUTER_API_URL,
+                    headers=headers,
+                    json=payload,
+                    timeout=_request_timeout(min(timeout, max(deadline - time.monotonic(), 0.001))),
+                    extensions={"trace": metrics.trace}
+                ) as response:
+                    metrics.start_attempt(waited)
+                    if response.status_code != 200:
+                        error_text = ""
+                        async for chunk in response.aiter_text():
+                            error_text += chunk
+                        error_detail = _error_detail(response.status_code, error_text)
+                        transient = response.status_code in policy.retry_statuses
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if response.status_code == 429:
+                            limiter.pause(model, retry_after or policy.base_delay)
+                    else:
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            if line.startswith("data: "):
+                                data_str = line[6:]
+                                if data_str.strip() == "[DONE]":
+                                    break
+                                try:
+                                    data = json.loads(data_str)
+                                    if data.get("usage"):
+                                        usage = data["usage"]
+                                        metrics.set_usage(usage)
+                                    choices = data.get("choices", [])
+                                    if choices:
+                                        delta = choices[0].get("delta", {})
+                                        content = delta.get("content", "")
+                                        if content:
+                                            if first_token_latency is None:
+                                                first_token_latency = metrics.latency()
+                                            metrics.token()
+                                            streamed.append(content)
+                                            yield {"type": "delta", "content": content}
+                                except json.JSONDecodeError:
+                                    continue
+
+                        # Streams are judged by time to first token, not by how long the answer is
+                        health.record_success(model, first_token_latency or metrics.latency(), health.TTFT)
+                        recorded = True
+                        if key is not None:
+                            await asyncio.to_thread(
+                                response_cache.get_cache().put,
+                                key,
+                                {'content': "".join(streamed), 'reasoning_details': None, 'usage': usage}
+                            )
+                        call_metrics = metrics.to_dict()
+                        _record_call(model, stage, "success", attempt - 1, call_metrics, "stream")
+                        yield {"type": "done", "retries": attempt - 1, "metrics": call_metrics}
+                        return
+
+            except asyncio.TimeoutError:
+                # The limiter had no free slot before the deadline; nothing was sent
+                error_detail = "Timed out waiting for a free request slot (rate limit)"
+            except httpx.TimeoutException:
+                error_detail = f"Request timed out after {attempt_timeout:.0f}s"
+                transient = policy.retry_timeouts
+            except httpx.TransportError as e:
+                error_detail = str(e) or type(e).__name__
+                transient = True
+            except Exception as e:
+                error_detail = str(e)
+
+            # Once output has been sent to the caller the request cannot be replayed
+            retryable = transient and first_token_latency is None
+            delay = next_retry_delay(policy, attempt, deadline, retry_after) if retryable else None
+            if delay is None:
+                if transient:
+                    health.record_failure(model, metrics.latency(), error_detail)
+                    recorded = True
+                call_metrics = metrics.to_dict()
+                _record_call(model, stage, "error", attempt - 1, call_metrics, "stream", error_detail)
+                yield {"type": "error", "error": error_detail, "retries": attempt - 1, "metrics": call_metrics}
+                return
+
+            print(f"Retrying stream from {model} in {delay:.1f}s (attempt {attempt + 1}/{policy.max_attempts}): {error_detail}")
+            await asyncio.sleep(delay)
+    finally:
+        if not recorded:
+            health.release_probe(model)
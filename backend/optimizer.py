@@ -1,9 +1,11 @@
 """Prompt optimization orchestration logic."""
 
 from typing import List, Dict, Any, Optional
-from .openrouter import query_models_parallel, query_model
+from .openrouter import query_models_parallel, query_model, query_model_hedged
 from .config import TITLE_GENERATION_TIMEOUT, QUICK_GENERATION_TIMEOUT
 from .settings import get_settings, get_builtin_prompt
+from .health import filter_available, unavailable_message
+from .tracing import traced
 
 
 async def generate_prompt_title(prompt: str) -> str:
@@ -27,7 +29,7 @@ async def generate_prompt_title(prompt: str) -> str:
     generator_model = settings.get("generator_model", "x-ai/grok-4.1-fast:free")
 
     try:
-        response = await query_model(generator_model, messages, timeout=TITLE_GENERATION_TIMEOUT)
+        response = await query_model(generator_model, messages, timeout=TITLE_GENERATION_TIMEOUT, stage="title")
     except Exception:
         response = None
 
@@ -42,6 +44,7 @@ async def generate_prompt_title(prompt: str) -> str:
     return title
 
 
+@traced("optimizer.generate")
 async def generate_initial_prompt(objective: str) -> str:
     """
     Generate an initial prompt based on user objective.
@@ -68,7 +71,7 @@ Return ONLY the generated prompt text, without any meta-commentary or explanatio
     # Use fast, cheap model for generation
     settings = get_settings()
     generator_model = settings.get("generator_model", "x-ai/grok-4.1-fast:free")
-    response = await query_model(generator_model, messages, timeout=QUICK_GENERATION_TIMEOUT)
+    response = await query_model(generator_model, messages, timeout=QUICK_GENERATION_TIMEOUT, stage="generate")
 
     # If generation fails, bubble up so caller can handle stage rollback/retry
     if response is None:
@@ -81,10 +84,12 @@ Return ONLY the generated prompt text, without any meta-commentary or explanatio
     return response.get('content', '').strip()
 
 
+@traced("optimizer.test")
 async def test_prompt_with_models(
     prompt: str,
     models: Optional[List[str]] = None,
-    test_input: Optional[str] = None
+    test_input: Optional[str] = None,
+    use_cache: bool = True
 ) -> List[Dict[str, Any]]:
     """
     Test a prompt with multiple LLMs in parallel.
@@ -93,6 +98,7 @@ async def test_prompt_with_models(
         prompt: The prompt to test
         models: List of model identifiers (defaults to test_models from settings)
         test_input: Optional test input to use with the prompt
+        use_cache: Set to False to bypass the response cache
 
     Returns:
         List of test results with model, output, response_time
@@ -112,56 +118,75 @@ async def test_prompt_with_models(
         # Otherwise, just use the prompt as a user message
         messages = [{"role": "user", "content": prompt}]
 
+    # Models whose circuit is open are reported as failures without being queried
+    models, skipped = filter_available(models)
+
     # Query all models in parallel
-    responses = await query_models_parallel(models, messages)
+    responses = await query_models_parallel(models, messages, stage="test", use_cache=use_cache)
 
     # Format results
     test_results = []
     for model, response in responses.items():
         if response is not None and 'error' not in response:
-            test_results.append({
+            result = {
                 "model": model,
                 "output": response.get('content', ''),
                 "response_time": response.get('response_time', 0),
+                "retries": response.get('retries', 0),
                 "rating": None,  # Will be filled in by user
                 "feedback": None  # Will be filled in by user
-            })
+            }
+            if response.get('cached'):
+                result["cached"] = True
+            if response.get('metrics'):
+                result["metrics"] = response['metrics']
+            test_results.append(result)
         else:
             # Include failures for transparency with detailed error message
             error_detail = response.get('error', 'Model failed to respond') if response else 'Model failed to respond'
-            test_results.append({
+            metrics = response.get('metrics') if response else None
+            result = {
                 "model": model,
                 "output": f"[Error: {error_detail}]",
-                "response_time": 0,
+                "response_time": metrics["duration"] if metrics else 0,
+                "retries": response.get('retries', 0) if response else 0,
                 "rating": None,
                 "feedback": None,
                 "error": True,
                 "error_detail": error_detail
-            })
+            }
+            if metrics:
+                result["metrics"] = metrics
+            test_results.append(result)
+
+    for model in skipped:
+        error_detail = unavailable_message(model)
+        test_results.append({
+            "model": model,
+            "output": f"[Error: {error_detail}]",
+            "response_time": 0,
+            "retries": 0,
+            "rating": None,
+            "feedback": None,
+            "error": True,
+            "error_detail": error_detail,
+            "circuit_open": True
+        })
 
     return test_results
 
 
-async def collect_improvement_suggestions(
-    current_prompt: str,
-    test_results: List[Dict[str, Any]],
-    models: Optional[List[str]] = None
-) -> List[Dict[str, Any]]:
+def build_suggestion_messages(current_prompt: str, test_results: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     """
-    Collect improvement suggestions from LLMs based on test results and user feedback.
+    Build the request asking a model to improve a prompt from its test results and feedback.
 
     Args:
         current_prompt: The current prompt being optimized
         test_results: Test results with user ratings and feedback
-        models: Models to ask for suggestions (defaults to models that were tested)
 
     Returns:
-        List of suggestions with model and suggestion text
+        List of message dicts
     """
-    if models is None:
-        # Use the models that were successfully tested
-        models = [r["model"] for r in test_results if not r.get("error")]
-
     # Build context about test results and feedback
     results_summary = []
     for result in test_results:
@@ -205,22 +230,51 @@ This prompt was tested with multiple LLMs. Here are the results and user feedbac
 Based on the test results and user feedback, suggest specific improvements to the prompt."""
 
     messages = [{"role": "user", "content": suggestion_prompt}]
+    return messages
+
+
+@traced("optimizer.suggest")
+async def collect_improvement_suggestions(
+    current_prompt: str,
+    test_results: List[Dict[str, Any]],
+    models: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Collect improvement suggestions from LLMs based on test results and user feedback.
+
+    Args:
+        current_prompt: The current prompt being optimized
+        test_results: Test results with user ratings and feedback
+        models: Models to ask for suggestions (defaults to models that were tested)
+
+    Returns:
+        List of suggestions with model and suggestion text
+    """
+    if models is None:
+        # Use the models that were successfully tested
+        models = [r["model"] for r in test_results if not r.get("error")]
+
+    messages = build_suggestion_messages(current_prompt, test_results)
 
     # Query models for suggestions in parallel
-    responses = await query_models_parallel(models, messages)
+    responses = await query_models_parallel(models, messages, stage="suggest")
 
     # Format suggestions
     suggestions = []
     for model, response in responses.items():
         if response is not None:
-            suggestions.append({
+            suggestion = {
                 "model": model,
                 "suggestion": response.get('content', '')
-            })
+            }
+            if response.get('metrics'):
+                suggestion["metrics"] = response['metrics']
+            suggestions.append(suggestion)
 
     return suggestions
 
 
+@traced("optimizer.merge")
 async def merge_suggestions(
     current_prompt: str,
     suggestions: List[Dict[str, Any]],
@@ -284,7 +338,7 @@ Return your response in the following format:
     # Use synthesizer model
     settings = get_settings()
     synthesizer_model = settings.get("synthesizer_model", "x-ai/grok-4.1-fast:free")
-    response = await query_model(synthesizer_model, messages, timeout=QUICK_GENERATION_TIMEOUT)
+    response = await query_model_hedged(synthesizer_model, messages, timeout=QUICK_GENERATION_TIMEOUT, stage="merge")
 
     if response is None:
         # Fallback: return first suggestion's content
@@ -340,6 +394,110 @@ def calculate_iteration_metrics(iteration: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def calculate_batch_metrics(samples: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Calculate metrics for a run of an iteration over several test samples.
+
+    Args:
+        samples: Mapping of test sample id to a dict with that sample's test_results
+
+    Returns:
+        Dict with 'aggregate' metrics over all results, plus metrics 'by_sample' and 'by_model'
+    """
+    all_results = [result for sample in samples.values() for result in sample.get("test_results", [])]
+
+    by_model: Dict[str, List[Dict[str, Any]]] = {}
+    for result in all_results:
+        by_model.setdefault(result["model"], []).append(result)
+
+    aggregate = calculate_iteration_metrics({"test_results": all_results})
+    aggregate["error_count"] = len([r for r in all_results if r.get("error")])
+
+    return {
+        "aggregate": aggregate,
+        "by_sample": {
+            sample_id: calculate_iteration_metrics(sample)
+            for sample_id, sample in samples.items()
+        },
+        "by_model": {
+            model: calculate_iteration_metrics({"test_results": results})
+            for model, results in by_model.items()
+        },
+    }
+
+
+def iteration_call_records(iteration: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Collect every stored model call of an iteration (tests, batch runs and suggestions).
+
+    Args:
+        iteration: The iteration dict
+
+    Returns:
+        List of test result / suggestion dicts, each with 'model' and possibly 'metrics'
+    """
+    records = list(iteration.get("test_results", []))
+    batch_results = iteration.get("batch_results") or {}
+    for sample in batch_results.get("samples", {}).values():
+        records.extend(sample.get("test_results", []))
+    records.extend(iteration.get("suggestions") or [])
+    return records
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def _average(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 3) if values else None
+
+
+def calculate_performance_metrics(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate the latency and token metrics recorded on model calls, per model.
+
+    Calls stored before metrics were recorded (no 'metrics' field) are skipped.
+
+    Args:
+        records: Test result / suggestion dicts with 'model' and 'metrics'
+
+    Returns:
+        Dict mapping model to calls, errors, average and p95 duration, average
+        queue wait, connect time and time to first token, token totals and
+        average tokens per second
+    """
+    by_model: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        if record.get("metrics"):
+            by_model.setdefault(record["model"], []).append(record)
+
+    performance = {}
+    for model, calls in by_model.items():
+        metrics = [call["metrics"] for call in calls]
+
+        def values(key: str) -> List[float]:
+            return [m[key] for m in metrics if m.get(key) is not None]
+
+        durations = values("duration")
+        p95 = _percentile(durations, 95)
+        performance[model] = {
+            "calls": len(calls),
+            "errors": len([call for call in calls if call.get("error")]),
+            "avg_duration": _average(durations),
+            "p95_duration": round(p95, 3) if p95 is not None else None,
+            "avg_queue_wait": _average(values("queue_wait")),
+            "avg_connect_time": _average(values("connect_time")),
+            "avg_ttft": _average(values("ttft")),
+            "tokens_in": sum(values("tokens_in")),
+            "tokens_out": sum(values("tokens_out")),
+            "avg_tokens_per_sec": _average(values("tokens_per_sec")),
+        }
+    return performance
+
+
 def create_version_diff(old_prompt: str, new_prompt: str) -> Dict[str, Any]:
     """
     Create a diff between two prompt versions.
@@ -0,0 +1,311 @@
+"""In-process sampling profiler and event loop stall detection, switched on at runtime.
+
+SamplingProfiler runs a background thread that samples the stack of every
+thread at a fixed interval (wall-clock, so waiting counts as well as
+computing). With include_tasks it also samples the suspended stack of every
+asyncio task, so time spent awaiting a model call or a storage write shows up
+under the coroutine that is waiting. The result is in the collapsed-stack
+format ("frame;frame;frame count" per line) read by flamegraph.pl, speedscope
+and similar tools.
+
+LoopMonitor detects callbacks that block the event loop: a heartbeat
+coroutine notices when it wakes up late, and a watchdog thread captures the
+loop thread's stack while it is stuck, which names the blocking code (a
+synchronous storage call, a huge json.dumps, ...) and the handler in
+backend/main.py it was called from.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import SLOW_CALLBACK_HISTORY
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_HANDLER_FILE = os.path.join(_BACKEND_DIR, "main.py")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _thread_frames(frame) -> List[Any]:
+    """Return the frames of a thread's stack, outermost first."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _thread_stack(frame) -> List[str]:
+    """Return the frames of a thread's stack as labels, outermost first."""
+    return [_frame_label(f) for f in _thread_frames(frame)]
+
+
+def _task_stack(task: asyncio.Task) -> List[str]:
+    """Return the suspended coroutine frames of a task as labels, outermost first."""
+    try:
+        frames = task.get_stack()
+    except Exception:
+        return []
+    return [_frame_label(frame) for frame in frames]
+
+
+class SamplingProfiler:
+    """Samples thread (and optionally asyncio task) stacks for a limited time."""
+
+    def __init__(self):
+        self.running = False
+        self.started_at: Optional[str] = None
+        self.stopped_at: Optional[str] = None
+        self.duration = 0.0
+        self.interval = 0.0
+        self.include_tasks = False
+        self.samples = 0
+        self._counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._done: Optional[asyncio.Event] = None
+        self._owns_monitor = False
+
+    def start(
+        self,
+        duration: float,
+        interval: float,
+        include_tasks: bool = True,
+        slow_callback_threshold: Optional[float] = None
+    ):
+        """
+        Start sampling; must be called from the event loop.
+
+        Args:
+            duration: Seconds to sample before stopping automatically
+            interval: Seconds between samples
+            include_tasks: Also sample the stacks of suspended asyncio tasks
+            slow_callback_threshold: If set, also watch the event loop for
+                callbacks running longer than this many seconds while sampling
+
+        Raises:
+            ValueError: If the profiler is already running
+        """
+        if self.running:
+            raise ValueError("The profiler is already running")
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        monitor = get_loop_monitor()
+        self._owns_monitor = slow_callback_threshold is not None and not monitor.running
+        if self._owns_monitor:
+            monitor.start(slow_callback_threshold)
+        self._counts = Counter()
+        self.samples = 0
+        self.duration = duration
+        self.interval = interval
+        self.include_tasks = include_tasks
+        self.started_at = datetime.now().isoformat()
+        self.stopped_at = None
+        self.running = True
+        self._done = asyncio.Event()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        self._timer = asyncio.create_task(self._stop_after(duration))
+
+    async def _stop_after(self, duration: float):
+        await asyncio.sleep(duration)
+        self._timer = None
+        self.stop()
+
+    def stop(self):
+        """Stop sampling (early); the collected profile stays available."""
+        if not self.running:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._owns_monitor:
+            get_loop_monitor().stop()
+            self._owns_monitor = False
+        self.running = False
+        self.stopped_at = datetime.now().isoformat()
+        self._done.set()
+
+    async def wait(self):
+        """Wait until the current run has stopped."""
+        if self._done is not None:
+            await self._done.wait()
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        loop_thread_id = self._loop_thread_id
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = "event-loop" if thread_id == loop_thread_id else names.get(thread_id, str(thread_id))
+                self._counts[";".join([f"thread:{name}"] + _thread_stack(frame))] += 1
+
+            if self.include_tasks and self._loop is not None:
+                try:
+                    tasks = asyncio.all_tasks(self._loop)
+                except RuntimeError:
+                    tasks = set()
+                for task in tasks:
+                    stack = _task_stack(task)
+                    if stack:
+                        self._counts[";".join([f"task:{task.get_name()}"] + stack)] += 1
+
+            self.samples += 1
+            next_sample += self.interval
+            self._stop.wait(max(next_sample - time.perf_counter(), 0.0))
+
+    def folded(self) -> str:
+        """Return the profile in the collapsed-stack format, heaviest stacks first."""
+        counts = dict.copy(self._counts)  # atomic, the sampling thread may still be adding
+        ordered = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in ordered)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "duration": self.duration,
+            "interval_ms": round(self.interval * 1000, 3),
+            "include_tasks": self.include_tasks,
+            "samples": self.samples,
+            "stacks": len(self._counts),
+        }
+
+
+class LoopMonitor:
+    """Reports callbacks that keep the event loop busy for longer than a threshold."""
+
+    def __init__(self):
+        self.running = False
+        self.threshold = 0.0
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=SLOW_CALLBACK_HISTORY)
+        self._beat = 0.0
+        self._blocked_frames: Optional[List[Any]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self, threshold: float):
+        """
+        Start watching the running event loop; must be called from it.
+
+        Args:
+            threshold: Seconds a callback may run before it is reported
+        """
+        self.threshold = threshold
+        if self.running:
+            return
+        self.running = True
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _tick(self) -> float:
+        return min(self.threshold / 4, 0.05)
+
+    async def _heartbeat_loop(self):
+        while True:
+            tick = self._tick()
+            expected = time.perf_counter() + tick
+            self._beat = expected
+            await asyncio.sleep(tick)
+            late = time.perf_counter() - expected
+            if late > self.threshold:
+                self._report(late)
+            self._blocked_frames = None
+
+    def _watch(self):
+        while not self._stop.wait(self._tick()):
+            if self._blocked_frames is None and time.perf_counter() - self._beat > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._blocked_frames = _thread_frames(frame)
+
+    def _report(self, blocked: float):
+        frames = self._blocked_frames or []
+        # The innermost frame in backend/main.py is the handler, the innermost backend frame the culprit
+        handler = None
+        location = None
+        for frame in reversed(frames):
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if location is None and filename.startswith(_BACKEND_DIR + os.sep):
+                location = f"{_frame_label(frame)} line {frame.f_lineno}"
+            if filename == _HANDLER_FILE:
+                handler = f"{_frame_label(frame)} line {frame.f_lineno}"
+                break
+
+        event = {
+            "at": datetime.now().isoformat(),
+            "blocked_ms": round(blocked * 1000, 1),
+            "handler": handler,
+            "location": location,
+            "stack": ";".join(_frame_label(frame) for frame in frames) if frames else None,
+        }
+        self.events.append(event)
+        print(f"Event loop blocked for {event['blocked_ms']:.0f} ms in {handler or location or 'unknown code'}")
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "events": list(self.events),
+        }
+
+
+_profiler: Optional[SamplingProfiler] = None
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """Return the process-wide profiler, creating it on first use."""
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
+
+
+def get_loop_monitor() -> LoopMonitor:
+    """Return the process-wide event loop monitor, creating it on first use."""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopMonitor()
+    return _monitor
@@ -0,0 +1,352 @@
+"""Scheduling of outbound OpenRouter calls: concurrency limits, token buckets and priorities.
+
+Every upstream attempt takes a slot from three limits before it is sent: the
+global limit, the limit of its provider (the model id up to the first "/",
+e.g. "x-ai") and the limit of the model itself. Each limit can cap the calls
+in flight ("concurrency") and the request rate ("rate" requests per second,
+in bursts of up to "burst"). Limits come from the ``rate_limits`` setting::
+
+    {
+        "global": {"concurrency": 32},
+        "providers": {"x-ai": {"concurrency": 4, "rate": 2, "burst": 4}},
+        "models": {"google/*": {"concurrency": 2}}
+    }
+
+Global defaults come from config.py; providers and models without an entry
+are unlimited. Model entries (exact id or glob pattern) apply to each matching
+model separately. A 429 response pauses the whole provider for its
+Retry-After.
+
+Waiting calls are granted by priority (INTERACTIVE, then NORMAL, then
+BACKGROUND), first come first served within a class. A waiting call keeps
+lower-priority calls from taking the limits it is waiting for, so a queue of
+batch work cannot starve interactive streams. The priority of a call is taken
+from the surrounding `priority()` context.
+"""
+
+import asyncio
+import bisect
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from fnmatch import fnmatchcase
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Mapping, Optional, Set
+
+from .config import RATE_LIMIT_CONCURRENCY, RATE_LIMIT_RPS, RATE_LIMIT_BURST
+from .settings import get_settings
+
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+# Number of recent wait times kept for the percentiles in get_stats()
+WAIT_SAMPLES = 500
+
+_priority: ContextVar[Optional[int]] = ContextVar("llm_council_priority", default=None)
+
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run the calls made inside the block (and in tasks it starts) with the given priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(default: int = NORMAL) -> int:
+    """Return the priority set by the surrounding `priority()` block, or `default`."""
+    level = _priority.get()
+    return default if level is None else level
+
+
+def provider_of(model: str) -> str:
+    """Return the provider prefix of a model id ("x-ai/grok-4" -> "x-ai")."""
+    return model.split("/", 1)[0]
+
+
+def _wait_summary(samples: Deque[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0, "avg": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "count": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 4),
+        "p95": round(p95, 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+class _Limit:
+    """One concurrency limit plus token bucket (global, provider or model)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.concurrency = 0  # 0 = unlimited
+        self.rate = 0.0  # requests per second, 0 = unlimited
+        self.burst = 1.0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.granted = 0
+        self.pauses = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def configure(self, config: Mapping[str, Any]):
+        concurrency = int(config.get("concurrency") or 0)
+        rate = float(config.get("rate") or 0)
+        burst = max(float(config.get("burst") or max(rate, 1.0)), 1.0)
+        if rate > 0 and self.rate <= 0:
+            # A newly enabled bucket starts full
+            self.tokens = burst
+            self.updated = time.monotonic()
+        self.concurrency, self.rate, self.burst = concurrency, rate, burst
+        self.tokens = min(self.tokens, self.burst)
+
+    def refill(self, now: float):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> Optional[float]:
+        """
+        How long a new call has to wait for this limit.
+
+        Returns:
+            0 if it can go now, seconds until a token (or the end of a pause)
+            if that is all it needs, None if it must wait for a call to finish
+        """
+        if self.concurrency and self.in_flight >= self.concurrency:
+            return None
+        delay = max(self.paused_until - now, 0.0)
+        if self.rate > 0 and self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        return delay
+
+    def take(self):
+        self.in_flight += 1
+        self.granted += 1
+        if self.rate > 0:
+            self.tokens -= 1
+
+    def snapshot(self, now: float, queued: int) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency or None,
+            "rate": self.rate or None,
+            "in_flight": self.in_flight,
+            "queued": queued,
+            "granted": self.granted,
+            "paused_for": round(max(self.paused_until - now, 0.0), 3),
+            "pauses": self.pauses,
+            "wait": _wait_summary(self.waits),
+        }
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "limits", "future", "enqueued")
+
+    def __init__(self, priority: int, seq: int, limits: List[_Limit], future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.limits = limits
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RateLimiter:
+    """Grants request slots under the global, provider and model limits, highest priority first."""
+
+    def __init__(self):
+        self._limits: Dict[str, _Limit] = {}
+        self._waiters: List[_Waiter] = []  # sorted by (priority, arrival)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = 0.0
+        self._priority_waits: Dict[int, Deque[float]] = {level: deque(maxlen=WAIT_SAMPLES) for level in PRIORITY_NAMES}
+        self._priority_granted: Dict[int, int] = {level: 0 for level in PRIORITY_NAMES}
+
+    def _limit(self, name: str, config: Optional[Mapping[str, Any]]) -> _Limit:
+        limit = self._limits.get(name)
+        if limit is None:
+            limit = self._limits[name] = _Limit(name)
+        limit.configure(config or {})
+        return limit
+
+    def _limits_for(self, model: str) -> List[_Limit]:
+        """Resolve (and refresh from the settings) the limits a call to `model` needs."""
+        config = get_settings().get("rate_limits") or {}
+        global_config = {
+            "concurrency": RATE_LIMIT_CONCURRENCY,
+            "rate": RATE_LIMIT_RPS,
+            "burst": RATE_LIMIT_BURST,
+            **(config.get("global") or {}),
+        }
+
+        provider = provider_of(model)
+        models = config.get("models") or {}
+        model_config = models.get(model)
+        if model_config is None:
+            for pattern, overrides in models.items():
+                if fnmatchcase(model, pattern):
+                    model_config = overrides
+                    break
+
+        return [
+            self._limit("global", global_config),
+            self._limit(f"provider:{provider}", (config.get("providers") or {}).get(provider)),
+            self._limit(f"model:{model}", model_config),
+        ]
+
+    async def acquire(self, model: str, level: int = NORMAL, timeout: Optional[float] = None) -> List[_Limit]:
+        """
+        Wait for a slot to call `model`.
+
+        Args:
+            model: OpenRouter model identifier
+            level: Priority class (INTERACTIVE, NORMAL or BACKGROUND)
+            timeout: Seconds to wait at most (None to wait indefinitely)
+
+        Returns:
+            The limits held; pass them to release() when the call is done
+
+        Raises:
+            asyncio.TimeoutError: If no slot became free within `timeout`
+        """
+        limits = self._limits_for(model)
+        waiter = _Waiter(level, next(self._seq), limits, asyncio.get_running_loop().create_future())
+        bisect.insort(self._waiters, waiter)
+        self._dispatch()
+
+        try:
+            if waiter.future.done():
+                await waiter.future
+            else:
+                await asyncio.wait_for(waiter.future, timeout)
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller gave up
+                self.release(limits)
+            else:
+                waiter.future.cancel()
+                self._dispatch()
+            raise
+
+        waited = time.monotonic() - waiter.enqueued
+        for limit in limits:
+            limit.waits.append(waited)
+        self._priority_waits[level].append(waited)
+        self._priority_granted[level] += 1
+        return limits
+
+    def release(self, limits: List[_Limit]):
+        """Give back the slots taken by acquire()."""
+        for limit in limits:
+            limit.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model: str, level: Optional[int] = None, timeout: Optional[float] = None) -> AsyncIterator[float]:
+        """
+        Hold a slot for one upstream attempt.
+
+        Yields:
+            Seconds spent waiting for the slot
+        """
+        started = time.monotonic()
+        limits = await self.acquire(model, current_priority() if level is None else level, timeout)
+        try:
+            yield time.monotonic() - started
+        finally:
+            self.release(limits)
+
+    def pause(self, model: str, seconds: float):
+        """Stop granting slots for the provider of `model` for a while (e.g. after a 429)."""
+        limit = self._limits_for(model)[1]
+        until = time.monotonic() + max(seconds, 0.0)
+        if until > limit.paused_until:
+            limit.paused_until = until
+            limit.pauses += 1
+
+    def _dispatch(self):
+        """Grant every waiter that can go now, in priority order, and schedule the next check."""
+        now = time.monotonic()
+        for limit in self._limits.values():
+            limit.refill(now)
+
+        # Limits a higher-priority waiter is waiting for; lower ones may not take them
+        reserved: Set[_Limit] = set()
+        next_check: Optional[float] = None
+        remaining = []
+        for waiter in self._waiters:
+            if waiter.future.done():
+                continue
+            blocking = []
+            for limit in waiter.limits:
+                delay = None if limit in reserved else limit.delay(now)
+                if delay is None or delay > 0:
+                    blocking.append(limit)
+                    if delay:
+                        next_check = delay if next_check is None else min(next_check, delay)
+            if blocking:
+                reserved.update(blocking)
+                remaining.append(waiter)
+                continue
+            for limit in waiter.limits:
+                limit.take()
+            waiter.future.set_result(None)
+        self._waiters = remaining
+
+        if next_check is not None:
+            at = now + next_check
+            if self._timer is None or self._timer.cancelled() or at < self._timer_at or self._timer_at <= now:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = asyncio.get_running_loop().call_later(next_check, self._dispatch)
+                self._timer_at = at
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth and wait times per priority class and per limit."""
+        now = time.monotonic()
+        waiting = [waiter for waiter in self._waiters if not waiter.future.done()]
+        queued: Dict[str, int] = {}
+        for waiter in waiting:
+            for limit in waiter.limits:
+                queued[limit.name] = queued.get(limit.name, 0) + 1
+
+        return {
+            "queued": len(waiting),
+            "priorities": {
+                name: {
+                    "queued": len([w for w in waiting if w.priority == level]),
+                    "granted": self._priority_granted[level],
+                    "wait": _wait_summary(self._priority_waits[level]),
+                }
+                for level, name in PRIORITY_NAMES.items()
+            },
+            "limits": [
+                limit.snapshot(now, queued.get(limit.name, 0))
+                for limit in self._limits.values()
+            ],
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_limiter() -> RateLimiter:
+    """Return the process-wide limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,206 @@
+"""Content-addressed on-disk cache of model responses.
+
+Responses are keyed by a SHA-256 hash of the model, the messages and the
+request parameters, and stored as one JSON file per entry. The cache is
+opt-in per pipeline stage through the ``response_cache`` setting::
+
+    "response_cache": {"enabled": true, "stages": ["title", "test"]}
+
+Entries older than RESPONSE_CACHE_TTL are treated as misses, and the least
+recently used entries are evicted once the cache grows past
+RESPONSE_CACHE_MAX_BYTES. File mtimes double as access times, so the LRU
+order survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .config import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_REPLAY_CHUNK
+from .settings import get_settings
+from .storage_json import atomic_write_json
+
+# Directory holding the cache entries (in user's home directory)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".llm-council", "response-cache")
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compute the cache key of a model call.
+
+    Args:
+        model: OpenRouter model identifier
+        messages: Messages sent to the model
+        params: Other request parameters that influence the answer
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_enabled(stage: Optional[str]) -> bool:
+    """Whether responses of calls made by `stage` should be cached."""
+    config = get_settings().get("response_cache") or {}
+    return bool(config.get("enabled")) and stage in (config.get("stages") or [])
+
+
+def replay_chunks(content: str, chunk_size: int = RESPONSE_CACHE_REPLAY_CHUNK) -> List[str]:
+    """Split cached content into delta-sized pieces for synthetic SSE replay."""
+    return [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)] or [""]
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of model responses backed by a directory of JSON files."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl: float):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> file size, least recently used first; loaded lazily from disk
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self):
+        """Build the LRU index from the files on disk (oldest mtime first)."""
+        if self._entries is not None:
+            return
+        files = []
+        if os.path.isdir(self.cache_dir):
+            for filename in os.listdir(self.cache_dir):
+                if not filename.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, filename[:-5], stat.st_size))
+        files.sort()
+        self._entries = OrderedDict((key, size) for _, key, size in files)
+        self._total_bytes = sum(self._entries.values())
+
+    def _remove(self, key: str):
+        size = self._entries.pop(key, 0)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Returns:
+            The cached response dict, or None on a miss or an expired entry
+        """
+        with self._lock:
+            self._load()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            if time.time() - entry.get("created_at", 0) > self.ttl:
+                self._remove(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            # Touch the file so the LRU order survives restarts
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["response"]
+
+    def put(self, key: str, response: Dict[str, Any]):
+        """Store a response, evicting least recently used entries beyond the size limit."""
+        with self._lock:
+            self._load()
+            path = self._path(key)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                atomic_write_json(path, {"created_at": time.time(), "response": response})
+                size = os.path.getsize(path)
+            except OSError as e:
+                # A full or read-only disk must not turn a good answer into an error
+                print(f"Could not write response cache entry: {e}")
+                return
+
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.writes += 1
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> int:
+        """Delete every cache entry. Returns the number of entries removed."""
+        with self._lock:
+            self._load()
+            count = len(self._entries)
+            for key in list(self._entries):
+                self._remove(key)
+            return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, hit rate and current size."""
+        with self._lock:
+            self._load()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(CACHE_DIR, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL)
+    return _cache
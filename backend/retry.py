@@ -0,0 +1,152 @@
+"""Retry policy for OpenRouter calls: exponential backoff with jitter, Retry-After and deadline budgets.
+
+Policies are resolved per call from the ``retry_policy`` setting, which looks like::
+
+    {
+        "default": {"max_attempts": 3},
+        "stages": {"stage3": {"max_attempts": 4, "budget": 240}},
+        "models": {"x-ai/*": {"base_delay": 2.0}}
+    }
+
+Stage entries override the default, and model entries (exact id or glob
+pattern) override both. Any field left out falls back to the values in
+config.py.
+"""
+
+import random
+import time
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from fnmatch import fnmatchcase
+from typing import Any, Mapping, Optional, Tuple
+
+from .config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    RETRY_MAX_RETRY_AFTER,
+)
+from .settings import get_settings
+
+# 408 Request Timeout, 429 Too Many Requests and transient gateway/server errors
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how patiently a model call is retried."""
+
+    max_attempts: int = RETRY_MAX_ATTEMPTS  # including the first attempt
+    base_delay: float = RETRY_BASE_DELAY  # seconds before the first retry (before jitter)
+    max_delay: float = RETRY_MAX_DELAY  # cap on the exponential backoff
+    multiplier: float = 2.0
+    max_retry_after: float = RETRY_MAX_RETRY_AFTER  # longer Retry-After values are not waited for
+    budget: Optional[float] = None  # total seconds for all attempts; defaults to the call's timeout
+    retry_statuses: Tuple[int, ...] = RETRYABLE_STATUS_CODES
+    retry_timeouts: bool = True
+
+    def with_overrides(self, overrides: Optional[Mapping[str, Any]]) -> "RetryPolicy":
+        """Return a copy with the known fields of `overrides` applied (unknown keys are ignored)."""
+        if not overrides:
+            return self
+        known = {f.name for f in fields(self)}
+        values = {k: v for k, v in overrides.items() if k in known}
+        if "retry_statuses" in values:
+            values["retry_statuses"] = tuple(int(s) for s in values["retry_statuses"])
+        return replace(self, **values)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def get_retry_policy(model: str, stage: Optional[str] = None) -> RetryPolicy:
+    """
+    Resolve the retry policy for one call.
+
+    Args:
+        model: OpenRouter model identifier
+        stage: Pipeline stage making the call (e.g. "stage1", "test", "merge")
+
+    Returns:
+        The effective RetryPolicy
+    """
+    config = get_settings().get("retry_policy") or {}
+    policy = DEFAULT_RETRY_POLICY.with_overrides(config.get("default"))
+
+    if stage:
+        policy = policy.with_overrides((config.get("stages") or {}).get(stage))
+
+    models = config.get("models") or {}
+    if model in models:
+        policy = policy.with_overrides(models[model])
+    else:
+        for pattern, overrides in models.items():
+            if fnmatchcase(model, pattern):
+                policy = policy.with_overrides(overrides)
+                break
+
+    return policy
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given as seconds or as an HTTP date.
+
+    Returns:
+        Seconds to wait (never negative), or None if absent or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def next_retry_delay(
+    policy: RetryPolicy,
+    attempt: int,
+    deadline: float,
+    retry_after: Optional[float] = None
+) -> Optional[float]:
+    """
+    Decide whether a failed attempt may be retried and how long to wait first.
+
+    Args:
+        policy: The effective retry policy
+        attempt: Number of the attempt that just failed (1-based)
+        deadline: time.monotonic() value by which the whole call must finish
+        retry_after: Server-requested wait in seconds, if any
+
+    Returns:
+        Seconds to sleep before the next attempt, or None to give up
+    """
+    if attempt >= policy.max_attempts:
+        return None
+
+    if retry_after is not None:
+        if retry_after > policy.max_retry_after:
+            return None
+        # Spread out clients that were all told to come back at the same moment
+        delay = retry_after + random.uniform(0, policy.base_delay)
+    else:
+        delay = policy.backoff(attempt)
+
+    # Leave at least a second for the retry itself; otherwise it cannot succeed in time
+    if time.monotonic() + delay + 1.0 > deadline:
+        return None
+    return delay
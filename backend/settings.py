@@ -2,9 +2,12 @@
 
 import json
 import os
+import threading
+import time
 from copy import deepcopy
 from pathlib import Path
-from typing import Dict, Any, List
+from types import MappingProxyType
+from typing import Callable, Dict, Any, List, Mapping, Optional, Tuple
 
 from .config import (
     OPENROUTER_API_KEY,
@@ -13,6 +16,7 @@ from .config import (
     GENERATOR_MODEL,
 )
 from .platform_utils import get_user_data_dir, ensure_data_dir, secure_file_permissions, is_desktop_mode
+from .storage_json import atomic_write_json
 
 # Use platform-appropriate data directory in desktop mode, otherwise use local data/
 def _get_data_dir() -> str:
@@ -66,28 +70,80 @@ DEFAULT_SETTINGS = {
     "test_models": TEST_MODELS,
     "synthesizer_model": SYNTHESIZER_MODEL,
     "generator_model": GENERATOR_MODEL,
+    # Overrides for backend/retry.py: {"default": {...}, "stages": {...}, "models": {...}}
+    "retry_policy": {"default": {}, "stages": {}, "models": {}},
+    # Hedged requests for slow single calls: duplicate to the same (or a fallback) model
+    "hedging": {"enabled": False, "stages": ["stage3", "merge"], "fallback_models": {}},
+    # On-disk cache of responses for calls that are expected to be repeatable
+    "response_cache": {"enabled": False, "stages": ["title", "test"]},
+    # Overrides for backend/ratelimit.py: {"global": {...}, "providers": {...}, "models": {...}}
+    "rate_limits": {"global": {}, "providers": {}, "models": {}},
+    # Pipelined council: each stage starts once a quorum of the previous one is in (0 = majority)
+    "council_pipeline": {"enabled": False, "stage1_quorum": 0, "stage2_quorum": 0, "soft_deadline": 0},
 }
 
 
+# How often (seconds) get_settings re-checks settings.json for external edits
+SETTINGS_RECHECK_INTERVAL = 1.0
+
+# In-memory snapshot of the settings, refreshed only when the file changes or is saved
+_snapshot: Optional[Mapping[str, Any]] = None
+_snapshot_signature: Optional[Tuple[int, int]] = None
+_last_checked = 0.0
+_data_dir_ready = False
+_settings_lock = threading.RLock()
+_subscribers: List[Callable[[Mapping[str, Any]], None]] = []
+
+
 def _ensure_data_dir():
+    global _data_dir_ready
+    if _data_dir_ready:
+        return
     data_dir = _get_data_dir()
     Path(data_dir).mkdir(parents=True, exist_ok=True)
+    _data_dir_ready = True
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts/lists into read-only mappings/tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Recursively convert a frozen snapshot back into plain dicts/lists."""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 
 def _write_settings(settings: Dict[str, Any]):
     settings_file = _get_settings_file()
-    with open(settings_file, "w", encoding="utf-8") as f:
-        json.dump(settings, f, indent=2, ensure_ascii=False)
+    # Atomic, so the snapshot never re-reads a half-written file and falls back to defaults
+    atomic_write_json(settings_file, _thaw(settings), indent=2)
     # Set secure permissions in desktop mode
     if is_desktop_mode():
         secure_file_permissions(Path(settings_file))
 
 
-def get_settings() -> Dict[str, Any]:
+def _load_settings_file() -> Dict[str, Any]:
     """
     Load settings from disk, falling back to defaults when needed.
     """
-    _ensure_data_dir()
     settings_file = _get_settings_file()
     raw = {}
     if os.path.exists(settings_file):
@@ -109,7 +165,55 @@ def get_settings() -> Dict[str, Any]:
     if not os.path.exists(settings_file):
         _write_settings(settings)
 
-    return deepcopy(settings)
+    return settings
+
+
+def _publish(settings: Dict[str, Any]) -> Mapping[str, Any]:
+    """Install a new snapshot and notify subscribers if the contents changed."""
+    global _snapshot, _snapshot_signature, _last_checked
+    frozen = _freeze(settings)
+    with _settings_lock:
+        previous = _snapshot
+        _snapshot = frozen
+        _snapshot_signature = _file_signature(_get_settings_file())
+        _last_checked = time.monotonic()
+        subscribers = list(_subscribers)
+
+    if previous is not None and _thaw(previous) != settings:
+        for callback in subscribers:
+            try:
+                callback(frozen)
+            except Exception as e:
+                print(f"Settings subscriber {callback!r} failed: {e}")
+    return frozen
+
+
+def get_settings() -> Mapping[str, Any]:
+    """
+    Return the current settings as an immutable, read-only snapshot.
+
+    The snapshot is cached in memory; settings.json is re-read only when its
+    mtime/size changes (checked at most every SETTINGS_RECHECK_INTERVAL seconds)
+    or after save_settings/reset_settings. Nested dicts are read-only mappings
+    and lists are tuples; use dict(...)/list(...) to get a mutable copy.
+    """
+    global _last_checked
+    with _settings_lock:
+        if _snapshot is not None and time.monotonic() - _last_checked < SETTINGS_RECHECK_INTERVAL:
+            return _snapshot
+
+        _ensure_data_dir()
+        signature = _file_signature(_get_settings_file())
+        if _snapshot is not None and signature == _snapshot_signature:
+            _last_checked = time.monotonic()
+            return _snapshot
+
+        return _publish(_load_settings_file())
+
+
+def to_dict(snapshot: Mapping[str, Any]) -> Dict[str, Any]:
+    """Return a mutable deep copy of a settings snapshot (e.g. for JSON responses)."""
+    return _thaw(snapshot)
 
 
 def get_builtin_prompt(prompt_id: str) -> str:
@@ -123,14 +227,49 @@ def get_builtin_prompt(prompt_id: str) -> str:
     return ""
 
 
-def save_settings(updates: Dict[str, Any]) -> Dict[str, Any]:
+def save_settings(updates: Dict[str, Any]) -> Mapping[str, Any]:
     """
     Persist the provided settings updates.
     """
-    settings = get_settings()
-    for key, value in updates.items():
-        if key in DEFAULT_SETTINGS:
-            settings[key] = value
+    with _settings_lock:
+        settings = _thaw(get_settings())
+        for key, value in updates.items():
+            if key in DEFAULT_SETTINGS:
+                settings[key] = _thaw(value)
+
+        _write_settings(settings)
+        return _publish(settings)
+
+
+def reset_settings() -> Mapping[str, Any]:
+    """
+    Reset settings to defaults (clearing the stored API key).
+    """
+    with _settings_lock:
+        _ensure_data_dir()
+        settings = deepcopy(DEFAULT_SETTINGS)
+        settings["openrouter_api_key"] = None
+
+        _write_settings(settings)
+        return _publish(settings)
+
+
+def subscribe(callback: Callable[[Mapping[str, Any]], None]) -> Callable[[], None]:
+    """
+    Register a callback invoked with the new snapshot whenever settings change.
+
+    Args:
+        callback: Function taking the new settings snapshot
+
+    Returns:
+        A function that unsubscribes the callback
+    """
+    with _settings_lock:
+        _subscribers.append(callback)
+
+    def unsubscribe():
+        with _settings_lock:
+            if callback in _subscribers:
+                _subscribers.remove(callback)
 
-    _write_settings(settings)
-    return deepcopy(settings)
+    return unsubscribe
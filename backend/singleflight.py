@@ -0,0 +1,176 @@
+"""Coalescing of identical concurrent work (single-flight).
+
+SingleFlight shares one coroutine's result between every caller that asks for
+the same key while it is running. StreamMulticast does the same for async
+generators: one producer runs per key and every subscriber receives all of its
+items, late subscribers first getting a replay of what they missed.
+
+Work is cancelled once every caller waiting for it has gone away.
+"""
+
+import asyncio
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+# Sentinel queued for subscribers once the producer is exhausted
+_STREAM_END = object()
+
+
+class _StreamFailure:
+    """Wraps an exception raised by the producer so each subscriber can re-raise it."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class SingleFlight:
+    """Run at most one coroutine per key; concurrent callers share its result."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the result of `factory()`, sharing it with concurrent calls for `key`.
+
+        Args:
+            key: Identity of the work; equal keys are coalesced
+            factory: Creates the coroutine to run if nothing is in flight for `key`
+
+        Returns:
+            The (shared) result of the coroutine
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            self._waiters[key] = 0
+            self.started += 1
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Only stop the shared work when nobody is waiting for it any more
+            if self._calls.get(key) is task and self._waiters.get(key, 0) <= 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            if self._calls.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            self._waiters.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
+
+
+class _Flight:
+    """One running producer and the queues of its subscribers."""
+
+    def __init__(self):
+        self.history: List[Any] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.finished = False
+
+
+class StreamMulticast:
+    """Run at most one async generator per key and fan its items out to every subscriber."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def subscribe(
+        self,
+        key: Hashable,
+        factory: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncGenerator[Any, None]:
+        """
+        Iterate over the items of `factory()`, sharing the producer with other subscribers of `key`.
+
+        A subscriber that joins a running producer first receives every item
+        produced so far, then continues live. Closing the last subscriber
+        cancels the producer.
+
+        Args:
+            key: Identity of the stream; equal keys are coalesced
+            factory: Creates the async iterator to run if nothing is in flight for `key`
+
+        Yields:
+            The producer's items, in order
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._pump(key, flight, factory()))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in flight.history:
+            queue.put_nowait(item)
+        flight.subscribers.add(queue)
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, _StreamFailure):
+                    raise item.exc
+                yield item
+        finally:
+            flight.subscribers.discard(queue)
+            if not flight.subscribers and not flight.task.done():
+                # Forget the flight right away, so nobody joins it while it is being cancelled
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _pump(self, key: Hashable, flight: _Flight, source: AsyncIterator[Any]):
+        end: Any = _STREAM_END
+        try:
+            async for item in source:
+                flight.history.append(item)
+                for queue in flight.subscribers:
+                    queue.put_nowait(item)
+        except asyncio.CancelledError:
+            # A cancelled stream is incomplete; never let it look finished
+            end = _StreamFailure(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            end = _StreamFailure(e)
+        finally:
+            flight.finished = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+            for queue in flight.subscribers:
+                queue.put_nowait(end)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._flights), "started": self.started, "coalesced": self.coalesced}
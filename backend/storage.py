@@ -1,26 +1,121 @@
-"""Storage for optimization sessions with iteration-based data model."""
+"""Storage for optimization sessions with iteration-based data model.
 
-import json
+The functions in this module are the public storage API used by the rest of the
+backend. They delegate to a pluggable StorageBackend selected by the
+LLM_COUNCIL_STORAGE_BACKEND environment variable:
+
+- ``json`` (default): one JSON file per session under DATA_DIR
+- ``sqlite``: normalized tables in a WAL-mode SQLite database at SQLITE_PATH
+"""
+
+import functools
 import os
-import uuid
-from datetime import datetime
-from typing import Dict, List, Any, Optional
-from pathlib import Path
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from .storage_base import StorageBackend, SessionConflictError, SORTABLE_FIELDS  # noqa: F401 (re-exported)
+from . import telemetry
+from . import tracing
 
 # Data directory for session storage (in user's home directory)
 DATA_DIR = os.path.join(os.path.expanduser("~"), ".llm-council", "sessions")
 
+# SQLite database used by the sqlite backend
+SQLITE_PATH = os.path.join(os.path.expanduser("~"), ".llm-council", "sessions.db")
+
+# Storage backend to use: "json" or "sqlite"
+STORAGE_BACKEND = os.getenv("LLM_COUNCIL_STORAGE_BACKEND", "json").lower()
+
+# Maximum number of parsed sessions kept in memory (json backend)
+SESSION_CACHE_SIZE = int(os.getenv("LLM_COUNCIL_SESSION_CACHE_SIZE", "64"))
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def _observed(func):
+    """Time a storage operation (and count failures) for /metrics and the current trace."""
+    operation = func.__name__
+    duration = telemetry.STORAGE_DURATION.labels(operation)
+    errors = telemetry.STORAGE_ERRORS.labels(operation)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            errors.inc()
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            duration.observe(elapsed)
+            if tracing.is_enabled():
+                session_id = args[0] if args and isinstance(args[0], str) else None
+                tracing.record(f"storage.{operation}", elapsed, error, session_id=session_id)
+    return wrapper
+
+
+def create_backend(name: str) -> StorageBackend:
+    """
+    Instantiate a storage backend by name.
+
+    Args:
+        name: "json" or "sqlite"
 
-def _ensure_data_dir():
-    """Ensure the data directory exists."""
-    Path(DATA_DIR).mkdir(parents=True, exist_ok=True)
+    Returns:
+        A new StorageBackend instance
 
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if name == "json":
+        from .storage_json import JsonStorageBackend
+        return JsonStorageBackend(DATA_DIR, cache_size=SESSION_CACHE_SIZE)
+    if name == "sqlite":
+        from .storage_sqlite import SqliteStorageBackend
+        return SqliteStorageBackend(SQLITE_PATH)
+    raise ValueError(f"Unknown storage backend '{name}'")
 
-def _get_session_path(session_id: str) -> str:
-    """Get the file path for a session."""
-    return os.path.join(DATA_DIR, f"{session_id}.json")
 
+def get_backend() -> StorageBackend:
+    """Return the active storage backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(STORAGE_BACKEND)
+    return _backend
 
+
+def set_backend(backend: StorageBackend) -> Optional[StorageBackend]:
+    """
+    Replace the active storage backend (e.g. for benchmarks or migrations).
+
+    Returns:
+        The previously active backend, if any
+    """
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get storage statistics from the active backend.
+
+    Returns:
+        Dict with the backend name and backend-specific counters
+        (for the json backend: hits, misses, hit_rate, size, capacity)
+    """
+    return get_backend().get_stats()
+
+
+@_observed
 def create_session(session_id: str, title: str = "New Optimization Session", objective: Optional[str] = None) -> Dict[str, Any]:
     """
     Create a new optimization session.
@@ -33,101 +128,52 @@ def create_session(session_id: str, title: str = "New Optimization Session", obj
     Returns:
         The created session dict
     """
-    _ensure_data_dir()
-
-    session = {
-        "id": session_id,
-        "created_at": datetime.now().isoformat(),
-        "title": title,
-        "objective": objective,
-        "prompt_title": None,
-        "current_version": 0,
-        "stage": "init",
-        "iterations": [],
-        "test_set": []
-    }
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
-
-    return session
+    return get_backend().create_session(session_id, title=title, objective=objective)
 
 
+@_observed
 def get_session(session_id: str) -> Optional[Dict[str, Any]]:
     """
     Get a session by ID.
 
+    Backends may serve the session from an in-process cache and share the
+    returned dict with it, so callers should treat it as read-only.
+
     Args:
         session_id: The session ID
 
     Returns:
         Session dict or None if not found
     """
-    path = _get_session_path(session_id)
-    if not os.path.exists(path):
-        return None
-
-    with open(path, 'r', encoding='utf-8') as f:
-        session = json.load(f)
+    return get_backend().get_session(session_id)
 
-    # Backfill defaults for older sessions
-    session.setdefault("prompt_title", None)
-    session.setdefault("current_version", len(session.get("iterations", [])))
-    session.setdefault("stage", "init")
-    session.setdefault("test_set", [])
 
-    # Ensure iterations have stage metadata; default to session stage if missing
-    for iteration in session.get("iterations", []):
-        iteration.setdefault("stage", session.get("stage", "init"))
-        iteration.setdefault("test_sample_id", None)
-        iteration.setdefault("test_sample_title", None)
-        iteration.setdefault("test_sample_input", None)
+@_observed
+def list_sessions(
+    offset: int = 0,
+    limit: Optional[int] = None,
+    sort_by: str = "last_modified",
+    descending: bool = True
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    List sessions with metadata (backends serve this without loading full sessions).
 
-    return session
+    Args:
+        offset: Number of sessions to skip
+        limit: Maximum number of sessions to return (None for all)
+        sort_by: Field to sort by (one of SORTABLE_FIELDS)
+        descending: Sort order, most recent/largest first by default
 
+    Returns:
+        Tuple of (page of session metadata dicts, total session count)
 
-def list_sessions() -> List[Dict[str, Any]]:
+    Raises:
+        ValueError: If sort_by is not a sortable field
     """
-    List all sessions with metadata.
-
-    Returns:
-        List of session metadata dicts
-    """
-    _ensure_data_dir()
-
-    sessions = []
-    for filename in os.listdir(DATA_DIR):
-        if filename.endswith('.json'):
-            session_id = filename[:-5]  # Remove .json
-            session = get_session(session_id)
-            if session:
-                # Return metadata only
-                iterations = session.get("iterations", [])
-                iteration_count = len(iterations)
-                last_modified = iterations[-1].get("timestamp", session["created_at"]) if iterations else session["created_at"]
-                # Derive active iteration stage based on current_version; fallback to latest/session stage
-                active_iteration = get_iteration(session_id, session.get("current_version", iteration_count))
-                derived_stage = (
-                    (active_iteration or (iterations[-1] if iterations else {})).get("stage")
-                    or session.get("stage", "init")
-                )
-                sessions.append({
-                    "id": session["id"],
-                    "created_at": session["created_at"],
-                    "title": session["title"],
-                    "prompt_title": session.get("prompt_title"),
-                    "current_version": session.get("current_version", iteration_count),
-                    "stage": derived_stage,
-                    "iteration_count": iteration_count,
-                    "version_count": iteration_count,
-                    "last_modified": last_modified
-                })
-
-    # Sort by last modified, most recent first
-    sessions.sort(key=lambda x: x["last_modified"], reverse=True)
-    return sessions
+    return get_backend().list_sessions(offset=offset, limit=limit, sort_by=sort_by, descending=descending)
 
 
+@_observed
 def update_session_title(session_id: str, title: str):
     """
     Update session title.
@@ -136,24 +182,18 @@ def update_session_title(session_id: str, title: str):
         session_id: The session ID
         title: New title
     """
-    session = get_session(session_id)
-    if session:
-        session["title"] = title
-        with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-            json.dump(session, f, indent=2, ensure_ascii=False)
+    get_backend().update_session_title(session_id, title=title)
 
 
+@_observed
 def list_test_samples(session_id: str) -> List[Dict[str, Any]]:
     """
     List test samples for a session.
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    return session.get("test_set", [])
+    return get_backend().list_test_samples(session_id)
 
 
+@_observed
 def add_test_sample(
     session_id: str,
     title: str,
@@ -163,27 +203,15 @@ def add_test_sample(
     """
     Add a test sample to a session.
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    sample = {
-        "id": str(uuid.uuid4()),
-        "title": title or "Untitled sample",
-        "input": test_input or "",
-        "notes": notes,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat(),
-    }
-
-    session.setdefault("test_set", []).append(sample)
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
-
-    return sample
+    return get_backend().add_test_sample(
+        session_id,
+        title=title,
+        test_input=test_input,
+        notes=notes
+    )
 
 
+@_observed
 def update_test_sample(
     session_id: str,
     sample_id: str,
@@ -194,62 +222,32 @@ def update_test_sample(
     """
     Update an existing test sample.
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    for sample in session.setdefault("test_set", []):
-        if sample["id"] == sample_id:
-            if title is not None:
-                sample["title"] = title
-            if test_input is not None:
-                sample["input"] = test_input
-            if notes is not None:
-                sample["notes"] = notes
-            sample["updated_at"] = datetime.now().isoformat()
-            break
-    else:
-        raise ValueError(f"Test sample {sample_id} not found in session {session_id}")
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
-
-    return sample
+    return get_backend().update_test_sample(
+        session_id,
+        sample_id=sample_id,
+        title=title,
+        test_input=test_input,
+        notes=notes
+    )
 
 
+@_observed
 def delete_test_sample(session_id: str, sample_id: str):
     """
     Delete a test sample from a session.
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    original_count = len(session.get("test_set", []))
-    session["test_set"] = [s for s in session.get("test_set", []) if s["id"] != sample_id]
-
-    if len(session["test_set"]) == original_count:
-        raise ValueError(f"Test sample {sample_id} not found in session {session_id}")
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
+    get_backend().delete_test_sample(session_id, sample_id=sample_id)
 
 
+@_observed
 def get_test_sample(session_id: str, sample_id: str) -> Optional[Dict[str, Any]]:
     """
     Get a single test sample by id.
     """
-    session = get_session(session_id)
-    if not session:
-        return None
-
-    for sample in session.get("test_set", []):
-        if sample["id"] == sample_id:
-            return sample
-
-    return None
+    return get_backend().get_test_sample(session_id, sample_id=sample_id)
 
 
+@_observed
 def add_iteration(
     session_id: str,
     prompt: str,
@@ -275,41 +273,19 @@ def add_iteration(
     Returns:
         The complete updated session
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    # Calculate version number
-    version = len(session["iterations"]) + 1
-
-    iteration = {
-        "version": version,
-        "prompt": prompt,
-        "timestamp": datetime.now().isoformat(),
-        "change_rationale": change_rationale,
-        "test_results": test_results or [],
-        "suggestions": suggestions or [],
-        "user_decision": user_decision,
-        "stage": stage,
-        "test_sample_id": None,
-        "test_sample_title": None,
-        "test_sample_input": None,
-    }
-
-    session["iterations"].append(iteration)
-
-    # Update session-level metadata
-    session["current_version"] = version
-    session["stage"] = stage
-    if metadata:
-        session.update(metadata)
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
-
-    return session
+    return get_backend().add_iteration(
+        session_id,
+        prompt=prompt,
+        change_rationale=change_rationale,
+        test_results=test_results,
+        suggestions=suggestions,
+        user_decision=user_decision,
+        metadata=metadata,
+        stage=stage
+    )
 
 
+@_observed
 def update_iteration_test_results(
     session_id: str,
     version: int,
@@ -329,40 +305,20 @@ def update_iteration_test_results(
         version: The iteration version number
         test_results: Test results with model outputs
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    # Find the iteration
-    for iteration in session["iterations"]:
-        if iteration["version"] == version:
-            iteration["test_results"] = test_results
-            if clear_feedback:
-                for result in iteration["test_results"]:
-                    result["rating"] = None
-                    result["feedback"] = None
-            if clear_suggestions:
-                iteration["suggestions"] = []
-            if stage:
-                iteration["stage"] = stage
-            if test_sample_id is not None:
-                iteration["test_sample_id"] = test_sample_id
-            if test_sample_title is not None:
-                iteration["test_sample_title"] = test_sample_title
-            if test_sample_input is not None:
-                iteration["test_sample_input"] = test_sample_input
-            break
-    else:
-        raise ValueError(f"Version {version} not found in session {session_id}")
-
-    # Keep session-level stage in sync with active iteration
-    if stage:
-        session["stage"] = stage
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
+    get_backend().update_iteration_test_results(
+        session_id,
+        version=version,
+        test_results=test_results,
+        test_sample_id=test_sample_id,
+        test_sample_title=test_sample_title,
+        test_sample_input=test_sample_input,
+        stage=stage,
+        clear_feedback=clear_feedback,
+        clear_suggestions=clear_suggestions
+    )
 
 
+@_observed
 def update_iteration_feedback(
     session_id: str,
     version: int,
@@ -380,28 +336,16 @@ def update_iteration_feedback(
         rating: Optional rating (1-5)
         feedback: Optional text feedback
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    # Find the iteration and test result
-    for iteration in session["iterations"]:
-        if iteration["version"] == version:
-            for result in iteration["test_results"]:
-                if result["model"] == model:
-                    if rating is not None:
-                        result["rating"] = rating
-                    if feedback is not None:
-                        result["feedback"] = feedback
-                    break
-            break
-    else:
-        raise ValueError(f"Version {version} not found in session {session_id}")
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
+    get_backend().update_iteration_feedback(
+        session_id,
+        version=version,
+        model=model,
+        rating=rating,
+        feedback=feedback
+    )
 
 
+@_observed
 def update_iteration_suggestions(
     session_id: str,
     version: int,
@@ -415,22 +359,27 @@ def update_iteration_suggestions(
         version: The iteration version number
         suggestions: List of suggestions from models
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
+    get_backend().update_iteration_suggestions(session_id, version=version, suggestions=suggestions)
 
-    # Find the iteration
-    for iteration in session["iterations"]:
-        if iteration["version"] == version:
-            iteration["suggestions"] = suggestions
-            break
-    else:
-        raise ValueError(f"Version {version} not found in session {session_id}")
 
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
+@_observed
+def update_iteration_batch_results(
+    session_id: str,
+    version: int,
+    batch_results: Dict[str, Any]
+):
+    """
+    Store the results of running an iteration against the whole test set.
+
+    Args:
+        session_id: The session ID
+        version: The iteration version number
+        batch_results: Per-sample test results and metrics, plus aggregate metrics
+    """
+    get_backend().update_iteration_batch_results(session_id, version=version, batch_results=batch_results)
 
 
+@_observed
 def get_iteration(session_id: str, version: int) -> Optional[Dict[str, Any]]:
     """
     Get a specific iteration by version number.
@@ -442,17 +391,10 @@ def get_iteration(session_id: str, version: int) -> Optional[Dict[str, Any]]:
     Returns:
         Iteration dict or None if not found
     """
-    session = get_session(session_id)
-    if not session:
-        return None
-
-    for iteration in session["iterations"]:
-        if iteration["version"] == version:
-            return iteration
-
-    return None
+    return get_backend().get_iteration(session_id, version=version)
 
 
+@_observed
 def get_latest_iteration(session_id: str) -> Optional[Dict[str, Any]]:
     """
     Get the latest iteration for a session.
@@ -463,30 +405,18 @@ def get_latest_iteration(session_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Latest iteration dict or None if no iterations
     """
-    session = get_session(session_id)
-    if not session or not session.get("iterations"):
-        return None
-
-    return session["iterations"][-1]
+    return get_backend().get_latest_iteration(session_id)
 
 
+@_observed
 def get_active_iteration(session_id: str) -> Optional[Dict[str, Any]]:
     """
     Get the active iteration based on current_version, falling back to latest.
     """
-    session = get_session(session_id)
-    if not session or not session.get("iterations"):
-        return None
-
-    current_version = session.get("current_version")
-    if current_version:
-        for iteration in session["iterations"]:
-            if iteration["version"] == current_version:
-                return iteration
-
-    return session["iterations"][-1]
+    return get_backend().get_active_iteration(session_id)
 
 
+@_observed
 def update_session_meta(session_id: str, **fields) -> Dict[str, Any]:
     """
     Update session-level metadata fields.
@@ -498,19 +428,10 @@ def update_session_meta(session_id: str, **fields) -> Dict[str, Any]:
     Returns:
         Updated session dict
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    for key, value in fields.items():
-        session[key] = value
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
-
-    return session
+    return get_backend().update_session_meta(session_id, **fields)
 
 
+@_observed
 def restore_iteration(session_id: str, version: int) -> Dict[str, Any]:
     """
     Restore session state to a specific iteration/version (overwrite current).
@@ -522,24 +443,10 @@ def restore_iteration(session_id: str, version: int) -> Dict[str, Any]:
     Returns:
         Updated session dict
     """
-    session = get_session(session_id)
-    if not session:
-        raise ValueError(f"Session {session_id} not found")
-
-    target_iteration = get_iteration(session_id, version)
-    if not target_iteration:
-        raise ValueError(f"Version {version} not found in session {session_id}")
-
-    # Update session to point to restored version
-    session["current_version"] = version
-    session["stage"] = target_iteration.get("stage", session.get("stage", "init"))
-
-    with open(_get_session_path(session_id), 'w', encoding='utf-8') as f:
-        json.dump(session, f, indent=2, ensure_ascii=False)
-
-    return session
+    return get_backend().restore_iteration(session_id, version=version)
 
 
+@_observed
 def delete_session(session_id: str):
     """
     Delete a session by ID.
@@ -550,13 +457,10 @@ def delete_session(session_id: str):
     Raises:
         ValueError: If session not found
     """
-    path = _get_session_path(session_id)
-    if not os.path.exists(path):
-        raise ValueError(f"Session {session_id} not found")
-
-    os.remove(path)
+    get_backend().delete_session(session_id)
 
 
+@_observed
 def delete_all_sessions() -> int:
     """
     Delete all sessions.
@@ -564,13 +468,4 @@ def delete_all_sessions() -> int:
     Returns:
         Number of sessions deleted
     """
-    _ensure_data_dir()
-
-    count = 0
-    for filename in os.listdir(DATA_DIR):
-        if filename.endswith('.json'):
-            path = os.path.join(DATA_DIR, filename)
-            os.remove(path)
-            count += 1
-
-    return count
+    return get_backend().delete_all_sessions()
@@ -0,0 +1,240 @@
+"""Async facade over backend.storage that keeps blocking disk I/O off the event loop.
+
+Every call runs the matching synchronous storage function on a bounded thread
+pool. Mutations of the same session are serialized with a per-session
+asyncio.Lock, so concurrent requests cannot interleave their read-modify-write
+cycles, while reads and writes for other sessions proceed in parallel. The lock
+is only held for the write itself: endpoints read what they need, run the LLM
+calls unlocked and then apply their result as one short mutation.
+delete_all_sessions touches every session, so it waits until no write is in
+progress and holds off new writes until it is done.
+
+A mutation that loses an optimistic revision check (another process wrote the
+session first) is re-applied on top of the fresh session a bounded number of
+times before the SessionConflictError is surfaced.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import storage
+
+# Maximum number of threads doing storage I/O at once
+STORAGE_IO_WORKERS = int(os.getenv("LLM_COUNCIL_STORAGE_IO_WORKERS", "4"))
+
+# How often a mutation is re-applied after a revision conflict
+STORAGE_CONFLICT_RETRIES = int(os.getenv("LLM_COUNCIL_STORAGE_CONFLICT_RETRIES", "3"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+# session_id -> lock; entries disappear once no coroutine holds a reference
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Keeps session writes and bulk deletes apart (see _session_write and delete_all_sessions)
+_gate: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Condition]] = None
+_active_writes = 0
+_bulk_running = False
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=STORAGE_IO_WORKERS, thread_name_prefix="storage-io")
+    return _executor
+
+
+def shutdown(wait: bool = True):
+    """Stop the storage thread pool, optionally waiting for pending writes."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    """Return the lock that serializes writes to one session."""
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _session_locks[session_id] = lock
+    return lock
+
+
+def _get_gate() -> asyncio.Condition:
+    global _gate
+    loop = asyncio.get_running_loop()
+    if _gate is None or _gate[0] is not loop:
+        _gate = (loop, asyncio.Condition())
+    return _gate[1]
+
+
+@contextlib.asynccontextmanager
+async def _session_write():
+    """Admit a session write; writes run side by side, but never alongside a bulk delete."""
+    global _active_writes
+    gate = _get_gate()
+    async with gate:
+        await gate.wait_for(lambda: not _bulk_running)
+        _active_writes += 1
+    try:
+        yield
+    finally:
+        async with gate:
+            _active_writes -= 1
+            gate.notify_all()
+
+
+async def run(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking function on the storage thread pool (in the caller's context, like asyncio.to_thread)."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+async def _write(session_id: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a storage mutation while holding the session's write lock, retrying on revision conflicts."""
+    async with _session_write(), session_lock(session_id):
+        for attempt in range(STORAGE_CONFLICT_RETRIES + 1):
+            try:
+                return await run(func, session_id, *args, **kwargs)
+            except storage.SessionConflictError as e:
+                if attempt == STORAGE_CONFLICT_RETRIES:
+                    raise
+                print(f"Retrying write to session {session_id} after conflict: {e}")
+
+
+# Reads
+
+
+async def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+    return await run(storage.get_session, session_id)
+
+
+async def list_sessions(
+    offset: int = 0,
+    limit: Optional[int] = None,
+    sort_by: str = "last_modified",
+    descending: bool = True
+) -> Tuple[List[Dict[str, Any]], int]:
+    return await run(storage.list_sessions, offset=offset, limit=limit, sort_by=sort_by, descending=descending)
+
+
+async def list_test_samples(session_id: str) -> List[Dict[str, Any]]:
+    return await run(storage.list_test_samples, session_id)
+
+
+async def get_test_sample(session_id: str, sample_id: str) -> Optional[Dict[str, Any]]:
+    return await run(storage.get_test_sample, session_id, sample_id)
+
+
+async def get_iteration(session_id: str, version: int) -> Optional[Dict[str, Any]]:
+    return await run(storage.get_iteration, session_id, version)
+
+
+async def get_latest_iteration(session_id: str) -> Optional[Dict[str, Any]]:
+    return await run(storage.get_latest_iteration, session_id)
+
+
+async def get_active_iteration(session_id: str) -> Optional[Dict[str, Any]]:
+    return await run(storage.get_active_iteration, session_id)
+
+
+# Writes
+
+
+async def create_session(session_id: str, title: str = "New Optimization Session", objective: Optional[str] = None) -> Dict[str, Any]:
+    return await _write(session_id, storage.create_session, title=title, objective=objective)
+
+
+async def update_session_title(session_id: str, title: str):
+    await _write(session_id, storage.update_session_title, title)
+
+
+async def add_test_sample(session_id: str, title: str, test_input: str, notes: Optional[str] = None) -> Dict[str, Any]:
+    return await _write(session_id, storage.add_test_sample, title=title, test_input=test_input, notes=notes)
+
+
+async def update_test_sample(
+    session_id: str,
+    sample_id: str,
+    title: Optional[str] = None,
+    test_input: Optional[str] = None,
+    notes: Optional[str] = None
+) -> Dict[str, Any]:
+    return await _write(
+        session_id,
+        storage.update_test_sample,
+        sample_id,
+        title=title,
+        test_input=test_input,
+        notes=notes
+    )
+
+
+async def delete_test_sample(session_id: str, sample_id: str):
+    await _write(session_id, storage.delete_test_sample, sample_id)
+
+
+async def add_iteration(session_id: str, prompt: str, change_rationale: str, **kwargs) -> Dict[str, Any]:
+    return await _write(session_id, storage.add_iteration, prompt, change_rationale, **kwargs)
+
+
+async def update_iteration_test_results(session_id: str, version: int, test_results: List[Dict[str, Any]], **kwargs):
+    await _write(session_id, storage.update_iteration_test_results, version, test_results, **kwargs)
+
+
+async def update_iteration_feedback(
+    session_id: str,
+    version: int,
+    model: str,
+    rating: Optional[int] = None,
+    feedback: Optional[str] = None
+):
+    await _write(session_id, storage.update_iteration_feedback, version, model, rating=rating, feedback=feedback)
+
+
+async def update_iteration_suggestions(session_id: str, version: int, suggestions: List[Dict[str, Any]]):
+    await _write(session_id, storage.update_iteration_suggestions, version, suggestions)
+
+
+async def update_iteration_batch_results(session_id: str, version: int, batch_results: Dict[str, Any]):
+    await _write(session_id, storage.update_iteration_batch_results, version, batch_results)
+
+
+async def update_session_meta(session_id: str, **fields) -> Dict[str, Any]:
+    return await _write(session_id, storage.update_session_meta, **fields)
+
+
+async def restore_iteration(session_id: str, version: int) -> Dict[str, Any]:
+    return await _write(session_id, storage.restore_iteration, version)
+
+
+async def delete_session(session_id: str):
+    await _write(session_id, storage.delete_session)
+
+
+async def delete_all_sessions() -> int:
+    """Delete every session once the writes in progress have finished; new writes wait for it."""
+    global _bulk_running
+    gate = _get_gate()
+    async with gate:
+        await gate.wait_for(lambda: not _bulk_running)
+        _bulk_running = True
+        try:
+            await gate.wait_for(lambda: _active_writes == 0)
+        except BaseException:
+            _bulk_running = False
+            gate.notify_all()
+            raise
+    try:
+        return await run(storage.delete_all_sessions)
+    finally:
+        async with gate:
+            _bulk_running = False
+            gate.notify_all()
@@ -0,0 +1,322 @@
+"""Storage backend interface and helpers shared by all session backends."""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Tuple
+
+# Fields returned for each session by list_sessions (sidebar metadata)
+INDEX_FIELDS = (
+    "id",
+    "created_at",
+    "title",
+    "prompt_title",
+    "current_version",
+    "stage",
+    "iteration_count",
+    "version_count",
+    "last_modified",
+)
+
+# Fields list_sessions can sort by
+SORTABLE_FIELDS = ("last_modified", "created_at", "title", "prompt_title", "current_version", "stage", "iteration_count")
+
+
+class SessionConflictError(Exception):
+    """
+    Raised when a session changed on disk between reading and writing it.
+
+    Every successful write increments the session's ``revision``; a write based on
+    an older revision is rejected instead of silently discarding the newer data.
+    """
+
+
+def backfill_session(session: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fill in defaults for sessions written by older versions of the app.
+
+    Args:
+        session: A session dict, modified in place
+
+    Returns:
+        The same session dict
+    """
+    session.setdefault("prompt_title", None)
+    session.setdefault("current_version", len(session.get("iterations", [])))
+    session.setdefault("stage", "init")
+    session.setdefault("test_set", [])
+    session.setdefault("revision", 0)
+
+    # Ensure iterations have stage metadata; default to session stage if missing
+    for iteration in session.get("iterations", []):
+        iteration.setdefault("stage", session.get("stage", "init"))
+        iteration.setdefault("test_sample_id", None)
+        iteration.setdefault("test_sample_title", None)
+        iteration.setdefault("test_sample_input", None)
+
+    return session
+
+
+def build_session_summary(session: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the sidebar metadata for a session.
+
+    Args:
+        session: The full session dict
+
+    Returns:
+        Dict with the fields listed in INDEX_FIELDS
+    """
+    iterations = session.get("iterations", [])
+    iteration_count = len(iterations)
+    last_modified = iterations[-1].get("timestamp", session["created_at"]) if iterations else session["created_at"]
+    current_version = session.get("current_version", iteration_count)
+
+    # Derive active iteration stage based on current_version; fallback to latest/session stage
+    active_iteration = next((it for it in iterations if it.get("version") == current_version), None)
+    derived_stage = (
+        (active_iteration or (iterations[-1] if iterations else {})).get("stage")
+        or session.get("stage", "init")
+    )
+
+    return {
+        "id": session["id"],
+        "created_at": session["created_at"],
+        "title": session["title"],
+        "prompt_title": session.get("prompt_title"),
+        "current_version": current_version,
+        "stage": derived_stage,
+        "iteration_count": iteration_count,
+        "version_count": iteration_count,
+        "last_modified": last_modified
+    }
+
+
+def sort_and_paginate(
+    entries: List[Dict[str, Any]],
+    offset: int,
+    limit: Optional[int],
+    sort_by: str,
+    descending: bool
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Sort session summaries and cut out one page.
+
+    Sessions missing the sort field always go last.
+
+    Returns:
+        Tuple of (page, total count)
+    """
+    present = [e for e in entries if e.get(sort_by) is not None]
+    missing = [e for e in entries if e.get(sort_by) is None]
+    present.sort(key=lambda e: e[sort_by], reverse=descending)
+    sessions = present + missing
+
+    total = len(sessions)
+    offset = max(offset, 0)
+    end = offset + limit if limit is not None else None
+    return sessions[offset:end], total
+
+
+class StorageBackend(ABC):
+    """
+    Interface implemented by every session storage backend.
+
+    Sessions are exchanged as plain dicts in the shape produced by the JSON
+    backend (see storage.create_session). Mutating methods raise ValueError
+    when the session, iteration or test sample does not exist, bump the
+    session's ``revision`` counter and raise SessionConflictError when a
+    concurrent writer got there first. Backends must implement every abstract
+    method; read-only helpers are implemented here on top of get_session and
+    may be overridden with cheaper queries.
+    """
+
+    name = "base"
+
+    # Sessions
+
+    @abstractmethod
+    def create_session(self, session_id: str, title: str, objective: Optional[str]) -> Dict[str, Any]:
+        """Create and persist a new, empty session."""
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the full session dict, or None if it does not exist."""
+
+    @abstractmethod
+    def list_sessions(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        sort_by: str = "last_modified",
+        descending: bool = True
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (page of session summaries, total count)."""
+
+    @abstractmethod
+    def update_session_title(self, session_id: str, title: str):
+        """Rename a session; a missing session is ignored."""
+
+    @abstractmethod
+    def update_session_meta(self, session_id: str, **fields) -> Dict[str, Any]:
+        """Merge session-level fields and return the updated session."""
+
+    @abstractmethod
+    def delete_session(self, session_id: str):
+        """Delete one session."""
+
+    @abstractmethod
+    def delete_all_sessions(self) -> int:
+        """Delete every session and return how many were removed."""
+
+    # Test samples
+
+    def list_test_samples(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return the session's test set."""
+        session = self.get_session(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found")
+
+        return session.get("test_set", [])
+
+    @abstractmethod
+    def add_test_sample(
+        self,
+        session_id: str,
+        title: str,
+        test_input: str,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Append a test sample and return it."""
+
+    @abstractmethod
+    def update_test_sample(
+        self,
+        session_id: str,
+        sample_id: str,
+        title: Optional[str] = None,
+        test_input: Optional[str] = None,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Update the given fields of a test sample and return it."""
+
+    @abstractmethod
+    def delete_test_sample(self, session_id: str, sample_id: str):
+        """Remove a test sample."""
+
+    def get_test_sample(self, session_id: str, sample_id: str) -> Optional[Dict[str, Any]]:
+        """Return one test sample, or None."""
+        session = self.get_session(session_id)
+        if not session:
+            return None
+
+        for sample in session.get("test_set", []):
+            if sample["id"] == sample_id:
+                return sample
+
+        return None
+
+    # Iterations
+
+    @abstractmethod
+    def add_iteration(
+        self,
+        session_id: str,
+        prompt: str,
+        change_rationale: str,
+        test_results: Optional[List[Dict[str, Any]]] = None,
+        suggestions: Optional[List[Dict[str, Any]]] = None,
+        user_decision: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        stage: str = "title_ready",
+    ) -> Dict[str, Any]:
+        """Append a new prompt version, make it current and return the session."""
+
+    @abstractmethod
+    def update_iteration_test_results(
+        self,
+        session_id: str,
+        version: int,
+        test_results: List[Dict[str, Any]],
+        test_sample_id: Optional[str] = None,
+        test_sample_title: Optional[str] = None,
+        test_sample_input: Optional[str] = None,
+        stage: Optional[str] = None,
+        clear_feedback: bool = False,
+        clear_suggestions: bool = False,
+    ):
+        """Replace an iteration's test results."""
+
+    @abstractmethod
+    def update_iteration_feedback(
+        self,
+        session_id: str,
+        version: int,
+        model: str,
+        rating: Optional[int] = None,
+        feedback: Optional[str] = None
+    ):
+        """Set the rating and/or feedback of one model's test result."""
+
+    @abstractmethod
+    def update_iteration_suggestions(
+        self,
+        session_id: str,
+        version: int,
+        suggestions: List[Dict[str, Any]]
+    ):
+        """Replace an iteration's improvement suggestions."""
+
+    @abstractmethod
+    def update_iteration_batch_results(
+        self,
+        session_id: str,
+        version: int,
+        batch_results: Dict[str, Any]
+    ):
+        """Replace the results of an iteration's last run over the test set."""
+
+    def get_iteration(self, session_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Return one iteration by version number, or None."""
+        session = self.get_session(session_id)
+        if not session:
+            return None
+
+        for iteration in session["iterations"]:
+            if iteration["version"] == version:
+                return iteration
+
+        return None
+
+    def get_latest_iteration(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the most recent iteration, or None."""
+        session = self.get_session(session_id)
+        if not session or not session.get("iterations"):
+            return None
+
+        return session["iterations"][-1]
+
+    def get_active_iteration(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the iteration matching current_version, falling back to the latest."""
+        session = self.get_session(session_id)
+        if not session or not session.get("iterations"):
+            return None
+
+        current_version = session.get("current_version")
+        if current_version:
+            for iteration in session["iterations"]:
+                if iteration["version"] == current_version:
+                    return iteration
+
+        return session["iterations"][-1]
+
+    @abstractmethod
+    def restore_iteration(self, session_id: str, version: int) -> Dict[str, Any]:
+        """Make an earlier version current and return the session."""
+
+    # Diagnostics
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return backend-specific statistics (cache hit rates, etc.)."""
+        return {"backend": self.name}
+
+    def close(self):
+        """Release any resources held by the backend."""
@@ -0,0 +1,689 @@
+"""JSON-file storage backend: one pretty-printed JSON document per session."""
+
+import functools
+import json
+import os
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from copy import deepcopy
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+from pathlib import Path
+
+from .storage_base import (
+    StorageBackend,
+    SessionConflictError,
+    INDEX_FIELDS,
+    SORTABLE_FIELDS,
+    backfill_session,
+    build_session_summary,
+    sort_and_paginate,
+)
+from . import telemetry
+
+# Bumped whenever the layout of the sidecar index file changes
+INDEX_FORMAT_VERSION = 1
+
+_BYTES_READ = telemetry.STORAGE_BYTES.labels("read")
+_BYTES_WRITTEN = telemetry.STORAGE_BYTES.labels("write")
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None):
+    """
+    Replace a JSON file so readers see either the old or the new document, never a partial one.
+
+    The data is written to a temporary file in the same directory, flushed to disk
+    and renamed over the target.
+
+    Args:
+        path: Destination file
+        data: JSON-serializable object
+        indent: Passed through to json.dump
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself; directories cannot be opened on Windows
+    if os.name == "posix":
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _serialized(method):
+    """Run a backend method while holding the per-session lock of its session_id argument."""
+    @functools.wraps(method)
+    def wrapper(self, session_id: str, *args, **kwargs):
+        with self._session_lock(session_id):
+            return method(self, session_id, *args, **kwargs)
+    return wrapper
+
+
+class JsonStorageBackend(StorageBackend):
+    """
+    Stores each session as ``<data_dir>/<session_id>.json``.
+
+    Parsed sessions are kept in a bounded LRU cache that is invalidated by file
+    mtime/size, and sidebar metadata is kept in a sidecar index next to data_dir
+    so listing sessions does not parse every file.
+
+    Files are replaced atomically, read-modify-write cycles on one session are
+    serialized within the process, and the ``revision`` stored in each file
+    detects writers in other processes.
+    """
+
+    name = "json"
+
+    def __init__(self, data_dir: str, cache_size: int = 64):
+        self.data_dir = data_dir
+        self.cache_size = cache_size
+
+        # LRU cache of parsed sessions: session_id -> ((mtime_ns, size), session)
+        self._session_cache: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_stats = {"hits": 0, "misses": 0}
+
+        # session_id -> index entry (metadata fields plus the session file signature)
+        self._session_index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index_dirty = False
+        self._index_lock = threading.RLock()
+
+        # session_id -> lock serializing read-modify-write cycles on that session
+        self._session_locks: "weakref.WeakValueDictionary[str, threading.RLock]" = weakref.WeakValueDictionary()
+        self._session_locks_guard = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def _ensure_data_dir(self):
+        """Ensure the data directory exists."""
+        Path(self.data_dir).mkdir(parents=True, exist_ok=True)
+
+    def _get_session_path(self, session_id: str) -> str:
+        """Get the file path for a session."""
+        return os.path.join(self.data_dir, f"{session_id}.json")
+
+    @staticmethod
+    def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+        """Return (mtime_ns, size) for a file, or None if it does not exist."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _session_lock(self, session_id: str) -> threading.RLock:
+        """Return the lock that serializes writes to one session."""
+        with self._session_locks_guard:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = threading.RLock()
+                self._session_locks[session_id] = lock
+            return lock
+
+    def _save_session(self, session_id: str, session: Dict[str, Any], create: bool = False):
+        """
+        Write a session to disk and install it as the cached copy (and refresh the index).
+
+        The session must carry the revision it was loaded at; the write is refused if
+        the file on disk has moved on since, and otherwise bumps the revision.
+
+        Raises:
+            ValueError: If the session was deleted in the meantime
+            SessionConflictError: If another writer saved the session first
+        """
+        current = self.get_session(session_id)
+        if current is None and not create:
+            raise ValueError(f"Session {session_id} not found")
+        if current is not None and create:
+            raise SessionConflictError(f"Session {session_id} already exists")
+
+        revision = session.get("revision", 0)
+        if current is not None and current.get("revision", 0) != revision:
+            raise SessionConflictError(
+                f"Session {session_id} was modified concurrently "
+                f"(revision {current.get('revision', 0)}, expected {revision})"
+            )
+        session["revision"] = revision + 1
+
+        path = self._get_session_path(session_id)
+        try:
+            atomic_write_json(path, session, indent=2)
+        except Exception:
+            session["revision"] = revision
+            raise
+
+        signature = self._file_signature(path)
+        if signature is not None:
+            _BYTES_WRITTEN.inc(signature[1])
+            self._cache_put(session_id, signature, session)
+            self._index_update(session_id, session, signature)
+
+    def _load_for_update(self, session_id: str, required: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Return a private copy of a session for a read-modify-write.
+
+        Cached sessions are shared with readers (possibly on other threads), so
+        mutations happen on a copy that replaces the cache entry once written.
+        """
+        session = self.get_session(session_id)
+        if not session:
+            if required:
+                raise ValueError(f"Session {session_id} not found")
+            return None
+        return deepcopy(session)
+
+    # ------------------------------------------------------------------
+    # Session cache
+    # ------------------------------------------------------------------
+
+    def _cache_get(self, session_id: str, signature: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        """Return the cached session if its file signature still matches."""
+        with self._cache_lock:
+            entry = self._session_cache.get(session_id)
+            if entry is None or entry[0] != signature:
+                self._cache_stats["misses"] += 1
+                return None
+            self._session_cache.move_to_end(session_id)
+            self._cache_stats["hits"] += 1
+            return entry[1]
+
+    def _cache_put(self, session_id: str, signature: Tuple[int, int], session: Dict[str, Any]):
+        """Store a parsed session, evicting the least recently used entries."""
+        with self._cache_lock:
+            self._session_cache[session_id] = (signature, session)
+            self._session_cache.move_to_end(session_id)
+            while len(self._session_cache) > self.cache_size:
+                self._session_cache.popitem(last=False)
+
+    def _cache_invalidate(self, session_id: Optional[str] = None):
+        """Drop one session (or all sessions) from the cache."""
+        with self._cache_lock:
+            if session_id is None:
+                self._session_cache.clear()
+            else:
+                self._session_cache.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            hits = self._cache_stats["hits"]
+            misses = self._cache_stats["misses"]
+            total = hits + misses
+            return {
+                "backend": self.name,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total, 4) if total else None,
+                "size": len(self._session_cache),
+                "capacity": self.cache_size,
+            }
+
+    # ------------------------------------------------------------------
+    # Metadata index
+    # ------------------------------------------------------------------
+
+    def _get_index_path(self) -> str:
+        """Get the file path of the session metadata index (kept next to data_dir)."""
+        return os.path.join(os.path.dirname(os.path.abspath(self.data_dir)), "sessions-index.json")
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Load the index from disk once; a missing or unreadable index starts empty and is rebuilt."""
+        if self._session_index is not None:
+            return self._session_index
+
+        self._session_index = {}
+        try:
+            with open(self._get_index_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("format_version") == INDEX_FORMAT_VERSION:
+                self._session_index = data.get("sessions", {})
+            else:
+                self._index_dirty = True
+        except FileNotFoundError:
+            self._index_dirty = True
+        except (OSError, ValueError, AttributeError):
+            self._index_dirty = True
+
+        return self._session_index
+
+    def _flush_index(self):
+        """Persist the in-memory index if it has unsaved changes."""
+        if not self._index_dirty or self._session_index is None:
+            return
+
+        data = {"format_version": INDEX_FORMAT_VERSION, "sessions": self._session_index}
+        try:
+            atomic_write_json(self._get_index_path(), data)
+        except OSError as e:
+            # The index is a derived cache; it will be repaired on the next listing
+            print(f"Failed to write session index: {e}")
+            return
+        self._index_dirty = False
+
+    def _index_update(self, session_id: str, session: Dict[str, Any], signature: Tuple[int, int]):
+        """
+        Refresh a session's index entry after a write.
+
+        The index file is only rewritten when sidebar metadata changed; signature-only
+        changes (ratings, feedback, test output) are kept in memory until the next flush.
+        """
+        with self._index_lock:
+            index = self._load_index()
+            entry = build_session_summary(session)
+            previous = index.get(session_id)
+            metadata_changed = previous is None or any(previous.get(k) != entry[k] for k in INDEX_FIELDS)
+            entry["signature"] = list(signature)
+            index[session_id] = entry
+            self._index_dirty = True
+            if metadata_changed:
+                self._flush_index()
+
+    def _index_remove(self, session_id: Optional[str] = None):
+        """Remove one session (or every session) from the index."""
+        with self._index_lock:
+            index = self._load_index()
+            if session_id is None:
+                index.clear()
+            else:
+                index.pop(session_id, None)
+            self._index_dirty = True
+            self._flush_index()
+
+    def _reconcile_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Bring the index in line with the session files on disk.
+
+        Only sessions whose file is new or whose (mtime, size) changed since they were
+        indexed are parsed; entries for deleted files are dropped.
+        """
+        self._ensure_data_dir()
+        with self._index_lock:
+            index = self._load_index()
+            seen = set()
+            for filename in os.listdir(self.data_dir):
+                if not filename.endswith('.json'):
+                    continue
+                session_id = filename[:-5]  # Remove .json
+                seen.add(session_id)
+                signature = self._file_signature(os.path.join(self.data_dir, filename))
+                entry = index.get(session_id)
+                if signature is None or (entry and entry.get("signature") == list(signature)):
+                    continue
+
+                try:
+                    session = self.get_session(session_id)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping unreadable session {session_id}: {e}")
+                    continue
+                if session:
+                    new_entry = build_session_summary(session)
+                    new_entry["signature"] = list(signature)
+                    index[session_id] = new_entry
+                    self._index_dirty = True
+
+            for session_id in list(index):
+                if session_id not in seen:
+                    del index[session_id]
+                    self._index_dirty = True
+
+            self._flush_index()
+            return index
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+
+    @_serialized
+    def create_session(self, session_id: str, title: str, objective: Optional[str]) -> Dict[str, Any]:
+        self._ensure_data_dir()
+
+        session = {
+            "id": session_id,
+            "created_at": datetime.now().isoformat(),
+            "title": title,
+            "objective": objective,
+            "prompt_title": None,
+            "current_version": 0,
+            "stage": "init",
+            "iterations": [],
+            "test_set": [],
+            "revision": 0
+        }
+
+        self._save_session(session_id, session, create=True)
+        return session
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        path = self._get_session_path(session_id)
+        signature = self._file_signature(path)
+        if signature is None:
+            self._cache_invalidate(session_id)
+            return None
+
+        cached = self._cache_get(session_id, signature)
+        if cached is not None:
+            return cached
+
+        with open(path, 'r', encoding='utf-8') as f:
+            session = json.load(f)
+        _BYTES_READ.inc(signature[1])
+
+        backfill_session(session)
+
+        self._cache_put(session_id, signature, session)
+        return session
+
+    def list_sessions(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        sort_by: str = "last_modified",
+        descending: bool = True
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        if sort_by not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort sessions by '{sort_by}'")
+
+        with self._index_lock:
+            entries = [{key: entry.get(key) for key in INDEX_FIELDS} for entry in self._reconcile_index().values()]
+
+        return sort_and_paginate(entries, offset, limit, sort_by, descending)
+
+    @_serialized
+    def update_session_title(self, session_id: str, title: str):
+        session = self._load_for_update(session_id, required=False)
+        if session:
+            session["title"] = title
+            self._save_session(session_id, session)
+
+    @_serialized
+    def update_session_meta(self, session_id: str, **fields) -> Dict[str, Any]:
+        session = self._load_for_update(session_id)
+
+        for key, value in fields.items():
+            # The revision is owned by _save_session
+            if key != "revision":
+                session[key] = value
+
+        self._save_session(session_id, session)
+        return session
+
+    @_serialized
+    def delete_session(self, session_id: str):
+        path = self._get_session_path(session_id)
+        if not os.path.exists(path):
+            raise ValueError(f"Session {session_id} not found")
+
+        os.remove(path)
+        self._cache_invalidate(session_id)
+        self._index_remove(session_id)
+
+    def delete_all_sessions(self) -> int:
+        self._ensure_data_dir()
+
+        count = 0
+        for filename in os.listdir(self.data_dir):
+            if filename.endswith('.json'):
+                path = os.path.join(self.data_dir, filename)
+                os.remove(path)
+                count += 1
+            elif filename.endswith('.tmp'):
+                # Leftover from a write interrupted by a crash
+                os.remove(os.path.join(self.data_dir, filename))
+
+        self._cache_invalidate()
+        self._index_remove()
+        return count
+
+    # ------------------------------------------------------------------
+    # Test samples
+    # ------------------------------------------------------------------
+
+    @_serialized
+    def add_test_sample(
+        self,
+        session_id: str,
+        title: str,
+        test_input: str,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        session = self._load_for_update(session_id)
+
+        sample = {
+            "id": str(uuid.uuid4()),
+            "title": title or "Untitled sample",
+            "input": test_input or "",
+            "notes": notes,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat(),
+        }
+
+        session.setdefault("test_set", []).append(sample)
+
+        self._save_session(session_id, session)
+        return sample
+
+    @_serialized
+    def update_test_sample(
+        self,
+        session_id: str,
+        sample_id: str,
+        title: Optional[str] = None,
+        test_input: Optional[str] = None,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        session = self._load_for_update(session_id)
+
+        for sample in session.setdefault("test_set", []):
+            if sample["id"] == sample_id:
+                if title is not None:
+                    sample["title"] = title
+                if test_input is not None:
+                    sample["input"] = test_input
+                if notes is not None:
+                    sample["notes"] = notes
+                sample["updated_at"] = datetime.now().isoformat()
+                break
+        else:
+            raise ValueError(f"Test sample {sample_id} not found in session {session_id}")
+
+        self._save_session(session_id, session)
+        return sample
+
+    @_serialized
+    def delete_test_sample(self, session_id: str, sample_id: str):
+        session = self._load_for_update(session_id)
+
+        original_count = len(session.get("test_set", []))
+        remaining = [s for s in session.get("test_set", []) if s["id"] != sample_id]
+
+        if len(remaining) == original_count:
+            raise ValueError(f"Test sample {sample_id} not found in session {session_id}")
+
+        session["test_set"] = remaining
+        self._save_session(session_id, session)
+
+    # ------------------------------------------------------------------
+    # Iterations
+    # ------------------------------------------------------------------
+
+    @_serialized
+    def add_iteration(
+        self,
+        session_id: str,
+        prompt: str,
+        change_rationale: str,
+        test_results: Optional[List[Dict[str, Any]]] = None,
+        suggestions: Optional[List[Dict[str, Any]]] = None,
+        user_decision: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        stage: str = "title_ready",
+    ) -> Dict[str, Any]:
+        session = self._load_for_update(session_id)
+
+        # Calculate version number
+        version = len(session["iterations"]) + 1
+
+        iteration = {
+            "version": version,
+            "prompt": prompt,
+            "timestamp": datetime.now().isoformat(),
+            "change_rationale": change_rationale,
+            "test_results": test_results or [],
+            "suggestions": suggestions or [],
+            "user_decision": user_decision,
+            "stage": stage,
+            "test_sample_id": None,
+            "test_sample_title": None,
+            "test_sample_input": None,
+        }
+
+        session["iterations"].append(iteration)
+
+        # Update session-level metadata
+        session["current_version"] = version
+        session["stage"] = stage
+        if metadata:
+            session.update({k: v for k, v in metadata.items() if k != "revision"})
+
+        self._save_session(session_id, session)
+        return session
+
+    @_serialized
+    def update_iteration_test_results(
+        self,
+        session_id: str,
+        version: int,
+        test_results: List[Dict[str, Any]],
+        test_sample_id: Optional[str] = None,
+        test_sample_title: Optional[str] = None,
+        test_sample_input: Optional[str] = None,
+        stage: Optional[str] = None,
+        clear_feedback: bool = False,
+        clear_suggestions: bool = False,
+    ):
+        session = self._load_for_update(session_id)
+
+        # Find the iteration
+        for iteration in session["iterations"]:
+            if iteration["version"] == version:
+                iteration["test_results"] = test_results
+                if clear_feedback:
+                    for result in iteration["test_results"]:
+                        result["rating"] = None
+                        result["feedback"] = None
+                if clear_suggestions:
+                    iteration["suggestions"] = []
+                if stage:
+                    iteration["stage"] = stage
+                if test_sample_id is not None:
+                    iteration["test_sample_id"] = test_sample_id
+                if test_sample_title is not None:
+                    iteration["test_sample_title"] = test_sample_title
+                if test_sample_input is not None:
+                    iteration["test_sample_input"] = test_sample_input
+                break
+        else:
+            raise ValueError(f"Version {version} not found in session {session_id}")
+
+        # Keep session-level stage in sync with active iteration
+        if stage:
+            session["stage"] = stage
+
+        self._save_session(session_id, session)
+
+    @_serialized
+    def update_iteration_feedback(
+        self,
+        session_id: str,
+        version: int,
+        model: str,
+        rating: Optional[int] = None,
+        feedback: Optional[str] = None
+    ):
+        session = self._load_for_update(session_id)
+
+        # Find the iteration and test result
+        for iteration in session["iterations"]:
+            if iteration["version"] == version:
+                for result in iteration["test_results"]:
+                    if result["model"] == model:
+                        if rating is not None:
+                            result["rating"] = rating
+                        if feedback is not None:
+                            result["feedback"] = feedback
+                        break
+                break
+        else:
+            raise ValueError(f"Version {version} not found in session {session_id}")
+
+        self._save_session(session_id, session)
+
+    @_serialized
+    def update_iteration_suggestions(
+        self,
+        session_id: str,
+        version: int,
+        suggestions: List[Dict[str, Any]]
+    ):
+        session = self._load_for_update(session_id)
+
+        # Find the iteration
+        for iteration in session["iterations"]:
+            if iteration["version"] == version:
+                iteration["suggestions"] = suggestions
+                break
+        else:
+            raise ValueError(f"Version {version} not found in session {session_id}")
+
+        self._save_session(session_id, session)
+
+    @_serialized
+    def update_iteration_batch_results(
+        self,
+        session_id: str,
+        version: int,
+        batch_results: Dict[str, Any]
+    ):
+        session = self._load_for_update(session_id)
+
+        for iteration in session["iterations"]:
+            if iteration["version"] == version:
+                iteration["batch_results"] = batch_results
+                break
+        else:
+            raise ValueError(f"Version {version} not found in session {session_id}")
+
+        self._save_session(session_id, session)
+
+    @_serialized
+    def restore_iteration(self, session_id: str, version: int) -> Dict[str, Any]:
+        session = self._load_for_update(session_id)
+
+        target_iteration = self.get_iteration(session_id, version)
+        if not target_iteration:
+            raise ValueError(f"Version {version} not found in session {session_id}")
+
+        # Update session to point to restored version
+        session["current_version"] = version
+        session["stage"] = target_iteration.get("stage", session.get("stage", "init"))
+
+        self._save_session(session_id, session)
+        return session
@@ -0,0 +1,754 @@
+"""SQLite storage backend with normalized tables for sessions and their children.
+
+Run ``python -m backend.storage_sqlite migrate`` to import existing JSON
+sessions (``~/.llm-council/sessions/*.json``) into the database.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from .storage_base import StorageBackend, SORTABLE_FIELDS, backfill_session
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    title TEXT NOT NULL,
+    objective TEXT,
+    prompt_title TEXT,
+    current_version INTEGER NOT NULL DEFAULT 0,
+    stage TEXT NOT NULL DEFAULT 'init',
+    revision INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+
+CREATE TABLE IF NOT EXISTS iterations (
+    session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    change_rationale TEXT,
+    user_decision TEXT,
+    stage TEXT,
+    test_sample_id TEXT,
+    test_sample_title TEXT,
+    test_sample_input TEXT,
+    extra TEXT,
+    PRIMARY KEY (session_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS test_results (
+    session_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    output TEXT,
+    response_time REAL,
+    rating INTEGER,
+    feedback TEXT,
+    error INTEGER,
+    error_detail TEXT,
+    extra TEXT,
+    PRIMARY KEY (session_id, version, position),
+    FOREIGN KEY (session_id, version) REFERENCES iterations(session_id, version) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_test_results_model ON test_results(session_id, version, model);
+
+CREATE TABLE IF NOT EXISTS suggestions (
+    session_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    model TEXT,
+    suggestion TEXT,
+    extra TEXT,
+    PRIMARY KEY (session_id, version, position),
+    FOREIGN KEY (session_id, version) REFERENCES iterations(session_id, version) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS test_samples (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT,
+    input TEXT,
+    notes TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_test_samples_session ON test_samples(session_id, position);
+"""
+
+# Columns stored natively; any other keys round-trip through the JSON 'extra' column
+SESSION_COLUMNS = ("id", "created_at", "title", "objective", "prompt_title", "current_version", "stage", "revision")
+ITERATION_COLUMNS = (
+    "version", "prompt", "timestamp", "change_rationale", "user_decision", "stage",
+    "test_sample_id", "test_sample_title", "test_sample_input",
+)
+TEST_RESULT_COLUMNS = ("model", "output", "response_time", "rating", "feedback", "error", "error_detail")
+SUGGESTION_COLUMNS = ("model", "suggestion")
+TEST_SAMPLE_COLUMNS = ("id", "title", "input", "notes", "created_at", "updated_at")
+
+# Summary query backing list_sessions; derived fields mirror storage_base.build_session_summary
+SUMMARY_SQL = """
+SELECT
+    s.id,
+    s.created_at,
+    s.title,
+    s.prompt_title,
+    s.current_version,
+    COALESCE(
+        (SELECT i.stage FROM iterations i WHERE i.session_id = s.id AND i.version = s.current_version),
+        (SELECT i.stage FROM iterations i WHERE i.session_id = s.id ORDER BY i.version DESC LIMIT 1),
+        s.stage
+    ) AS stage,
+    (SELECT COUNT(*) FROM iterations i WHERE i.session_id = s.id) AS iteration_count,
+    COALESCE(
+        (SELECT i.timestamp FROM iterations i WHERE i.session_id = s.id ORDER BY i.version DESC LIMIT 1),
+        s.created_at
+    ) AS last_modified
+FROM sessions s
+"""
+
+
+def _split_extra(record: Dict[str, Any], columns: Tuple[str, ...]) -> Tuple[List[Any], Optional[str]]:
+    """Split a dict into native column values and a JSON blob of the remaining keys."""
+    values = [record.get(column) for column in columns]
+    extra = {k: v for k, v in record.items() if k not in columns}
+    return values, (json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _merge_extra(row: sqlite3.Row, columns: Tuple[str, ...]) -> Dict[str, Any]:
+    """Rebuild a dict from native columns plus the JSON 'extra' column."""
+    record = {column: row[column] for column in columns}
+    if row["extra"]:
+        record.update(json.loads(row["extra"]))
+    return record
+
+
+class SqliteStorageBackend(StorageBackend):
+    """
+    Stores sessions in a SQLite database using WAL journaling.
+
+    Sessions, iterations, test results, suggestions and test samples live in
+    separate tables, so feedback and sample edits touch a single row instead of
+    rewriting the whole session. Each thread gets its own connection.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        Path(os.path.dirname(os.path.abspath(db_path))).mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._upgrade_schema(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _upgrade_schema(conn: sqlite3.Connection):
+        """Add columns introduced after a database was created."""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "revision" not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA busy_timeout = 5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        """Run statements in a single transaction (a consistent snapshot for reads)."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+    def get_stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("sessions", "iterations", "test_results", "suggestions", "test_samples")
+        }
+        return {"backend": self.name, "path": self.db_path, "rows": counts}
+
+    # ------------------------------------------------------------------
+    # Row helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _require_session(conn: sqlite3.Connection, session_id: str):
+        if conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is None:
+            raise ValueError(f"Session {session_id} not found")
+
+    @staticmethod
+    def _bump_revision(conn: sqlite3.Connection, session_id: str):
+        """Count a write against the session (writes are already serialized by BEGIN IMMEDIATE)."""
+        conn.execute("UPDATE sessions SET revision = revision + 1 WHERE id = ?", (session_id,))
+
+    @staticmethod
+    def _require_iteration(conn: sqlite3.Connection, session_id: str, version: int):
+        row = conn.execute(
+            "SELECT 1 FROM iterations WHERE session_id = ? AND version = ?", (session_id, version)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Version {version} not found in session {session_id}")
+
+    @staticmethod
+    def _replace_test_results(conn: sqlite3.Connection, session_id: str, version: int, test_results: List[Dict[str, Any]]):
+        conn.execute("DELETE FROM test_results WHERE session_id = ? AND version = ?", (session_id, version))
+        for position, result in enumerate(test_results):
+            values, extra = _split_extra(result, TEST_RESULT_COLUMNS)
+            conn.execute(
+                "INSERT INTO test_results (session_id, version, position, model, output, response_time, "
+                "rating, feedback, error, error_detail, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, version, position, *values, extra),
+            )
+
+    @staticmethod
+    def _replace_suggestions(conn: sqlite3.Connection, session_id: str, version: int, suggestions: List[Dict[str, Any]]):
+        conn.execute("DELETE FROM suggestions WHERE session_id = ? AND version = ?", (session_id, version))
+        for position, suggestion in enumerate(suggestions):
+            values, extra = _split_extra(suggestion, SUGGESTION_COLUMNS)
+            conn.execute(
+                "INSERT INTO suggestions (session_id, version, position, model, suggestion, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, version, position, *values, extra),
+            )
+
+    @staticmethod
+    def _update_session_fields(conn: sqlite3.Connection, session_id: str, fields: Dict[str, Any]):
+        """Write session-level fields, keeping unknown keys in the 'extra' column."""
+        native = {k: v for k, v in fields.items() if k in SESSION_COLUMNS and k not in ("id", "revision")}
+        other = {k: v for k, v in fields.items() if k not in SESSION_COLUMNS and k not in ("iterations", "test_set")}
+
+        if native:
+            assignments = ", ".join(f"{column} = ?" for column in native)
+            conn.execute(f"UPDATE sessions SET {assignments} WHERE id = ?", (*native.values(), session_id))
+        if other:
+            row = conn.execute("SELECT extra FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            extra = json.loads(row["extra"]) if row and row["extra"] else {}
+            extra.update(other)
+            conn.execute("UPDATE sessions SET extra = ? WHERE id = ?", (json.dumps(extra, ensure_ascii=False), session_id))
+
+    def _load_session(self, conn: sqlite3.Connection, session_id: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+
+        session = _merge_extra(row, SESSION_COLUMNS)
+
+        results_by_version: Dict[int, List[Dict[str, Any]]] = {}
+        for result_row in conn.execute(
+            "SELECT * FROM test_results WHERE session_id = ? ORDER BY version, position", (session_id,)
+        ):
+            result = _merge_extra(result_row, TEST_RESULT_COLUMNS)
+            if result.get("error") is not None:
+                result["error"] = bool(result["error"])
+            results_by_version.setdefault(result_row["version"], []).append(result)
+
+        suggestions_by_version: Dict[int, List[Dict[str, Any]]] = {}
+        for suggestion_row in conn.execute(
+            "SELECT * FROM suggestions WHERE session_id = ? ORDER BY version, position", (session_id,)
+        ):
+            suggestions_by_version.setdefault(suggestion_row["version"], []).append(
+                _merge_extra(suggestion_row, SUGGESTION_COLUMNS)
+            )
+
+        iterations = []
+        for iteration_row in conn.execute(
+            "SELECT * FROM iterations WHERE session_id = ? ORDER BY version", (session_id,)
+        ):
+            iteration = _merge_extra(iteration_row, ITERATION_COLUMNS)
+            iteration["test_results"] = results_by_version.get(iteration["version"], [])
+            iteration["suggestions"] = suggestions_by_version.get(iteration["version"], [])
+            iterations.append(iteration)
+
+        session["iterations"] = iterations
+        session["test_set"] = [
+            _merge_extra(sample_row, TEST_SAMPLE_COLUMNS)
+            for sample_row in conn.execute(
+                "SELECT * FROM test_samples WHERE session_id = ? ORDER BY position", (session_id,)
+            )
+        ]
+        return backfill_session(session)
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+
+    def create_session(self, session_id: str, title: str, objective: Optional[str]) -> Dict[str, Any]:
+        session = {
+            "id": session_id,
+            "created_at": datetime.now().isoformat(),
+            "title": title,
+            "objective": objective,
+            "prompt_title": None,
+            "current_version": 0,
+            "stage": "init",
+            "iterations": [],
+            "test_set": [],
+            "revision": 1
+        }
+
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, created_at, title, objective, prompt_title, current_version, stage, revision) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, session["created_at"], title, objective, None, 0, "init", 1),
+            )
+        return session
+
+    def import_session(self, session: Dict[str, Any], overwrite: bool = False) -> bool:
+        """
+        Insert a complete session dict (e.g. from the JSON backend).
+
+        Args:
+            session: Full session dict
+            overwrite: Replace an existing session with the same id
+
+        Returns:
+            True if the session was written, False if it already existed
+        """
+        session = backfill_session(dict(session))
+        session_id = session["id"]
+
+        with self._transaction() as conn:
+            exists = conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if exists and not overwrite:
+                return False
+            if exists:
+                conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+            top_level = {k: v for k, v in session.items() if k not in ("iterations", "test_set")}
+            values, extra = _split_extra(top_level, SESSION_COLUMNS)
+            conn.execute(
+                "INSERT INTO sessions (id, created_at, title, objective, prompt_title, current_version, stage, "
+                "revision, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*values, extra),
+            )
+
+            for iteration in session.get("iterations", []):
+                fields = {k: v for k, v in iteration.items() if k not in ("test_results", "suggestions")}
+                fields.setdefault("timestamp", session["created_at"])
+                values, extra = _split_extra(fields, ITERATION_COLUMNS)
+                conn.execute(
+                    "INSERT INTO iterations (session_id, version, prompt, timestamp, change_rationale, user_decision, "
+                    "stage, test_sample_id, test_sample_title, test_sample_input, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, *values, extra),
+                )
+                self._replace_test_results(conn, session_id, iteration["version"], iteration.get("test_results", []))
+                self._replace_suggestions(conn, session_id, iteration["version"], iteration.get("suggestions", []))
+
+            for position, sample in enumerate(session.get("test_set", [])):
+                values, extra = _split_extra(sample, TEST_SAMPLE_COLUMNS)
+                conn.execute(
+                    "INSERT INTO test_samples (id, title, input, notes, created_at, updated_at, session_id, position, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*values, session_id, position, extra),
+                )
+        return True
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._transaction(write=False) as conn:
+            return self._load_session(conn, session_id)
+
+    def list_sessions(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        sort_by: str = "last_modified",
+        descending: bool = True
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        if sort_by not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort sessions by '{sort_by}'")
+
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+        # sort_by is validated against SORTABLE_FIELDS above, so it is safe to interpolate
+        direction = "DESC" if descending else "ASC"
+        query = f"{SUMMARY_SQL} ORDER BY ({sort_by} IS NULL), {sort_by} {direction} LIMIT ? OFFSET ?"
+        rows = conn.execute(query, (limit if limit is not None else -1, max(offset, 0))).fetchall()
+
+        sessions = []
+        for row in rows:
+            summary = dict(row)
+            summary["version_count"] = summary["iteration_count"]
+            sessions.append(summary)
+        return sessions, total
+
+    def update_session_title(self, session_id: str, title: str):
+        with self._transaction() as conn:
+            conn.execute("UPDATE sessions SET title = ?, revision = revision + 1 WHERE id = ?", (title, session_id))
+
+    def update_session_meta(self, session_id: str, **fields) -> Dict[str, Any]:
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            self._update_session_fields(conn, session_id, fields)
+            self._bump_revision(conn, session_id)
+            return self._load_session(conn, session_id)
+
+    def delete_session(self, session_id: str):
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            if cursor.rowcount == 0:
+                raise ValueError(f"Session {session_id} not found")
+
+    def delete_all_sessions(self) -> int:
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM sessions").rowcount
+
+    # ------------------------------------------------------------------
+    # Test samples
+    # ------------------------------------------------------------------
+
+    def list_test_samples(self, session_id: str) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        self._require_session(conn, session_id)
+        return [
+            _merge_extra(row, TEST_SAMPLE_COLUMNS)
+            for row in conn.execute(
+                "SELECT * FROM test_samples WHERE session_id = ? ORDER BY position", (session_id,)
+            )
+        ]
+
+    def get_test_sample(self, session_id: str, sample_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM test_samples WHERE session_id = ? AND id = ?", (session_id, sample_id)
+        ).fetchone()
+        return _merge_extra(row, TEST_SAMPLE_COLUMNS) if row else None
+
+    def add_test_sample(
+        self,
+        session_id: str,
+        title: str,
+        test_input: str,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        sample = {
+            "id": str(uuid.uuid4()),
+            "title": title or "Untitled sample",
+            "input": test_input or "",
+            "notes": notes,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat(),
+        }
+
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            position = conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM test_samples WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO test_samples (id, session_id, position, title, input, notes, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (sample["id"], session_id, position, sample["title"], sample["input"], notes,
+                 sample["created_at"], sample["updated_at"]),
+            )
+            self._bump_revision(conn, session_id)
+        return sample
+
+    def update_test_sample(
+        self,
+        session_id: str,
+        sample_id: str,
+        title: Optional[str] = None,
+        test_input: Optional[str] = None,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        updates = {"title": title, "input": test_input, "notes": notes}
+        updates = {k: v for k, v in updates.items() if v is not None}
+        updates["updated_at"] = datetime.now().isoformat()
+
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            assignments = ", ".join(f"{column} = ?" for column in updates)
+            cursor = conn.execute(
+                f"UPDATE test_samples SET {assignments} WHERE session_id = ? AND id = ?",
+                (*updates.values(), session_id, sample_id),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Test sample {sample_id} not found in session {session_id}")
+            self._bump_revision(conn, session_id)
+            row = conn.execute("SELECT * FROM test_samples WHERE id = ?", (sample_id,)).fetchone()
+        return _merge_extra(row, TEST_SAMPLE_COLUMNS)
+
+    def delete_test_sample(self, session_id: str, sample_id: str):
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            cursor = conn.execute(
+                "DELETE FROM test_samples WHERE session_id = ? AND id = ?", (session_id, sample_id)
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Test sample {sample_id} not found in session {session_id}")
+            self._bump_revision(conn, session_id)
+
+    # ------------------------------------------------------------------
+    # Iterations
+    # ------------------------------------------------------------------
+
+    def add_iteration(
+        self,
+        session_id: str,
+        prompt: str,
+        change_rationale: str,
+        test_results: Optional[List[Dict[str, Any]]] = None,
+        suggestions: Optional[List[Dict[str, Any]]] = None,
+        user_decision: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        stage: str = "title_ready",
+    ) -> Dict[str, Any]:
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+
+            # Calculate version number
+            version = conn.execute(
+                "SELECT COUNT(*) FROM iterations WHERE session_id = ?", (session_id,)
+            ).fetchone()[0] + 1
+
+            conn.execute(
+                "INSERT INTO iterations (session_id, version, prompt, timestamp, change_rationale, user_decision, stage) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, version, prompt, datetime.now().isoformat(), change_rationale, user_decision, stage),
+            )
+            self._replace_test_results(conn, session_id, version, test_results or [])
+            self._replace_suggestions(conn, session_id, version, suggestions or [])
+
+            # Update session-level metadata
+            fields = {"current_version": version, "stage": stage}
+            fields.update(metadata or {})
+            self._update_session_fields(conn, session_id, fields)
+            self._bump_revision(conn, session_id)
+
+            return self._load_session(conn, session_id)
+
+    def update_iteration_test_results(
+        self,
+        session_id: str,
+        version: int,
+        test_results: List[Dict[str, Any]],
+        test_sample_id: Optional[str] = None,
+        test_sample_title: Optional[str] = None,
+        test_sample_input: Optional[str] = None,
+        stage: Optional[str] = None,
+        clear_feedback: bool = False,
+        clear_suggestions: bool = False,
+    ):
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            self._require_iteration(conn, session_id, version)
+
+            if clear_feedback:
+                for result in test_results:
+                    result["rating"] = None
+                    result["feedback"] = None
+            self._replace_test_results(conn, session_id, version, test_results)
+
+            if clear_suggestions:
+                conn.execute("DELETE FROM suggestions WHERE session_id = ? AND version = ?", (session_id, version))
+
+            updates = {
+                "stage": stage or None,
+                "test_sample_id": test_sample_id,
+                "test_sample_title": test_sample_title,
+                "test_sample_input": test_sample_input,
+            }
+            updates = {k: v for k, v in updates.items() if v is not None}
+            if updates:
+                assignments = ", ".join(f"{column} = ?" for column in updates)
+                conn.execute(
+                    f"UPDATE iterations SET {assignments} WHERE session_id = ? AND version = ?",
+                    (*updates.values(), session_id, version),
+                )
+
+            # Keep session-level stage in sync with active iteration
+            if stage:
+                conn.execute("UPDATE sessions SET stage = ? WHERE id = ?", (stage, session_id))
+            self._bump_revision(conn, session_id)
+
+    def update_iteration_feedback(
+        self,
+        session_id: str,
+        version: int,
+        model: str,
+        rating: Optional[int] = None,
+        feedback: Optional[str] = None
+    ):
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            self._require_iteration(conn, session_id, version)
+
+            # Single-row update of the first result for this model
+            conn.execute(
+                "UPDATE test_results SET rating = COALESCE(?, rating), feedback = COALESCE(?, feedback) "
+                "WHERE session_id = ? AND version = ? AND position = ("
+                "    SELECT MIN(position) FROM test_results WHERE session_id = ? AND version = ? AND model = ?"
+                ")",
+                (rating, feedback, session_id, version, session_id, version, model),
+            )
+            self._bump_revision(conn, session_id)
+
+    def update_iteration_suggestions(
+        self,
+        session_id: str,
+        version: int,
+        suggestions: List[Dict[str, Any]]
+    ):
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            self._require_iteration(conn, session_id, version)
+            self._replace_suggestions(conn, session_id, version, suggestions)
+            self._bump_revision(conn, session_id)
+
+    def update_iteration_batch_results(
+        self,
+        session_id: str,
+        version: int,
+        batch_results: Dict[str, Any]
+    ):
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            self._require_iteration(conn, session_id, version)
+
+            # Batch results have no native columns; they live in the iteration's 'extra' JSON
+            row = conn.execute(
+                "SELECT extra FROM iterations WHERE session_id = ? AND version = ?", (session_id, version)
+            ).fetchone()
+            extra = json.loads(row["extra"]) if row["extra"] else {}
+            extra["batch_results"] = batch_results
+            conn.execute(
+                "UPDATE iterations SET extra = ? WHERE session_id = ? AND version = ?",
+                (json.dumps(extra, ensure_ascii=False), session_id, version),
+            )
+            self._bump_revision(conn, session_id)
+
+    def restore_iteration(self, session_id: str, version: int) -> Dict[str, Any]:
+        with self._transaction() as conn:
+            self._require_session(conn, session_id)
+            row = conn.execute(
+                "SELECT stage FROM iterations WHERE session_id = ? AND version = ?", (session_id, version)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Version {version} not found in session {session_id}")
+
+            # Update session to point to restored version
+            conn.execute(
+                "UPDATE sessions SET current_version = ?, stage = COALESCE(?, stage), revision = revision + 1 "
+                "WHERE id = ?",
+                (version, row["stage"], session_id),
+            )
+            return self._load_session(conn, session_id)
+
+
+def migrate_json_sessions(
+    source_dir: str,
+    db_path: str,
+    overwrite: bool = False
+) -> Dict[str, int]:
+    """
+    One-shot import of JSON session files into a SQLite database.
+
+    The JSON files are left untouched, so the migration can be re-run safely.
+
+    Args:
+        source_dir: Directory containing <session_id>.json files
+        db_path: Path of the SQLite database to create or extend
+        overwrite: Replace sessions that already exist in the database
+
+    Returns:
+        Dict with counts of imported, skipped and failed sessions
+    """
+    from .storage_json import JsonStorageBackend
+
+    source = JsonStorageBackend(source_dir, cache_size=1)
+    target = SqliteStorageBackend(db_path)
+    counts = {"imported": 0, "skipped": 0, "failed": 0}
+
+    try:
+        filenames = sorted(f for f in os.listdir(source_dir) if f.endswith(".json"))
+    except FileNotFoundError:
+        filenames = []
+
+    try:
+        for filename in filenames:
+            session_id = filename[:-5]
+            try:
+                session = source.get_session(session_id)
+                if session and target.import_session(session, overwrite=overwrite):
+                    counts["imported"] += 1
+                else:
+                    counts["skipped"] += 1
+            except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+                print(f"Failed to migrate session {session_id}: {e}")
+                counts["failed"] += 1
+    finally:
+        target.close()
+
+    return counts
+
+
+def main():
+    from . import storage
+
+    parser = argparse.ArgumentParser(description="SQLite session storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Import JSON session files into SQLite")
+    migrate.add_argument("--source", default=storage.DATA_DIR, help="Directory of JSON session files")
+    migrate.add_argument("--db", default=storage.SQLITE_PATH, help="SQLite database path")
+    migrate.add_argument("--overwrite", action="store_true", help="Replace sessions already in the database")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        counts = migrate_json_sessions(args.source, args.db, overwrite=args.overwrite)
+        print(
+            f"Migrated {counts['imported']} session(s) into {args.db} "
+            f"({counts['skipped']} skipped, {counts['failed']} failed)."
+        )
+        print("Set LLM_COUNCIL_STORAGE_BACKEND=sqlite to use the database.")
+
+
+if __name__ == "__main__":
+    main()
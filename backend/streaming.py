@@ -0,0 +1,179 @@
+"""Helpers for merging concurrent model streams into a single event stream."""
+
+import asyncio
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+from .openrouter import query_model_stream
+
+# Sentinel pushed by a producer task once its stream is exhausted
+_STREAM_END = object()
+
+
+class _StreamFailure:
+    """Wraps an exception raised by a producer so the consumer can re-raise it."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+async def fan_in(
+    streams: Dict[Hashable, AsyncIterator[Any]]
+) -> AsyncGenerator[Tuple[Hashable, Any], None]:
+    """
+    Merge several async iterators into one, yielding items as soon as any produces them.
+
+    Each stream is drained by its own task into a shared queue, so a slow stream never
+    delays items from the others. Closing the returned generator (for example when an
+    SSE client disconnects) cancels every producer that is still running.
+
+    Args:
+        streams: Mapping of key (e.g. model id) to async iterator
+
+    Yields:
+        Tuples of (key, item) in arrival order
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(key: str, stream: AsyncIterator[Any]):
+        try:
+            async for item in stream:
+                await queue.put((key, item))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put((key, _StreamFailure(e)))
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+            queue.put_nowait((key, _STREAM_END))
+
+    tasks = {key: asyncio.create_task(pump(key, stream)) for key, stream in streams.items()}
+    remaining = len(tasks)
+
+    try:
+        while remaining:
+            key, item = await queue.get()
+            if item is _STREAM_END:
+                remaining -= 1
+                continue
+            if isinstance(item, _StreamFailure):
+                raise item.exc
+            yield key, item
+    finally:
+        pending = [task for task in tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _normalize_model_stream(
+    model: str,
+    messages: List[Dict[str, str]],
+    result_key: str,
+    stage: Optional[str] = None,
+    use_cache: bool = True
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Turn raw query_model_stream chunks into per-model SSE events."""
+    content_buffer = ""
+    try:
+        async for chunk in query_model_stream(model, messages, stage=stage, use_cache=use_cache):
+            if chunk["type"] == "delta":
+                content_buffer += chunk["content"]
+                yield {"type": "delta", "model": model, "content": chunk["content"]}
+            elif chunk["type"] == "error":
+                event = {"type": "error", "model": model, "error": chunk["error"], "retries": chunk.get("retries", 0)}
+                if chunk.get("metrics"):
+                    event["metrics"] = chunk["metrics"]
+                yield event
+                return
+            elif chunk["type"] == "done":
+                event = {"type": "model_done", "model": model, result_key: content_buffer, "retries": chunk.get("retries", 0)}
+                if chunk.get("cached"):
+                    event["cached"] = True
+                if chunk.get("metrics"):
+                    event["metrics"] = chunk["metrics"]
+                yield event
+                return
+        # If we exit without done, still mark as complete
+        yield {"type": "model_done", "model": model, result_key: content_buffer}
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        yield {"type": "error", "model": model, "error": str(e)}
+
+
+async def stream_models(
+    models: List[str],
+    messages: List[Dict[str, str]],
+    result_key: str = "output",
+    stage: Optional[str] = None,
+    use_cache: bool = True
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Stream the same messages to several models concurrently.
+
+    Args:
+        models: List of OpenRouter model identifiers
+        messages: List of message dicts to send to each model
+        result_key: Field name that carries the full text on 'model_done' events
+        stage: Pipeline stage making the call, used to pick retry policies
+        use_cache: Set to False to bypass the response cache
+
+    Yields:
+        Dicts with 'type' ('delta', 'model_done', 'error') and 'model', in arrival order;
+        'model_done' and 'error' carry the call's 'metrics' when available
+    """
+    streams = {
+        model: _normalize_model_stream(model, messages, result_key, stage, use_cache)
+        for model in dict.fromkeys(models)
+    }
+    async for _, event in fan_in(streams):
+        yield event
+
+
+async def stream_matrix(
+    rows: Dict[str, List[Dict[str, str]]],
+    models: List[str],
+    result_key: str = "output",
+    stage: Optional[str] = None,
+    use_cache: bool = True,
+    concurrency: Optional[int] = None
+) -> AsyncGenerator[Tuple[str, Dict[str, Any]], None]:
+    """
+    Stream every combination of message list and model, with a cap on the calls running at once.
+
+    Args:
+        rows: Mapping of row key (e.g. test sample id) to the messages to send
+        models: List of OpenRouter model identifiers
+        result_key: Field name that carries the full text on 'model_done' events
+        stage: Pipeline stage making the call, used to pick retry policies
+        use_cache: Set to False to bypass the response cache
+        concurrency: Maximum number of model streams open at once (None for no limit)
+
+    Yields:
+        Tuples of (row key, event) in arrival order; events are the same as stream_models'
+    """
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def limited(model: str, messages: List[Dict[str, str]]) -> AsyncGenerator[Dict[str, Any], None]:
+        stream = _normalize_model_stream(model, messages, result_key, stage, use_cache)
+        if semaphore is None:
+            async for event in stream:
+                yield event
+            return
+        async with semaphore:
+            async for event in stream:
+                yield event
+
+    streams = {
+        (row, model): limited(model, messages)
+        for row, messages in rows.items()
+        for model in dict.fromkeys(models)
+    }
+    async for (row, _), event in fan_in(streams):
+        yield row, event
@@ -0,0 +1,293 @@
+"""Process-wide metrics registry, exposed in the Prometheus text format at /metrics.
+
+Counters, gauges and histograms are defined once at import time (below) and
+updated in place; label sets are created on first use. Updating a metric is a
+dict lookup plus a short lock, so call sites on hot paths can bind the labelled
+child once (``REQUESTS.labels("GET")``) and only pay for the update.
+
+Gauges can also be computed at scrape time from a callback (see
+Gauge.set_function), which suits values other modules already track, such as
+the job queue or the rate limiter.
+"""
+
+import bisect
+import math
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+# Seconds; covers fast storage operations up to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: List["_Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Value:
+    """A single counter or gauge value."""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramValue:
+    """Bucket counts, sum and count of one histogram label set."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric(ABC):
+    """Base of the metric types; subclasses create the value held per label set."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @abstractmethod
+    def _new_child(self) -> Any:
+        """Create the value tracked for one combination of label values."""
+
+    def labels(self, *values: Any) -> Any:
+        """
+        Return the child metric for one combination of label values.
+
+        Raises:
+            ValueError: If the number of values does not match the label names
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """Return (name suffix, extra label names, label values + extra values, value) rows."""
+        return [("", (), key, child.value) for key, child in list(self._children.items())]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, extra_names, values, value in self._samples():
+            labels = _format_labels(self.labelnames + extra_names, values)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up (requests, bytes, tokens)."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down (in-flight requests, queue depth)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], Union[float, Mapping[Tuple[str, ...], float]]]] = None
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], Union[float, Mapping[Tuple[str, ...], float]]]):
+        """
+        Compute the gauge when it is scraped instead of tracking it.
+
+        Args:
+            function: Returns the value, or for labelled gauges a mapping of
+                label value tuples to values
+        """
+        self._function = function
+
+    def _samples(self):
+        if self._function is None:
+            return super()._samples()
+        try:
+            result = self._function()
+        except Exception as e:
+            print(f"Could not collect metric {self.name}: {e}")
+            return []
+        if not self.labelnames:
+            return [("", (), (), float(result))]
+        return [("", (), tuple(str(v) for v in key), float(value)) for key, value in result.items()]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies, sizes) over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        samples = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", ("le",), key + (bound,), cumulative))
+            samples.append(("_sum", (), key, total))
+            samples.append(("_count", (), key, count))
+        return samples
+
+
+def render() -> str:
+    """Return every registered metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting HTTP requests by route template, method and status.
+
+    Routes are labelled with their template ("/api/sessions/{session_id}"), not
+    the concrete path, so the number of series stays bounded. The duration of a
+    streamed response runs until its last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.labels(method, template, status).inc()
+            HTTP_DURATION.labels(method, template).observe(time.perf_counter() - started)
+
+
+# HTTP handlers (see MetricsMiddleware)
+HTTP_REQUESTS = Counter("llm_council_http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+HTTP_DURATION = Histogram("llm_council_http_request_duration_seconds", "Time to handle an HTTP request, including streamed bodies.", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("llm_council_http_requests_in_flight", "HTTP requests being handled.")
+
+# Server-sent event streams
+SSE_STREAMS = Gauge("llm_council_sse_streams_active", "Open server-sent event streams.")
+SSE_EVENTS = Counter("llm_council_sse_events_total", "Server-sent events written, by event type.", ("type",))
+SSE_BYTES = Counter("llm_council_sse_bytes_total", "Bytes of server-sent events written.")
+
+# Upstream model calls (see backend/openrouter.py)
+UPSTREAM_CALLS = Counter("llm_council_upstream_calls_total", "Model calls by outcome (success, error, cached, rejected).", ("model", "outcome"))
+UPSTREAM_RETRIES = Counter("llm_council_upstream_retries_total", "Retried model call attempts.", ("model",))
+UPSTREAM_DURATION = Histogram("llm_council_upstream_duration_seconds", "Duration of model calls, including retries and queue wait.", ("model", "mode"))
+UPSTREAM_TTFT = Histogram("llm_council_upstream_ttft_seconds", "Time to the first token of model calls.", ("model", "mode"))
+UPSTREAM_QUEUE_WAIT = Histogram("llm_council_upstream_queue_wait_seconds", "Time model calls waited for a rate limiter slot.", ("model",))
+UPSTREAM_TOKENS = Counter("llm_council_upstream_tokens_total", "Tokens sent to and received from models.", ("model", "direction"))
+
+# Session storage (see backend/storage.py)
+STORAGE_DURATION = Histogram("llm_council_storage_operation_duration_seconds", "Duration of storage operations.", ("operation",))
+STORAGE_ERRORS = Counter("llm_council_storage_errors_total", "Storage operations that raised.", ("operation",))
+STORAGE_BYTES = Counter("llm_council_storage_bytes_total", "Bytes of session files read from and written to disk (json backend).", ("direction",))
+
+# Background work, computed when scraped (callbacks are set up in backend/main.py)
+JOBS = Gauge("llm_council_jobs", "Jobs known to the job manager, by status.", ("status",))
+JOBS_QUEUED = Gauge("llm_council_jobs_queued", "Jobs waiting for a worker.")
+RATE_LIMIT_IN_FLIGHT = Gauge("llm_council_rate_limit_in_flight", "Model calls holding a slot, by limit.", ("limit",))
+RATE_LIMIT_QUEUED = Gauge("llm_council_rate_limit_queued", "Model calls waiting for a rate limiter slot, by priority.", ("priority",))
@@ -0,0 +1,293 @@
+"""Lightweight tracing of requests, jobs, council stages, model calls and storage operations.
+
+A trace is a tree of timed spans: an HTTP request, the job it started, the
+council or optimizer stages of that job, every model call and every storage
+operation. The current span lives in a ContextVar, so tasks started inside a
+span (and storage calls on the thread pool) become its children; jobs run by
+the worker pool are attached to the request that submitted them.
+
+Spans are exported as they end, one JSON object per line, to TRACE_FILE and,
+if TRACE_COLLECTOR_URL is set, POSTed in batches to a local collector. Export
+runs on a background thread. Tracing is off unless LLM_COUNCIL_TRACING is set;
+while it is off, span(), traced() and record() return right away.
+
+Model calls and storage operations are recorded once they have finished
+(record()), so streaming generators never change the current span of the code
+consuming them.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+import httpx
+
+from .config import TRACING_ENABLED, TRACE_FILE, TRACE_MAX_BYTES, TRACE_COLLECTOR_URL
+
+OK = "ok"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+# Spans POSTed to the collector at most per request
+_COLLECTOR_BATCH = 100
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "duration", "status", "error", "attributes", "_started")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.status = OK
+        self.error: Optional[str] = None
+        self.attributes = dict(attributes or {})
+        self._started = time.perf_counter()
+
+    def set(self, **attributes: Any):
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+
+    def end(self):
+        """Stop the clock and export the span."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+            _export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration": round(self.duration, 6) if self.duration is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled."""
+
+    def set(self, **attributes: Any):
+        pass
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Optional[Span]] = ContextVar("llm_council_span", default=None)
+
+
+def is_enabled() -> bool:
+    return TRACING_ENABLED
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost active span, or None outside of any trace."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Any]:
+    """
+    Time a block as a span and make it the parent of spans started inside it.
+
+    Exceptions mark the span as failed (or cancelled) and propagate. Do not use
+    around `yield` in a generator; use record() for work done there.
+
+    Args:
+        name: Span name, e.g. "council.stage1"
+        parent: Parent span; defaults to the current span
+        **attributes: Initial attributes
+
+    Yields:
+        The span (a no-op stand-in while tracing is disabled)
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+
+    previous = _current.get()
+    current = Span(name, parent if parent is not None else previous, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except (asyncio.CancelledError, GeneratorExit, KeyboardInterrupt):
+        current.set_status(CANCELLED)
+        raise
+    except Exception as e:
+        current.set_status(ERROR, str(e) or type(e).__name__)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Exited in another context than it was entered in
+            _current.set(previous)
+        current.end()
+
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator running every call of a coroutine function in a span."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not TRACING_ENABLED:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def record(name: str, duration: float, error: Optional[str] = None, **attributes: Any):
+    """
+    Export an operation that has already finished as a child of the current span.
+
+    Args:
+        name: Span name, e.g. "model.call"
+        duration: Seconds the operation took (it is assumed to end now)
+        error: Error message if the operation failed
+        **attributes: Span attributes
+    """
+    if not TRACING_ENABLED:
+        return
+    finished = Span(name, _current.get(), attributes)
+    finished.start -= duration
+    finished.duration = duration
+    if error:
+        finished.set_status(ERROR, error)
+    _export(finished)
+
+
+class TracingMiddleware:
+    """ASGI middleware starting a root span for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope.get("method", "")
+        with span(f"{method} {scope.get('path', '')}", method=method, path=scope.get("path", "")) as request_span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    request_span.name = f"{method} {route}"
+                request_span.set(status=status)
+                if status >= 500:
+                    request_span.set_status(ERROR, f"HTTP {status}")
+
+
+# Export
+
+_queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+def _export(finished: Span):
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="trace-export", daemon=True)
+                _writer.start()
+    _queue.put(finished)
+
+
+def _write_loop():
+    client = httpx.Client(timeout=5.0) if TRACE_COLLECTOR_URL else None
+    while True:
+        batch: List[Span] = []
+        item = _queue.get()
+        stop = item is None
+        if item is not None:
+            batch.append(item)
+        # Write whatever else is already waiting in one go
+        while not stop:
+            try:
+                item = _queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+            else:
+                batch.append(item)
+
+        if batch:
+            records = [finished.to_dict() for finished in batch]
+            _append_to_file(records)
+            if client is not None:
+                for i in range(0, len(records), _COLLECTOR_BATCH):
+                    try:
+                        client.post(TRACE_COLLECTOR_URL, json={"spans": records[i:i + _COLLECTOR_BATCH]})
+                    except httpx.HTTPError as e:
+                        print(f"Could not send spans to {TRACE_COLLECTOR_URL}: {e}")
+        if stop:
+            if client is not None:
+                client.close()
+            return
+
+
+def _append_to_file(records: List[Dict[str, Any]]):
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+        # Keep one previous file around once the current one is full
+        if TRACE_MAX_BYTES and os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) >= TRACE_MAX_BYTES:
+            os.replace(TRACE_FILE, TRACE_FILE + ".1")
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            for data in records:
+                f.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+    except OSError as e:
+        print(f"Could not write spans to {TRACE_FILE}: {e}")
+
+
+def shutdown(timeout: float = 5.0):
+    """Export the spans still queued and stop the export thread."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        _queue.put(None)
+        writer.join(timeout)
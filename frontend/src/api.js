@@ -28,6 +28,85 @@ async function extractErrorMessage(response, fallbackMessage) {
   return `${fallbackMessage} (HTTP ${response.status}: ${response.statusText})`;
 }
 
+// Reconnects of an interrupted stream before giving up
+const STREAM_RECONNECT_ATTEMPTS = 3;
+const STREAM_RECONNECT_DELAY_MS = 1000;
+
+/**
+ * Read a Server-Sent Events response and call onEvent with each parsed `data:` payload.
+ * The id of the last event received is kept in `state.lastEventId`.
+ */
+async function readEventStream(response, onEvent, state = {}) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() || '';
+
+    for (const line of lines) {
+      if (line.startsWith('id: ')) {
+        state.lastEventId = line.slice(4);
+      } else if (line.startsWith('data: ')) {
+        try {
+          const data = JSON.parse(line.slice(6));
+          onEvent(data);
+        } catch (e) {
+          // Ignore parse errors
+        }
+      }
+    }
+  }
+
+  // Process any remaining data
+  if (buffer.startsWith('data: ')) {
+    try {
+      const data = JSON.parse(buffer.slice(6));
+      onEvent(data);
+    } catch (e) {
+      // Ignore parse errors
+    }
+  }
+}
+
+/**
+ * POST a request answered with Server-Sent Events, reconnecting with Last-Event-ID
+ * if the connection drops so that only the missed events are sent again.
+ */
+async function postEventStream(url, body, onEvent, fallbackMessage) {
+  const state = { lastEventId: null };
+
+  for (let attempt = 0; ; attempt++) {
+    const headers = { 'Content-Type': 'application/json' };
+    if (state.lastEventId) {
+      headers['Last-Event-ID'] = state.lastEventId;
+    }
+
+    try {
+      const response = await fetch(url, { method: 'POST', headers, body: JSON.stringify(body) });
+      if (!response.ok) {
+        const errorMsg = await extractErrorMessage(response, fallbackMessage);
+        const error = new Error(errorMsg);
+        error.noRetry = true;
+        throw error;
+      }
+      await readEventStream(response, onEvent, state);
+      return;
+    } catch (error) {
+      // Only a stream that already started can be resumed
+      if (error.noRetry || !state.lastEventId || attempt >= STREAM_RECONNECT_ATTEMPTS) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, STREAM_RECONNECT_DELAY_MS));
+    }
+  }
+}
+
 export const api = {
   /**
    * List all optimization sessions.
@@ -123,7 +202,32 @@ export const api = {
       const errorMsg = await extractErrorMessage(response, 'Failed to test prompt');
       throw new Error(errorMsg);
     }
-    return response.json();
+    const job = await response.json();
+    return this.waitForJob(job.job_id);
+  },
+
+  /**
+   * Follow a background job until it finishes and return its result.
+   * @param {string} jobId - Job ID
+   * @param {Function|null} onEvent - Optional callback for each job event
+   * @returns {Promise<any>} The job result
+   */
+  async waitForJob(jobId, onEvent = null) {
+    const events = await fetch(`${API_BASE}/api/jobs/${jobId}/events`);
+    if (events.ok) {
+      await readEventStream(events, onEvent || (() => {}));
+    }
+
+    const response = await fetch(`${API_BASE}/api/jobs/${jobId}`);
+    if (!response.ok) {
+      const errorMsg = await extractErrorMessage(response, 'Failed to get job');
+      throw new Error(errorMsg);
+    }
+    const job = await response.json();
+    if (job.status !== 'succeeded') {
+      throw new Error(job.error || `Job ${job.status}`);
+    }
+    return job.result;
   },
 
   /**
@@ -159,7 +263,8 @@ export const api = {
       const errorMsg = await extractErrorMessage(response, 'Failed to generate suggestions');
       throw new Error(errorMsg);
     }
-    return response.json();
+    const job = await response.json();
+    return this.waitForJob(job.job_id);
   },
 
   /**
@@ -177,7 +282,8 @@ export const api = {
       const errorMsg = await extractErrorMessage(response, 'Failed to merge suggestions');
       throw new Error(errorMsg);
     }
-    return response.json();
+    const job = await response.json();
+    return this.waitForJob(job.job_id);
   },
 
   /**
@@ -414,52 +520,29 @@ export const api = {
    * @returns {Promise<void>}
    */
   async testPromptStream(sessionId, testSampleId, onEvent, models = null) {
-    const response = await fetch(`${API_BASE}/api/sessions/${sessionId}/test/stream`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ models, test_sample_id: testSampleId }),
-    });
-
-    if (!response.ok) {
-      const errorMsg = await extractErrorMessage(response, 'Failed to test prompt');
-      throw new Error(errorMsg);
-    }
-
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
-    let buffer = '';
-
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-
-      buffer += decoder.decode(value, { stream: true });
-      const lines = buffer.split('\n');
-      buffer = lines.pop() || '';
-
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          try {
-            const data = JSON.parse(line.slice(6));
-            onEvent(data);
-          } catch (e) {
-            // Ignore parse errors
-          }
-        }
-      }
-    }
+    await postEventStream(
+      `${API_BASE}/api/sessions/${sessionId}/test/stream`,
+      { models, test_sample_id: testSampleId },
+      onEvent,
+      'Failed to test prompt'
+    );
+  },
 
-    // Process any remaining data
-    if (buffer.startsWith('data: ')) {
-      try {
-        const data = JSON.parse(buffer.slice(6));
-        onEvent(data);
-      } catch (e) {
-        // Ignore parse errors
-      }
-    }
+  /**
+   * Test a prompt on the whole test set (or the given samples) with models using streaming.
+   * Model events carry the `sample_id` of their cell; `sample_done` events close a row.
+   * @param {string} sessionId - Session ID
+   * @param {Function} onEvent - Callback for each SSE event
+   * @param {Object} options - Optional `models`, `testSampleIds` and `concurrency`
+   * @returns {Promise<void>}
+   */
+  async testPromptBatchStream(sessionId, onEvent, { models = null, testSampleIds = null, concurrency = null } = {}) {
+    await postEventStream(
+      `${API_BASE}/api/sessions/${sessionId}/test/batch/stream`,
+      { models, test_sample_ids: testSampleIds, concurrency },
+      onEvent,
+      'Failed to test prompt'
+    );
   },
 
   /**
@@ -470,51 +553,11 @@ export const api = {
    * @returns {Promise<void>}
    */
   async generateSuggestionsStream(sessionId, onEvent, models = null) {
-    const response = await fetch(`${API_BASE}/api/sessions/${sessionId}/suggest/stream`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ models }),
-    });
-
-    if (!response.ok) {
-      const errorMsg = await extractErrorMessage(response, 'Failed to generate suggestions');
-      throw new Error(errorMsg);
-    }
-
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
-    let buffer = '';
-
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-
-      buffer += decoder.decode(value, { stream: true });
-      const lines = buffer.split('\n');
-      buffer = lines.pop() || '';
-
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          try {
-            const data = JSON.parse(line.slice(6));
-            onEvent(data);
-          } catch (e) {
-            // Ignore parse errors
-          }
-        }
-      }
-    }
-
-    // Process any remaining data
-    if (buffer.startsWith('data: ')) {
-      try {
-        const data = JSON.parse(buffer.slice(6));
-        onEvent(data);
-      } catch (e) {
-        // Ignore parse errors
-      }
-    }
+    await postEventStream(
+      `${API_BASE}/api/sessions/${sessionId}/suggest/stream`,
+      { models },
+      onEvent,
+      'Failed to generate suggestions'
+    );
   },
 };
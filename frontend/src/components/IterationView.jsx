@@ -294,6 +294,21 @@ function IterationView({ session, activeVersion, onAction, onRestoreVersion }) {
                 : result
             );
           });
+        } else if (event.type === 'resync') {
+          // Reconnected after the missed events were dropped: take the outputs so far
+          if (event.status !== 'queued' && event.status !== 'running') {
+            setStreamingTestResults(null);
+            onAction('reload');
+            return;
+          }
+          setStreamingTestResults((prev) => {
+            if (!prev) return prev;
+            return prev.map((result) =>
+              event.partial[result.model] !== undefined
+                ? { ...result, output: event.partial[result.model] }
+                : result
+            );
+          });
         } else if (event.type === 'complete') {
           // Streaming complete, reload session to get final state
           setStreamingTestResults(null);
@@ -378,6 +393,21 @@ function IterationView({ session, activeVersion, onAction, onRestoreVersion }) {
                 : item
             );
           });
+        } else if (event.type === 'resync') {
+          // Reconnected after the missed events were dropped: take the outputs so far
+          if (event.status !== 'queued' && event.status !== 'running') {
+            setStreamingSuggestions(null);
+            onAction('reload');
+            return;
+          }
+          setStreamingSuggestions((prev) => {
+            if (!prev) return prev;
+            return prev.map((item) =>
+              event.partial[item.model] !== undefined
+                ? { ...item, suggestion: event.partial[item.model] }
+                : item
+            );
+          });
         } else if (event.type === 'complete') {
           // Streaming complete, reload session to get final state
           setStreamingSuggestions(null);
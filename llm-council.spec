@@ -65,6 +65,20 @@ hiddenimports = [
     'backend.openrouter',
     'backend.settings',
     'backend.platform_utils',
+    'backend.streaming',
+    'backend.storage_base',
+    'backend.storage_json',
+    'backend.storage_sqlite',
+    'backend.storage_async',
+    'backend.retry',
+    'backend.health',
+    'backend.response_cache',
+    'backend.singleflight',
+    'backend.jobs',
+    'backend.ratelimit',
+    'backend.telemetry',
+    'backend.tracing',
+    'backend.profiler',
 ]
 
 a = Analysis(
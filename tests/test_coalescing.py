@@ -0,0 +1,46 @@
+"""Tests for the coalescing of concurrent model calls in backend/openrouter.py."""
+
+import asyncio
+
+from backend import openrouter
+
+
+def _count_calls(monkeypatch):
+    calls = []
+
+    async def fake_query_model(model, messages, timeout, stage, deadline, use_cache):
+        calls.append((timeout, deadline))
+        await asyncio.sleep(0.01)
+        return {"content": "answer"}
+
+    monkeypatch.setattr(openrouter, "_query_model", fake_query_model)
+    return calls
+
+
+MESSAGES = [{"role": "user", "content": "question"}]
+
+
+def test_calls_with_the_same_budget_share_a_request(monkeypatch):
+    calls = _count_calls(monkeypatch)
+
+    async def main():
+        return await asyncio.gather(*(
+            openrouter.query_model("m", MESSAGES, timeout=30, stage="test", deadline=100.0) for _ in range(3)
+        ))
+
+    assert [r["content"] for r in asyncio.run(main())] == ["answer"] * 3
+    assert len(calls) == 1
+
+
+def test_calls_with_different_budgets_do_not_share(monkeypatch):
+    calls = _count_calls(monkeypatch)
+
+    async def main():
+        await asyncio.gather(
+            openrouter.query_model("m", MESSAGES, timeout=30, stage="test", deadline=100.0),
+            openrouter.query_model("m", MESSAGES, timeout=30, stage="test", deadline=500.0),
+            openrouter.query_model("m", MESSAGES, timeout=5, stage="test", deadline=100.0),
+        )
+
+    asyncio.run(main())
+    assert sorted(calls) == [(5, 100.0), (30, 100.0), (30, 500.0)]
@@ -0,0 +1,119 @@
+"""Tests for backend/council.py: quorum stages and the pipelined council."""
+
+import asyncio
+
+import pytest
+
+from backend import council, openrouter
+
+
+class FakeModels:
+    """Stands in for query_model: 'slow' answers only once released, everyone else right away."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = []
+
+    async def __call__(self, model, messages, stage=None, **kwargs):
+        prompt = messages[-1]["content"]
+        self.calls.append((stage, model, prompt))
+        if model == "slow":
+            await self.release.wait()
+        else:
+            await asyncio.sleep(0)
+        if stage == "stage2":
+            labels = [label for label in "ABC" if f"Response {label}:" in prompt]
+            ranking = "\n".join(f"{i}. Response {label}" for i, label in enumerate(labels, start=1))
+            return {"content": f"Evaluation.\n\nFINAL RANKING:\n{ranking}"}
+        return {"content": f"{model} answer"}
+
+    def started(self, stage, model):
+        return [prompt for call_stage, call_model, prompt in self.calls if (call_stage, call_model) == (stage, model)]
+
+
+@pytest.fixture
+def council_settings(monkeypatch):
+    """Three council models, one of them slow, none held back by the circuit breaker."""
+    settings = {"test_models": ["a", "b", "slow"], "synthesizer_model": "chair"}
+    monkeypatch.setattr(council, "get_settings", lambda: settings)
+    monkeypatch.setattr(council, "filter_available", lambda models: (list(models), []))
+    monkeypatch.setattr(council, "COUNCIL_CANCEL_STRAGGLERS", False)
+    return settings
+
+
+async def _background_settled():
+    while council._background_tasks:
+        await asyncio.gather(*list(council._background_tasks))
+
+
+def test_quorum_returns_before_the_slowest_model(monkeypatch):
+    async def main():
+        fake = FakeModels()
+        monkeypatch.setattr(openrouter, "query_model", fake)
+        responses, stragglers = await openrouter.query_models_quorum(
+            ["a", "slow", "b"], [{"role": "user", "content": "Question?"}], quorum=2
+        )
+        assert list(responses) == ["a", "b"]
+        assert list(stragglers) == ["slow"]
+
+        fake.release.set()
+        assert (await stragglers["slow"]) == {"content": "slow answer"}
+
+    asyncio.run(main())
+
+
+def test_council_stages_move_on_at_the_quorum_and_record_late_answers(council_settings, monkeypatch):
+    monkeypatch.setattr(council, "COUNCIL_QUORUM", 2)
+
+    async def main():
+        fake = FakeModels()
+        monkeypatch.setattr(openrouter, "query_model", fake)
+        monkeypatch.setattr(council, "query_model_hedged", fake)
+
+        stage1, stage2, stage3, metadata = await council.run_full_council("Question?")
+        assert [r["model"] for r in stage1] == ["a", "b"]
+        assert sorted(r["model"] for r in stage2) == ["a", "b"]
+        assert metadata["pending_models"] == {"stage1": ["slow"], "stage2": ["slow"]}
+        # The chairman did not wait for the slow model
+        assert stage3["response"] == "chair answer"
+        assert "slow answer" not in fake.started("stage3", "chair")[0]
+
+        fake.release.set()
+        await _background_settled()
+        return metadata
+
+    metadata = asyncio.run(main())
+    assert [r["model"] for r in metadata["late_results"]["stage1"]] == ["slow"]
+    assert [r["model"] for r in metadata["late_results"]["stage2"]] == ["slow"]
+    # The late ranking counts towards the aggregate
+    assert {r["model"]: r["rankings_count"] for r in metadata["aggregate_rankings"]} == {"a": 3, "b": 3}
+
+
+def test_pipelined_council_ranks_late_answers_in_the_background(council_settings, monkeypatch):
+    council_settings["council_pipeline"] = {"enabled": True, "stage1_quorum": 2, "stage2_quorum": 2}
+
+    async def main():
+        fake = FakeModels()
+        monkeypatch.setattr(council, "query_model", fake)
+        monkeypatch.setattr(council, "query_model_hedged", fake)
+
+        stage1, stage2, stage3, metadata = await council.run_full_council("Question?")
+        assert [r["model"] for r in stage1] == ["a", "b"]
+        assert sorted(r["model"] for r in stage2) == ["a", "b"]
+        assert metadata["pending_models"] == {"stage1": ["slow"], "stage2": []}
+        assert metadata["label_to_model"] == {"Response A": "a", "Response B": "b"}
+        assert stage3["response"] == "chair answer"
+        # The slow model has not ranked yet: it starts once its own answer is in
+        assert fake.started("stage2", "slow") == []
+
+        fake.release.set()
+        await _background_settled()
+        return fake, metadata
+
+    fake, metadata = asyncio.run(main())
+    # The slow answer got the next label, and the slow ranker saw every answer
+    assert metadata["label_to_model"] == {"Response A": "a", "Response B": "b", "Response C": "slow"}
+    assert "Response C:\nslow answer" in fake.started("stage2", "slow")[0]
+    assert [r["model"] for r in metadata["late_results"]["stage1"]] == ["slow"]
+    assert [r["model"] for r in metadata["late_results"]["stage2"]] == ["slow"]
+    assert {r["model"]: r["rankings_count"] for r in metadata["aggregate_rankings"]} == {"a": 3, "b": 3, "slow": 1}
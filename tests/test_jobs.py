@@ -0,0 +1,108 @@
+"""Tests for backend/jobs.py: the job queue across worker restarts and resuming event streams."""
+
+import asyncio
+
+from backend import jobs
+
+
+def test_queued_jobs_survive_a_worker_restart(tmp_path):
+    manager = jobs.JobManager(workers=0, jobs_dir=str(tmp_path))
+
+    async def runner(job):
+        return "done"
+
+    async def submit():
+        job, created = await manager.submit("test", None, runner)
+        assert created and job.status == jobs.QUEUED
+        return job
+
+    # No workers: the job stays queued when this event loop goes away
+    job = asyncio.run(submit())
+
+    async def restart():
+        manager.worker_count = 1
+        await manager.start()
+        await asyncio.wait_for(job.wait(), timeout=5)
+        await manager.shutdown()
+
+    asyncio.run(restart())
+    assert job.status == jobs.SUCCEEDED
+    assert job.result == "done"
+
+
+async def _collect(manager, job, after):
+    return [item async for item in manager.subscribe(job, after)]
+
+
+def test_resuming_after_an_event_id_sends_only_the_missed_events(tmp_path):
+    manager = jobs.JobManager(workers=1, jobs_dir=str(tmp_path))
+    release = None
+
+    async def runner(job):
+        job.emit({"type": "delta", "model": "a/model", "content": "Hel"})
+        job.emit({"type": "delta", "model": "a/model", "content": "lo"})
+        await release.wait()
+        job.emit({"type": "model_done", "model": "a/model"})
+        return "done"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        await manager.start()
+        job, _ = await manager.submit("test", "s1", runner)
+        while job.last_event_id < 3:
+            await asyncio.sleep(0)
+
+        # The client saw the status event and the first delta, then reconnected
+        resumed = asyncio.ensure_future(_collect(manager, job, after=2))
+        await asyncio.sleep(0)
+        release.set()
+        items = await asyncio.wait_for(resumed, timeout=5)
+        await manager.shutdown()
+        return job, items
+
+    job, items = asyncio.run(scenario())
+    assert [event_id for event_id, _ in items] == [3, 4, 5]
+    assert items[0][1] == {"type": "delta", "model": "a/model", "content": "lo"}
+    assert items[1][1]["type"] == "model_done"
+    assert items[2][1] == {"type": "job_status", "job_id": job.id, "status": jobs.SUCCEEDED}
+
+    parsed = jobs.parse_event_id(jobs.format_event_id(job, 2))
+    assert parsed == (job.id, 2)
+
+
+def test_resuming_past_the_buffer_starts_with_a_resync_snapshot(tmp_path, monkeypatch):
+    manager = jobs.JobManager(workers=1, jobs_dir=str(tmp_path))
+    monkeypatch.setattr(jobs, "JOB_EVENT_BUFFER", 2)
+
+    async def runner(job):
+        for chunk in ("a", "b", "c", "d"):
+            job.emit({"type": "delta", "model": "a/model", "content": chunk})
+        job.emit({"type": "model_done", "model": "a/model"})
+        return "abcd"
+
+    async def scenario():
+        await manager.start()
+        job, _ = await manager.submit("test", "s1", runner)
+        await asyncio.wait_for(job.wait(), timeout=5)
+        items = await _collect(manager, job, after=1)
+        await manager.shutdown()
+        return job, items
+
+    job, items = asyncio.run(scenario())
+    # Only the last two of seven events are buffered, so event 2 onwards cannot be replayed
+    assert len(items) == 1
+    event_id, event = items[0]
+    assert event_id == job.last_event_id == 7
+    assert event["type"] == "resync"
+    assert event["partial"] == {"a/model": "abcd"}
+    assert event["progress"] == {"completed": 1, "total": 0}
+    assert event["status"] == jobs.SUCCEEDED and event["result"] == "abcd"
+
+
+def test_malformed_event_ids_are_ignored():
+    assert jobs.parse_event_id(None) is None
+    assert jobs.parse_event_id("") is None
+    assert jobs.parse_event_id("no-number") is None
+    assert jobs.parse_event_id("job:abc") is None
+    assert jobs.parse_event_id(" job:12 ") == ("job", 12)
@@ -0,0 +1,86 @@
+"""Tests for backend/ratelimit.py: priority dispatch and limit reservation."""
+
+import asyncio
+
+import pytest
+
+from backend import ratelimit
+from backend.ratelimit import BACKGROUND, INTERACTIVE, NORMAL, RateLimiter
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Set the rate_limits setting seen by the limiter."""
+    config = {}
+    monkeypatch.setattr(ratelimit, "get_settings", lambda: {"rate_limits": config})
+    return config
+
+
+def test_waiters_are_granted_by_priority_then_arrival(limits):
+    limits["global"] = {"concurrency": 1}
+
+    async def main():
+        limiter = RateLimiter()
+        granted = []
+        held = await limiter.acquire("p/m", NORMAL)
+
+        async def call(name, level):
+            slots = await limiter.acquire("p/m", level)
+            granted.append(name)
+            await asyncio.sleep(0)
+            limiter.release(slots)
+
+        tasks = []
+        for name, level in [("bg1", BACKGROUND), ("normal", NORMAL), ("bg2", BACKGROUND), ("interactive", INTERACTIVE)]:
+            tasks.append(asyncio.ensure_future(call(name, level)))
+            await asyncio.sleep(0)  # fix the arrival order
+        assert granted == []
+
+        limiter.release(held)
+        await asyncio.gather(*tasks)
+        return granted
+
+    assert asyncio.run(main()) == ["interactive", "normal", "bg1", "bg2"]
+
+
+def test_waiter_reserves_only_the_limits_it_is_blocked_on(limits):
+    limits["global"] = {"concurrency": 10}
+    limits["providers"] = {"busy": {"concurrency": 1}}
+
+    async def main():
+        limiter = RateLimiter()
+        held = await limiter.acquire("busy/m", BACKGROUND)
+        interactive = asyncio.ensure_future(limiter.acquire("busy/m", INTERACTIVE))
+        await asyncio.sleep(0)
+
+        # Another provider keeps flowing, even for background work
+        other = await asyncio.wait_for(limiter.acquire("free/m", BACKGROUND), timeout=1)
+        limiter.release(other)
+
+        # Lower-priority work for the busy provider queues behind the interactive call
+        background = asyncio.ensure_future(limiter.acquire("busy/m", BACKGROUND))
+        await asyncio.sleep(0)
+        limiter.release(held)
+        first = await interactive
+        assert not background.done()
+        limiter.release(first)
+        limiter.release(await background)
+
+    asyncio.run(main())
+
+
+def test_timed_out_waiter_does_not_keep_a_slot(limits):
+    limits["global"] = {"concurrency": 1}
+
+    async def main():
+        limiter = RateLimiter()
+        held = await limiter.acquire("p/m")
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire("p/m", timeout=0.01)
+        limiter.release(held)
+        limiter.release(await asyncio.wait_for(limiter.acquire("p/m"), timeout=1))
+        stats = limiter.get_stats()
+        assert stats["queued"] == 0
+        assert all(limit["in_flight"] == 0 for limit in stats["limits"])
+
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""Tests for backend/singleflight.py: sharing, late joins and cancellation."""
+
+import asyncio
+
+import pytest
+
+from backend.singleflight import SingleFlight, StreamMulticast
+
+
+def _producer(items, started, gate=None):
+    """Async generator factory yielding `items`, waiting on `gate` after the first one."""
+    async def produce():
+        started.append(1)
+        for index, item in enumerate(items):
+            yield item
+            if index == 0 and gate is not None:
+                await gate.wait()
+    return produce
+
+
+def test_single_flight_shares_one_call():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+        assert flight.get_stats()["coalesced"] == 4
+        assert not flight.in_flight("key")
+
+    asyncio.run(main())
+
+
+def test_late_subscriber_gets_replay_then_live_items():
+    async def main():
+        multicast = StreamMulticast()
+        started = []
+        gate = asyncio.Event()
+        factory = _producer(["a", "b", "c"], started, gate)
+
+        first = multicast.subscribe("key", factory)
+        assert await first.__anext__() == "a"
+
+        async def collect(stream):
+            return [item async for item in stream]
+
+        late = asyncio.ensure_future(collect(multicast.subscribe("key", factory)))
+        await asyncio.sleep(0)
+        gate.set()
+        rest = [item async for item in first]
+
+        assert rest == ["b", "c"]
+        assert await late == ["a", "b", "c"]
+        assert len(started) == 1
+        assert not multicast.in_flight("key")
+
+    asyncio.run(main())
+
+
+def test_last_subscriber_leaving_forgets_flight_before_it_dies():
+    async def main():
+        multicast = StreamMulticast()
+        started = []
+        gate = asyncio.Event()  # never set: the first producer stalls after "a"
+        stream = multicast.subscribe("key", _producer(["a", "b"], started, gate))
+        assert await stream.__anext__() == "a"
+
+        await stream.aclose()
+        # The producer has not run its cancellation yet, but nobody may join it any more
+        assert not multicast.in_flight("key")
+
+        fresh = [item async for item in multicast.subscribe("key", _producer(["x", "y"], started))]
+        assert fresh == ["x", "y"]
+        assert len(started) == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_producer_is_not_reported_as_finished():
+    async def main():
+        multicast = StreamMulticast()
+        gate = asyncio.Event()
+        stream = multicast.subscribe("key", _producer(["a", "b"], [], gate))
+        assert await stream.__anext__() == "a"
+
+        # Cancelled from elsewhere (e.g. shutdown) while a subscriber is still reading
+        multicast._flights["key"].task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await stream.__anext__()
+
+    asyncio.run(main())
+
+
+def test_producer_error_reaches_every_subscriber():
+    async def main():
+        multicast = StreamMulticast()
+
+        async def failing():
+            yield "a"
+            await asyncio.sleep(0)
+            raise RuntimeError("upstream failed")
+
+        async def collect():
+            items = []
+            with pytest.raises(RuntimeError, match="upstream failed"):
+                async for item in multicast.subscribe("key", failing):
+                    items.append(item)
+            return items
+
+        assert await asyncio.gather(collect(), collect()) == [["a"], ["a"]]
+
+    asyncio.run(main())
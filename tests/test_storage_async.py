@@ -0,0 +1,87 @@
+"""Tests for backend/storage_async.py: write serialization, conflict retries and bulk deletes."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend import storage, storage_async
+from backend.storage_base import SessionConflictError
+from backend.storage_json import JsonStorageBackend
+
+
+def test_bulk_delete_never_overlaps_a_session_write(monkeypatch):
+    log = []
+    lock = threading.Lock()
+
+    def record(name, seconds):
+        with lock:
+            log.append(("start", name))
+        time.sleep(seconds)
+        with lock:
+            log.append(("end", name))
+
+    monkeypatch.setattr(storage, "update_session_title", lambda session_id, title: record(f"write {title}", 0.05))
+    monkeypatch.setattr(storage, "delete_all_sessions", lambda: record("delete all", 0.05) or 0)
+
+    async def main():
+        first = asyncio.ensure_future(storage_async.update_session_title("s1", "a"))
+        await asyncio.sleep(0.01)  # the first write is running
+        bulk = asyncio.ensure_future(storage_async.delete_all_sessions())
+        await asyncio.sleep(0.01)  # the bulk delete is waiting for it
+        second = asyncio.ensure_future(storage_async.update_session_title("s2", "b"))
+        await asyncio.gather(first, bulk, second)
+
+    asyncio.run(main())
+    assert log == [
+        ("start", "write a"), ("end", "write a"),
+        ("start", "delete all"), ("end", "delete all"),
+        ("start", "write b"), ("end", "write b"),
+    ]
+
+
+@pytest.fixture
+def json_backend(tmp_path):
+    previous = storage.set_backend(JsonStorageBackend(str(tmp_path)))
+    yield storage.get_backend()
+    storage.set_backend(previous)
+
+
+def test_conflicting_write_is_reapplied_on_the_fresh_session(json_backend, monkeypatch):
+    other_process = JsonStorageBackend(json_backend.data_dir)
+    json_backend.create_session("s1", "Original", None)
+    real_update = storage.update_session_meta
+    attempts = []
+
+    def update_racing_another_process(session_id, **fields):
+        attempts.append(1)
+        if len(attempts) == 1:
+            # Another process writes between our read and our write
+            stale = json_backend._load_for_update(session_id)
+            other_process.update_session_meta(session_id, stage="tested")
+            stale.update(fields)
+            json_backend._save_session(session_id, stale)
+        return real_update(session_id, **fields)
+
+    monkeypatch.setattr(storage, "update_session_meta", update_racing_another_process)
+    session = asyncio.run(storage_async.update_session_meta("s1", prompt_title="Mine"))
+
+    assert len(attempts) == 2
+    # Both changes survive: the other process's stage and our title
+    assert session["stage"] == "tested"
+    assert session["prompt_title"] == "Mine"
+    assert json_backend.get_session("s1")["revision"] == 3
+
+
+def test_conflicts_beyond_the_retry_budget_are_raised(monkeypatch):
+    attempts = []
+
+    def always_conflicting(session_id, title):
+        attempts.append(1)
+        raise SessionConflictError("modified concurrently")
+
+    monkeypatch.setattr(storage, "update_session_title", always_conflicting)
+    with pytest.raises(SessionConflictError):
+        asyncio.run(storage_async.update_session_title("s1", "title"))
+    assert len(attempts) == storage_async.STORAGE_CONFLICT_RETRIES + 1
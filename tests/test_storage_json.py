@@ -0,0 +1,35 @@
+"""Tests for backend/storage_json.py: session revisions and lost-update detection."""
+
+import pytest
+
+from backend.storage_base import SessionConflictError
+from backend.storage_json import JsonStorageBackend
+
+
+def test_stale_write_from_another_process_is_rejected(tmp_path):
+    # Two backends on one directory stand in for two processes
+    first = JsonStorageBackend(str(tmp_path))
+    second = JsonStorageBackend(str(tmp_path))
+    first.create_session("s1", "Original", None)
+
+    stale = first._load_for_update("s1")
+    second.update_session_title("s1", "From the other process")
+
+    stale["title"] = "Lost update"
+    with pytest.raises(SessionConflictError):
+        first._save_session("s1", stale)
+
+    assert first.get_session("s1")["title"] == "From the other process"
+    assert first.get_session("s1")["revision"] == 2
+
+    # A fresh read-modify-write goes through on top of the other process's change
+    first.update_session_title("s1", "Retried")
+    assert second.get_session("s1")["title"] == "Retried"
+    assert second.get_session("s1")["revision"] == 3
+
+
+def test_creating_an_existing_session_conflicts(tmp_path):
+    backend = JsonStorageBackend(str(tmp_path))
+    backend.create_session("s1", "One", None)
+    with pytest.raises(SessionConflictError):
+        backend.create_session("s1", "Two", None)
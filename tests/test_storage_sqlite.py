@@ -0,0 +1,97 @@
+"""Tests for backend/storage_sqlite.py: migrating JSON sessions into SQLite."""
+
+import copy
+
+from backend.storage_json import JsonStorageBackend
+from backend.storage_sqlite import TEST_RESULT_COLUMNS, SqliteStorageBackend, migrate_json_sessions
+
+
+def _normalised(session):
+    """Fill in the test result columns the JSON backend leaves out, as SQLite returns them as None."""
+    session = copy.deepcopy(session)
+    for iteration in session["iterations"]:
+        for result in iteration["test_results"]:
+            for column in TEST_RESULT_COLUMNS:
+                result.setdefault(column, None)
+    return session
+
+
+def _build_json_session(source_dir):
+    backend = JsonStorageBackend(source_dir)
+    backend.create_session("s1", "Summariser", "Summarise support tickets")
+    sample = backend.add_test_sample("s1", "Refund", "I want my money back", notes="angry customer")
+
+    backend.add_iteration("s1", "You summarise tickets.", "Initial prompt", metadata={"prompt_title": "Tickets"})
+    backend.update_iteration_test_results(
+        "s1", 1,
+        [
+            {"model": "a/model", "output": "Refund request", "response_time": 1.5, "retries": 0,
+             "rating": None, "feedback": None, "metrics": {"ttft": 0.4, "duration": 1.5}},
+            {"model": "b/model", "output": "[Error: timeout]", "response_time": 0, "retries": 2,
+             "rating": None, "feedback": None, "error": True, "error_detail": "timeout"},
+        ],
+        test_sample_id=sample["id"],
+        test_sample_title=sample["title"],
+        test_sample_input=sample["input"],
+        stage="testing",
+    )
+    backend.update_iteration_feedback("s1", 1, "a/model", rating=4, feedback="Too terse")
+    backend.update_iteration_suggestions("s1", 1, [{"model": "a/model", "suggestion": "Mention the amount"}])
+    backend.update_iteration_batch_results("s1", 1, {"summary": {"passed": 1, "failed": 1}})
+    backend.add_iteration("s1", "You summarise tickets, citing amounts.", "Apply feedback")
+
+    backend.create_session("s2", "Empty", None)
+    return backend
+
+
+def test_json_sessions_round_trip_through_sqlite(tmp_path):
+    source = _build_json_session(str(tmp_path / "sessions"))
+    db_path = str(tmp_path / "sessions.db")
+
+    counts = migrate_json_sessions(str(tmp_path / "sessions"), db_path)
+    assert counts == {"imported": 2, "skipped": 0, "failed": 0}
+
+    target = SqliteStorageBackend(db_path)
+    try:
+        for session_id in ("s1", "s2"):
+            assert target.get_session(session_id) == _normalised(source.get_session(session_id))
+
+        migrated, total = target.list_sessions(sort_by="created_at", descending=False)
+        original, _ = source.list_sessions(sort_by="created_at", descending=False)
+        assert total == 2
+        assert [s["id"] for s in migrated] == [s["id"] for s in original]
+        assert [s["version_count"] for s in migrated] == [2, 0]
+
+        # The migrated session keeps its revision, so later writes continue the sequence
+        revision = source.get_session("s1")["revision"]
+        target.update_session_title("s1", "Renamed after migration")
+        assert target.get_session("s1")["revision"] == revision + 1
+    finally:
+        target.close()
+
+
+def test_migration_skips_existing_sessions_unless_overwriting(tmp_path):
+    source = _build_json_session(str(tmp_path / "sessions"))
+    db_path = str(tmp_path / "sessions.db")
+    migrate_json_sessions(str(tmp_path / "sessions"), db_path)
+
+    target = SqliteStorageBackend(db_path)
+    try:
+        target.update_session_title("s1", "Edited in SQLite")
+    finally:
+        target.close()
+
+    assert migrate_json_sessions(str(tmp_path / "sessions"), db_path) == {"imported": 0, "skipped": 2, "failed": 0}
+    target = SqliteStorageBackend(db_path)
+    try:
+        assert target.get_session("s1")["title"] == "Edited in SQLite"
+    finally:
+        target.close()
+
+    counts = migrate_json_sessions(str(tmp_path / "sessions"), db_path, overwrite=True)
+    assert counts == {"imported": 2, "skipped": 0, "failed": 0}
+    target = SqliteStorageBackend(db_path)
+    try:
+        assert target.get_session("s1") == _normalised(source.get_session("s1"))
+    finally:
+        target.close()